@@ -1,9 +1,26 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Query, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import functools
 import json
+import bisect
 import datetime
+import hashlib
 import os
-from typing import Any, Dict, List, Union
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from fiche_paie import CacheFiches, fiches_et_empreintes_du_mois, generer_fiches, pool_rendu
+from import_presences import importer_presences, lire_lignes
+from primes_production import PRIX_APPEL, PRIX_TMC, Tarifs, agreger_appels, ecrire_primes, primes_par_agent
+from paie import JOURS_THEORIQUES_DEFAUT, SALAIRE_COLS, calcul_anciennete, calcul_droit_depuis_date, parse_float
+from paie_lot import heures_matrice, matrice_codes, paie_du_mois
+from presence_index import ALLOWED_PRESENCE_VALUES, days_in_month, parse_presence_key
+from storage import VersionConflict, employe_version, open_repository
 
 # Chemins des fichiers
 DATA_DIR = "data"
@@ -11,9 +28,31 @@ EMPLOYES_FILE = os.path.join(DATA_DIR, "employes.json")
 PRESENCES_FILE = os.path.join(DATA_DIR, "presences.json")
 SALAIRES_FILE = os.path.join(DATA_DIR, "salaires.json")
 CONGES_META_FILE = os.path.join(DATA_DIR, "conges_meta.json")
+FICHES_DIR = os.path.join(DATA_DIR, "fiches")
+
+# Données chargées une fois et servies depuis la mémoire (crée aussi le dossier data).
+# Le stockage (JSON ou SQLite) est choisi par config.Config.STORAGE_BACKEND.
+# Chaque worker uvicorn ouvre son propre dépôt sur le même dossier : les
+# versions (et donc les ETag) sont tirées des données partagées, identiques
+# d'un worker à l'autre
+depot = open_repository(DATA_DIR)
+
+# Le stockage fait des E/S bloquantes (fsync du journal, compactage, relecture
+# des fichiers réécrits par un autre worker, attente du verrou data.lock) :
+# aucune n'est faite sur la boucle asyncio. Les endpoints de lecture sont des
+# fonctions synchrones (exécutées par Starlette dans son pool de threads) ;
+# les écritures passent par un pool borné séparé, pour que des écritures en
+# attente du verrou n'occupent pas les threads des lectures.
+ECRITURES_MAX = 4
+_ecritures = ThreadPoolExecutor(max_workers=ECRITURES_MAX, thread_name_prefix="stockage-ecriture")
+
+async def ecriture(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Exécute une écriture du stockage dans le pool des écritures"""
+    return await asyncio.get_running_loop().run_in_executor(_ecritures, functools.partial(fn, *args, **kwargs))
 
-# S'assurer que le dossier data existe
-os.makedirs(DATA_DIR, exist_ok=True)
+async def lecture(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Exécute une lecture du stockage hors de la boucle asyncio"""
+    return await run_in_threadpool(fn, *args, **kwargs)
 
 app = FastAPI(
     title="Colarys Concept API",
@@ -32,84 +71,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # ---------------------- FONCTIONS UTILITAIRES ----------------------
-def parse_float(s: Any, default: float = 0.0) -> float:
-    try:
-        if s is None:
-            return default
-        if isinstance(s, (int, float)):
-            return float(s)
-        s = str(s).replace(" ", "").replace("\u202f", "").replace(",", ".")
-        return float(s)
-    except Exception:
-        return default
-
-def parse_int(s: Any, default: int = 0) -> int:
-    try:
-        if s is None:
-            return default
-        if isinstance(s, (int, float)):
-            return int(s)
-        digits = "".join(ch for ch in str(s) if ch.isdigit() or ch == "-")
-        return int(digits) if digits not in ("", "-") else default
-    except Exception:
-        return default
-
-def _parse_date_embauche(s: str):
-    if not s:
-        return None
-    s = s.strip()
-    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y"):
-        try:
-            return datetime.datetime.strptime(s, fmt).date()
-        except Exception:
-            pass
-    return None
-
-def calcul_anciennete(date_embauche_str: str) -> str:
-    d = _parse_date_embauche(date_embauche_str)
-    if not d:
-        return ""
-    today = datetime.date.today()
-    years = today.year - d.year - ((today.month, today.day) < (d.month, d.day))
-    months = (today.month - d.month) % 12
-    return f"{years} ans {months} mois"
-
-def calcul_droit_depuis_date(date_embauche_str: str) -> int:
-    d = _parse_date_embauche(date_embauche_str)
-    if not d:
-        return 0
-    return 1 if (datetime.date.today() - d).days > 365 else 0
-
-def anciennete_ans_depuis_date(date_embauche_str: str) -> int:
-    d = _parse_date_embauche(date_embauche_str or "")
-    if not d:
-        return 0
-    today = datetime.date.today()
-    return today.year - d.year - ((today.month, today.day) < (d.month, d.day))
-
-def load_data(filename: str, default: Any):
-    """Charge les données depuis un fichier JSON"""
-    try:
-        if os.path.exists(filename):
-            with open(filename, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"❌ Erreur lecture {filename}: {e}")
-    return default
-
-def save_data(filename: str, data: Any):
-    """Sauvegarde les données dans un fichier JSON"""
-    try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"❌ Erreur écriture {filename}: {e}")
-        return False
-
 def update_conges_automatique(employes: List[Dict[str, str]]):
     """Met à jour automatiquement les soldes de congé"""
     today = datetime.date.today()
@@ -136,6 +101,50 @@ def update_conges_automatique(employes: List[Dict[str, str]]):
     
     return employes
 
+def make_etag(*version: Any) -> str:
+    digest = hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+def month_etag(kind: str, year: int, month: int) -> str:
+    """ETag d'une vue d'un mois (présences, salaires), le même dans tous les workers"""
+    return make_etag(kind, year, month, depot.month_version(year, month))
+
+def employe_etag(emp: Optional[Dict[str, str]]) -> str:
+    return make_etag("employe", employe_version(emp) if emp is not None else None)
+
+def _etag_candidates(header: str) -> List[str]:
+    return [c.strip()[2:] if c.strip().startswith("W/") else c.strip() for c in header.split(",")]
+
+def etag_match(request: Request, etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match du client contient déjà `etag`"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = _etag_candidates(header)
+    return "*" in candidates or etag in candidates
+
+def if_match(request: Request, *current_etags: Callable[[], str]) -> Optional[Callable[[], bool]]:
+    """Précondition d'écriture tirée de l'en-tête If-Match (None s'il est absent).
+
+    Elle est évaluée par le stockage sous verrou, juste avant l'écriture : si
+    un autre client (ou un autre worker) a modifié les données entre-temps,
+    l'écriture est refusée avec un 412 au lieu d'écraser sa modification.
+    """
+    header = request.headers.get("if-match")
+    if not header:
+        return None
+    candidates = _etag_candidates(header)
+    if "*" in candidates:
+        return None
+    return lambda: any(etag() in candidates for etag in current_etags)
+
+@app.exception_handler(VersionConflict)
+async def version_conflict_handler(request: Request, exc: VersionConflict):
+    return JSONResponse(
+        status_code=412,
+        content={"detail": "Les données ont été modifiées entre-temps : rechargez-les avant d'enregistrer"},
+    )
+
 # ---------------------- ENDPOINTS EMPLOYÉS ----------------------
 @app.get("/")
 async def root():
@@ -147,32 +156,114 @@ async def root():
             "employes": "/employes",
             "presences": "/presences/{year}/{month}",
             "salaires": "/salaires/{year}/{month}",
+            "paie": "/paie/{year}/{month}",
+            "fiches": "/fiches/{year}/{month}",
             "statistiques": "/statistiques"
         }
     }
 
-@app.get("/employes", response_model=List[Dict[str, str]])
-async def get_employes():
-    """Récupérer tous les employés"""
-    employes = load_data(EMPLOYES_FILE, [])
-    return employes
+def stream_json_list(items: Iterable[Any]) -> Iterator[bytes]:
+    """Sérialise une liste JSON élément par élément"""
+    yield b"["
+    for i, item in enumerate(items):
+        yield (b"," if i else b"") + json.dumps(item, ensure_ascii=False).encode("utf-8")
+    yield b"]"
+
+# Employés copiés par lot pendant l'envoi de la liste (le verrou de lecture est repris à chaque lot)
+EMPLOYES_LOT = 256
+
+@app.get("/employes")
+def get_employes(
+    fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules"),
+    compagne: Optional[str] = None,
+    categorie: Optional[str] = None,
+    fonction: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Matricule du dernier employé de la page précédente"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+):
+    """Récupérer les employés (tous par défaut)
+    
+    Filtres exacts sur Compagne, Catégorie et Fonction, projection `fields=`
+    et pagination par curseur : l'en-tête X-Next-Cursor de la réponse est à
+    passer en `cursor` pour obtenir la page suivante.
+    """
+    index = depot.employe_index()
+    filtres = {k: v for k, v in (("Compagne", compagne), ("Catégorie", categorie), ("Fonction", fonction)) if v is not None}
+    noms = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    
+    # Index parcourus à l'abri des écritures. Seules les références des
+    # employés retenus sont gardées (la liste est modifiée en place, les
+    # positions peuvent changer d'ici l'envoi) ; les copies sont faites lot
+    # par lot pendant l'envoi, pas toutes avant le premier octet
+    with depot.reading():
+        employes = index.employes
+        start = 0
+        if cursor is not None:
+            start = index.position(cursor) + 1
+            if start == 0:
+                raise HTTPException(status_code=400, detail="Curseur invalide")
+        
+        # Filtres résolus par les index secondaires (positions dans l'ordre de la liste)
+        positions = index.positions(**filtres)
+        positions = positions[bisect.bisect_left(positions, start):]
+        next_cursor = None
+        if limit is not None and len(positions) > limit:
+            positions = positions[:limit]
+            next_cursor = employes[positions[-1]].get("Matricule", "")
+        selection = [employes[i] for i in positions]
+    
+    def page() -> Iterator[Dict[str, str]]:
+        for debut in range(0, len(selection), EMPLOYES_LOT):
+            with depot.reading():
+                if noms is None:
+                    lot = [dict(emp) for emp in selection[debut:debut + EMPLOYES_LOT]]
+                else:
+                    lot = [{f: emp[f] for f in noms if f in emp} for emp in selection[debut:debut + EMPLOYES_LOT]]
+            yield from lot
+    
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else {}
+    return StreamingResponse(stream_json_list(page()), media_type="application/json", headers=headers)
+
+@app.get("/employes/search", response_model=List[Dict[str, str]])
+def search_employes(
+    q: str = Query(..., min_length=1, description="Nom, prénom, téléphone, campagne... (préfixes acceptés)"),
+    fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """Rechercher des employés, du plus pertinent au moins pertinent
+
+    Recherche sans accents ni casse ; chaque mot de `q` doit être le début
+    d'un mot d'un des champs (ex. "andria voa", "034 04", "teleop").
+    """
+    index = depot.employe_index()
+    with depot.reading():
+        resultats = [dict(emp) for emp in index.rechercher(q, limit)]
+    if fields:
+        noms = [f.strip() for f in fields.split(",") if f.strip()]
+        resultats = [{f: emp[f] for f in noms if f in emp} for emp in resultats]
+    return resultats
 
 @app.get("/employes/{matricule}")
-async def get_employe(matricule: str):
-    """Récupérer un employé par matricule"""
-    employes = load_data(EMPLOYES_FILE, [])
-    for emp in employes:
-        if emp.get("Matricule") == matricule:
-            return emp
-    raise HTTPException(status_code=404, detail="Employé non trouvé")
+def get_employe(matricule: str, request: Request, response: Response):
+    """Récupérer un employé par matricule
+    
+    L'ETag renvoyé peut être passé en If-Match à PUT / DELETE : la
+    modification est refusée (412) si l'employé a changé entre-temps.
+    """
+    emp = depot.employe(matricule)
+    if emp is None:
+        raise HTTPException(status_code=404, detail="Employé non trouvé")
+    etag = employe_etag(emp)
+    if etag_match(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return emp
 
 @app.post("/employes")
 async def create_employe(employe: Dict[str, str]):
     """Créer un nouvel employé"""
-    employes = load_data(EMPLOYES_FILE, [])
-    
     # Vérifier si le matricule existe déjà
-    if any(emp.get("Matricule") == employe.get("Matricule") for emp in employes):
+    if employe.get("Matricule") in await lecture(depot.employe_index):
         raise HTTPException(status_code=400, detail="Matricule déjà utilisé")
     
     # Calculer les champs automatiques
@@ -188,45 +279,42 @@ async def create_employe(employe: Dict[str, str]):
     if solde_actuel < 0:
         employe["Solde de congé"] = str(solde_initial)
     
-    employes.append(employe)
-    
-    if save_data(EMPLOYES_FILE, employes):
+    # Vérifié de nouveau sous verrou : un autre worker a pu créer le même matricule
+    matricule = employe.get("Matricule")
+    try:
+        cree = await ecriture(depot.upsert_employe, employe, precondition=lambda: matricule not in depot.employe_index())
+    except VersionConflict:
+        raise HTTPException(status_code=400, detail="Matricule déjà utilisé")
+    if cree:
         return {"message": "Employé créé avec succès", "matricule": employe["Matricule"]}
     else:
         raise HTTPException(status_code=500, detail="Erreur lors de la sauvegarde")
 
 @app.put("/employes/{matricule}")
-async def update_employe(matricule: str, employe: Dict[str, str]):
+async def update_employe(matricule: str, employe: Dict[str, str], request: Request):
     """Modifier un employé"""
-    employes = load_data(EMPLOYES_FILE, [])
-    
-    for i, emp in enumerate(employes):
-        if emp.get("Matricule") == matricule:
-            # Recalculer les champs automatiques
-            date_emb = employe.get("Date d'embauche", "")
-            employe["Ancienneté"] = calcul_anciennete(date_emb)
-            droit = calcul_droit_depuis_date(date_emb)
-            employe["droit ostie"] = str(droit)
-            employe["droit transport et repas"] = str(droit)
-            
-            employes[i] = employe
-            
-            if save_data(EMPLOYES_FILE, employes):
-                return {"message": "Employé modifié avec succès"}
-            else:
-                raise HTTPException(status_code=500, detail="Erreur lors de la sauvegarde")
-    
-    raise HTTPException(status_code=404, detail="Employé non trouvé")
+    if matricule not in await lecture(depot.employe_index):
+        raise HTTPException(status_code=404, detail="Employé non trouvé")
+    
+    # Recalculer les champs automatiques
+    date_emb = employe.get("Date d'embauche", "")
+    employe["Ancienneté"] = calcul_anciennete(date_emb)
+    droit = calcul_droit_depuis_date(date_emb)
+    employe["droit ostie"] = str(droit)
+    employe["droit transport et repas"] = str(droit)
+    
+    precondition = if_match(request, lambda: employe_etag(depot.employe(matricule)))
+    if await ecriture(depot.upsert_employe, employe, matricule, precondition=precondition):
+        return {"message": "Employé modifié avec succès"}
+    else:
+        raise HTTPException(status_code=500, detail="Erreur lors de la sauvegarde")
 
 @app.delete("/employes/{matricule}")
-async def delete_employe(matricule: str):
+async def delete_employe(matricule: str, request: Request):
     """Supprimer un employé"""
-    employes = load_data(EMPLOYES_FILE, [])
-    initial_count = len(employes)
-    employes = [emp for emp in employes if emp.get("Matricule") != matricule]
-    
-    if len(employes) < initial_count:
-        if save_data(EMPLOYES_FILE, employes):
+    if matricule in await lecture(depot.employe_index):
+        precondition = if_match(request, lambda: employe_etag(depot.employe(matricule)))
+        if await ecriture(depot.delete_employe, matricule, precondition=precondition):
             return {"message": "Employé supprimé avec succès"}
         else:
             raise HTTPException(status_code=500, detail="Erreur lors de la sauvegarde")
@@ -235,16 +323,19 @@ async def delete_employe(matricule: str):
 
 # ---------------------- ENDPOINTS PRÉSENCES ----------------------
 @app.get("/presences/{year}/{month}")
-async def get_presences_month(year: int, month: int):
-    """Récupérer les présences pour un mois donné"""
-    presences = load_data(PRESENCES_FILE, {})
-    employes = load_data(EMPLOYES_FILE, [])
+def get_presences_month(year: int, month: int, request: Request, response: Response):
+    """Récupérer les présences pour un mois donné
     
-    # Filtrer les présences pour le mois demandé
-    month_presences = {}
-    for key, value in presences.items():
-        if f"_{year}_{month}_" in key:
-            month_presences[key] = value
+    L'ETag du mois sert pour If-None-Match (304) et pour If-Match à l'envoi.
+    """
+    etag = month_etag("presences", year, month)
+    if etag_match(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    employes = depot.data_copy("employes")
+    
+    # Lecture du mois demandé seulement (index en mémoire ou requête SQLite)
+    month_presences = depot.month_presences(year, month)
     
     return {
         "year": year,
@@ -254,53 +345,143 @@ async def get_presences_month(year: int, month: int):
     }
 
 @app.post("/presences/{year}/{month}")
-async def update_presences(year: int, month: int, presences: Dict[str, str]):
-    """Mettre à jour les présences pour un mois"""
-    all_presences = load_data(PRESENCES_FILE, {})
+async def update_presences(year: int, month: int, presences: Dict[str, str], request: Request):
+    """Mettre à jour les présences pour un mois
     
-    # Mettre à jour seulement les présences du mois
+    Avec If-Match (ETag de GET /presences), l'envoi est refusé (412) si le
+    mois a été modifié entre-temps.
+    """
+    # Ne garder que les clés qui appartiennent exactement au mois demandé
+    changes = []
     for key, value in presences.items():
-        if f"_{year}_{month}_" in key:
-            if value.strip():  # Si la valeur n'est pas vide
-                all_presences[key] = value
-            elif key in all_presences:
-                del all_presences[key]  # Supprimer si vide
-    
-    if save_data(PRESENCES_FILE, all_presences):
-        # Mettre à jour les soldes de congé
-        employes = load_data(EMPLOYES_FILE, [])
-        for emp in employes:
-            matricule = emp.get("Matricule", "")
-            solde_initial = parse_float(emp.get("Solde initial congé", 0))
-            
-            # Compter les jours de congé
-            total_conges = sum(
-                1 for key, val in all_presences.items()
-                if key.startswith(f"{matricule}_") and val == "c"
-            )
-            
-            # Nouveau solde = solde initial - tous ses congés
-            emp["Solde de congé"] = str(max(solde_initial - total_conges, 0))
-        
-        save_data(EMPLOYES_FILE, employes)
-        
+        parsed = parse_presence_key(key)
+        if parsed and parsed[1] == year and parsed[2] == month:
+            changes.append((*parsed, value.strip()))  # valeur vide -> suppression
+    
+    precondition = if_match(request, lambda: month_etag("presences", year, month))
+    # Cellules et soldes de congé des employés touchés, dans une seule transaction
+    if await ecriture(depot.patch_presences, changes, precondition=precondition):
         return {"message": "Présences mises à jour avec succès"}
     else:
         raise HTTPException(status_code=500, detail="Erreur lors de la sauvegarde")
 
+@app.patch("/presences/{year}/{month}")
+async def patch_presences(year: int, month: int, changes: List[Dict[str, Any]], request: Request, response: Response):
+    """Modifier quelques cellules de présence d'un mois
+    
+    Corps : [{"matricule": "CC0003", "jour": 4, "code": "p"}, ...] ; un code
+    vide efface la cellule. Tout le lot est validé avant d'écrire (422 avec
+    la liste des erreurs sinon), puis appliqué en une transaction avec le
+    solde de congé des seuls employés touchés. La réponse contient la
+    nouvelle version du mois (aussi en ETag), à renvoyer en If-Match.
+    """
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=422, detail="Mois invalide")
+    nb_jours = days_in_month(year, month)
+    index = await lecture(depot.employe_index)
+    cells = []
+    erreurs = []
+    for i, change in enumerate(changes):
+        matricule = str(change.get("matricule", "")).strip()
+        jour = change.get("jour")
+        code = str(change.get("code") or "").strip().lower()
+        if matricule not in index:
+            erreurs.append({"index": i, "detail": f"Matricule inconnu: {matricule!r}"})
+        elif not isinstance(jour, int) or isinstance(jour, bool) or not 1 <= jour <= nb_jours:
+            erreurs.append({"index": i, "detail": f"Jour invalide: {jour!r} (1 à {nb_jours})"})
+        elif code and code not in ALLOWED_PRESENCE_VALUES:
+            erreurs.append({"index": i, "detail": f"Code invalide: {code!r}"})
+        else:
+            cells.append((matricule, year, month, jour, code))
+    if erreurs:
+        raise HTTPException(status_code=422, detail=erreurs)
+    
+    precondition = if_match(request, lambda: month_etag("presences", year, month))
+    if not await ecriture(depot.patch_presences, cells, precondition=precondition):
+        raise HTTPException(status_code=500, detail="Erreur lors de la sauvegarde")
+    
+    etag = await lecture(month_etag, "presences", year, month)
+    response.headers["ETag"] = etag
+    
+    def soldes() -> Dict[str, str]:
+        employes = {matricule: depot.employe(matricule) for matricule in {c[0] for c in cells}}
+        return {matricule: emp.get("Solde de congé", "") for matricule, emp in employes.items() if emp is not None}
+    
+    return {
+        "version": etag,
+        "modifiees": len(cells),
+        "soldes": await lecture(soldes),
+    }
+
+@app.post("/presences/import")
+def import_presences(
+    fichier: UploadFile = File(..., description="Export de pointage .csv ou .xlsx"),
+    annee: Optional[int] = Query(None, description="Année (colonne Jour, ou limite l'import à ce mois)"),
+    mois: Optional[int] = Query(None, ge=1, le=12, description="Mois (avec annee)"),
+):
+    """Importer un export de pointage (CSV ou XLSX)
+    
+    Le fichier est lu ligne par ligne et écrit par lots (voir
+    import_presences.py) ; les soldes de congé des employés touchés sont
+    recalculés une fois à la fin. La réponse contient le bilan et le motif
+    des lignes refusées (agent inconnu, date ou code invalide).
+    """
+    # Fonction synchrone : FastAPI l'exécute dans un thread, l'import ne bloque pas les autres requêtes
+    if (annee is None) != (mois is None):
+        raise HTTPException(status_code=422, detail="annee et mois vont ensemble")
+    try:
+        rapport = importer_presences(depot, lire_lignes(fichier.file, fichier.filename or ""), annee, mois)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        fichier.file.close()
+    return rapport.as_dict()
+
 # ---------------------- ENDPOINTS SALAIRES ----------------------
 @app.get("/salaires/{year}/{month}")
-async def get_salaires_month(year: int, month: int):
-    """Récupérer les données de salaire pour un mois"""
-    salaires = load_data(SALAIRES_FILE, {})
-    employes = load_data(EMPLOYES_FILE, [])
-    presences = load_data(PRESENCES_FILE, {})
+def get_salaires_month(
+    year: int,
+    month: int,
+    request: Request,
+    response: Response,
+    resume: bool = Query(False, description="Heures du mois par employé au lieu de tout l'historique des présences"),
+):
+    """Récupérer les données de salaire pour un mois
+    
+    Avec `resume=true`, la réponse ne contient que les saisies du mois et les
+    heures du mois par employé. Un client qui renvoie l'ETag reçu
+    (If-None-Match) obtient un 304 tant que le mois n'a pas changé.
+    """
+    if resume:
+        etag = month_etag("salaires-resume", year, month)
+    else:
+        # La réponse complète contient tout l'historique : elle dépend de toutes les données
+        etag = make_etag("salaires", year, month, depot.data_version())
+        employes = depot.data_copy("employes")
+        presences = depot.data_copy("presences")
+    if etag_match(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     
     # Filtrer les salaires pour le mois demandé
-    month_salaires = {}
-    for key, value in salaires.items():
-        if f"_{year}_{month}" in key:
-            month_salaires[key] = value
+    month_salaires = depot.salaires_month(year, month)
+    
+    if resume:
+        # Heures de tous les employés en une réduction sur la matrice du mois
+        matricules = [emp.get("Matricule", "") for emp in depot.data_copy("employes")]
+        par_categorie = heures_matrice(matrice_codes(matricules, depot.month_codes(year, month), days_in_month(year, month)))
+        heures = {
+            matricule: {cat: int(valeurs[i]) for cat, valeurs in par_categorie.items()}
+            for i, matricule in enumerate(matricules)
+        }
+        return {
+            "year": year,
+            "month": month,
+            "salaires": month_salaires,
+            "heures": heures
+        }
     
     return {
         "year": year,
@@ -311,25 +492,189 @@ async def get_salaires_month(year: int, month: int):
     }
 
 @app.post("/salaires/{year}/{month}")
-async def update_salaires(year: int, month: int, salaires_data: Dict[str, Any]):
-    """Mettre à jour les données de salaire"""
-    all_salaires = load_data(SALAIRES_FILE, {})
+async def update_salaires(year: int, month: int, salaires_data: Dict[str, Any], request: Request):
+    """Mettre à jour les données de salaire
     
-    # Mettre à jour les salaires pour le mois
-    for key, value in salaires_data.items():
-        all_salaires[key] = value
-    
-    if save_data(SALAIRES_FILE, all_salaires):
+    If-Match accepte l'ETag de GET /salaires (avec ou sans `resume`).
+    """
+    precondition = if_match(
+        request,
+        lambda: month_etag("salaires-resume", year, month),
+        lambda: make_etag("salaires", year, month, depot.data_version()),
+    )
+    # Seules les saisies envoyées sont journalisées, sans réécrire tout salaires.json
+    if await ecriture(depot.update_salaires, salaires_data, precondition=precondition):
         return {"message": "Salaires mis à jour avec succès"}
     else:
         raise HTTPException(status_code=500, detail="Erreur lors de la sauvegarde")
 
+@app.post("/primes-production/{year}/{month}")
+def primes_production(
+    year: int,
+    month: int,
+    fichier: UploadFile = File(..., description="Export d'appels .csv ou .xlsx (Nom, Nombre d'appels, Log, TMC, ...)"),
+    prix_appel: float = Query(PRIX_APPEL, ge=0, description="Prix par appel (Ar)"),
+    prix_tmc: float = Query(PRIX_TMC, ge=0, description="Prix par TMC (Ar)"),
+    simulation: bool = Query(False, description="Calculer sans écrire les saisies"),
+):
+    """Calculer la prime de production depuis un export d'appels
+    
+    Appels et TMC sont cumulés par agent et par mois (voir
+    primes_production.py), puis le montant est écrit dans la saisie
+    "Prime de production" des employés reconnus.
+    """
+    # Fonction synchrone : FastAPI l'exécute dans un thread, le calcul ne bloque pas les autres requêtes
+    try:
+        synthese = agreger_appels(lire_lignes(fichier.file, fichier.filename or ""), year, month)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        fichier.file.close()
+    primes = primes_par_agent(synthese, depot.data_copy("employes"), Tarifs(prix_appel, prix_tmc))
+    ecrites = 0 if simulation else ecrire_primes(depot, primes)
+    return {
+        "lignes": synthese.lignes,
+        "ignorees": synthese.ignorees,
+        "ecrites": ecrites,
+        "inconnus": [p.agent for p in primes if not p.matricule],
+        "primes": [p.as_dict() for p in primes],
+    }
+
+# ---------------------- PAIE CALCULÉE ----------------------
+# Nombre de mois (année, mois, jours théoriques) gardés en cache
+PAIE_CACHE_TAILLE = 24
+_paie_cache: "OrderedDict[Tuple[int, int, int], Tuple[Any, List[Dict[str, Any]]]]" = OrderedDict()
+_paie_cache_lock = threading.Lock()
+
+def paie_mois(year: int, month: int, jours: int) -> List[Dict[str, Any]]:
+    """Lignes de paie d'un mois (colonnes SALAIRE_COLS), recalculées seulement si les données du mois ont changé"""
+    cle = (year, month, jours)
+    # Le droit et l'ancienneté dépendent aussi de la date du jour
+    version = (depot.month_version(year, month), datetime.date.today())
+    with _paie_cache_lock:
+        entree = _paie_cache.get(cle)
+        if entree and entree[0] == version:
+            _paie_cache.move_to_end(cle)
+            return entree[1]
+    
+    rows = paie_du_mois(depot, year, month, jours).as_dicts()
+    
+    with _paie_cache_lock:
+        _paie_cache[cle] = (version, rows)
+        _paie_cache.move_to_end(cle)
+        while len(_paie_cache) > PAIE_CACHE_TAILLE:
+            _paie_cache.popitem(last=False)
+    return rows
+
+@app.get("/paie/{year}/{month}")
+def get_paie_month(
+    year: int,
+    month: int,
+    jours: int = Query(JOURS_THEORIQUES_DEFAUT, ge=1, le=31, description="Jours de travail théoriques"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Colonnes à renvoyer, séparées par des virgules"),
+):
+    """Récupérer la paie calculée d'un mois (mêmes colonnes que la page Salaire)"""
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Mois invalide")
+    
+    colonnes = SALAIRE_COLS
+    if fields:
+        colonnes = [f.strip() for f in fields.split(",") if f.strip()]
+        inconnues = [f for f in colonnes if f not in SALAIRE_COLS]
+        if inconnues:
+            raise HTTPException(status_code=400, detail=f"Colonnes inconnues: {', '.join(inconnues)}")
+    
+    rows = paie_mois(year, month, jours)
+    page = rows[offset:offset + limit]
+    if colonnes is not SALAIRE_COLS:
+        page = [{col: row[col] for col in colonnes} for row in page]
+    
+    return {
+        "year": year,
+        "month": month,
+        "jours_theoriques": jours,
+        "total": len(rows),
+        "offset": offset,
+        "limit": limit,
+        "fields": list(colonnes),
+        "rows": page
+    }
+
+# ---------------------- FICHES DE PAIE ----------------------
+# PDF déjà rendus, réutilisés tant que les données de la fiche n'ont pas changé
+cache_fiches = CacheFiches(os.path.join(FICHES_DIR, "cache"))
+
+# Un seul pool de processus de rendu par worker, créé au démarrage (spawn :
+# pas de fork du serveur multithreadé) et partagé par toutes les requêtes.
+# Au plus FICHES_REQUETES_MAX générations s'y partagent les processus ; les
+# suivantes attendent leur tour avant de soumettre leurs rendus.
+FICHES_WORKERS = min(4, os.cpu_count() or 1)
+FICHES_REQUETES_MAX = 2
+_generations_fiches = threading.BoundedSemaphore(FICHES_REQUETES_MAX)
+_rendus_fiches = None
+
+@app.on_event("startup")
+async def startup():
+    """Démarre le pool de rendu des fiches de paie"""
+    global _rendus_fiches
+    _rendus_fiches = pool_rendu(FICHES_WORKERS)
+
+def fiches_dir(year: int, month: int) -> str:
+    return os.path.join(FICHES_DIR, f"{year}_{month:02d}")
+
+@app.post("/fiches/{year}/{month}")
+def generate_fiches(
+    year: int,
+    month: int,
+    jours: int = Query(JOURS_THEORIQUES_DEFAUT, ge=1, le=31, description="Jours de travail théoriques"),
+    matricules: Optional[List[str]] = Query(None, description="Limiter à ces employés"),
+    fusion: bool = Query(False, description="Un seul PDF pour tous les employés"),
+):
+    """Générer les fiches de paie PDF d'un mois
+    
+    La réponse est un flux JSON Lines : une ligne par fiche
+    ({"fait", "total", "matricule", "cache"}), puis une dernière ligne avec
+    les noms des fichiers, téléchargeables sur /fiches/{year}/{month}/{fichier}.
+    Seules les fiches dont les données ont changé sont rendues à nouveau.
+    """
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Mois invalide")
+    
+    fiches, empreintes = fiches_et_empreintes_du_mois(depot, year, month, jours, matricules)
+    if not fiches:
+        raise HTTPException(status_code=404, detail="Aucun employé trouvé")
+    dossier = fiches_dir(year, month)
+    os.makedirs(dossier, exist_ok=True)
+    fichier_fusion = os.path.join(dossier, f"fiches_{year}_{month:02d}.pdf") if fusion else None
+    
+    def progression():
+        with _generations_fiches:
+            for evt in generer_fiches(fiches, dossier, fichier_fusion, cache=cache_fiches, empreintes=empreintes,
+                                      pool=_rendus_fiches):
+                if "fichiers" in evt:
+                    evt = {**evt, "fichiers": [os.path.basename(f) for f in evt["fichiers"]]}
+                yield json.dumps(evt, ensure_ascii=False) + "\n"
+    
+    # Générateur synchrone : exécuté dans le pool de threads de Starlette
+    return StreamingResponse(progression(), media_type="application/x-ndjson")
+
+@app.get("/fiches/{year}/{month}/{fichier}")
+async def download_fiche(year: int, month: int, fichier: str):
+    """Télécharger une fiche de paie générée"""
+    chemin = os.path.join(fiches_dir(year, month), os.path.basename(fichier))
+    if not fichier.endswith(".pdf") or not os.path.isfile(chemin):
+        raise HTTPException(status_code=404, detail="Fiche non trouvée")
+    return FileResponse(chemin, media_type="application/pdf", filename=os.path.basename(chemin))
+
 # ---------------------- STATISTIQUES ----------------------
 @app.get("/statistiques")
-async def get_statistiques():
+def get_statistiques():
     """Récupérer des statistiques globales"""
-    employes = load_data(EMPLOYES_FILE, [])
-    presences = load_data(PRESENCES_FILE, {})
+    employes = depot.data_copy("employes")
     
     total_employes = len(employes)
     employes_actifs = [e for e in employes if calcul_droit_depuis_date(e.get("Date d'embauche", "")) == 1]
@@ -340,29 +685,36 @@ async def get_statistiques():
     return {
         "total_employes": total_employes,
         "employes_actifs": len(employes_actifs),
-        "total_presences": len(presences),
+        "total_presences": depot.presences_count(),
         "total_masse_salariale": total_salaires,
         "salaire_moyen": total_salaires / total_employes if total_employes > 0 else 0
     }
 
 # ---------------------- SANTÉ DE L'API ----------------------
 @app.get("/health")
-async def health_check():
+def health_check():
     """Vérifier la santé de l'API"""
-    employes = load_data(EMPLOYES_FILE, [])
-    presences = load_data(PRESENCES_FILE, {})
-    salaires = load_data(SALAIRES_FILE, {})
+    employes = depot.employes.get()
+    salaires = depot.salaires.get()
     
     return {
         "status": "healthy",
         "timestamp": datetime.datetime.now().isoformat(),
         "data": {
             "employes_count": len(employes),
-            "presences_count": len(presences),
+            "presences_count": depot.presences_count(),
             "salaires_count": len(salaires)
         }
     }
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Intègre le journal aux fichiers de données (stockage JSON), ferme le stockage et le pool de rendu"""
+    await ecriture(depot.close)
+    _ecritures.shutdown()
+    if _rendus_fiches is not None:
+        _rendus_fiches.shutdown(cancel_futures=True)
+
 # ---------------------- DÉMARRAGE ----------------------
 if __name__ == "__main__":
     import uvicorn
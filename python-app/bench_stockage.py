@@ -0,0 +1,234 @@
+# python-app/bench_stockage.py
+"""
+Banc d'essai : latence des lectures pendant de grosses écritures.
+
+Des threads de lecture mesurent la latence de chaque lecture, d'abord seuls
+puis pendant qu'un thread d'écriture envoie de gros lots de présences (et, en
+local, des saisies et des employés) et force des compactages (réécriture
+complète de presences.json). Les percentiles des deux phases sont affichés
+côte à côte : p99 doit rester du même ordre pendant les écritures.
+
+Une partie des lectures parcourt les données (saisies d'un mois, présences
+d'un mois, filtre sur Compagne) : une lecture qui voit les données changer
+pendant son parcours lève une exception, comptée dans la colonne « erreurs »,
+qui doit rester à 0.
+
+Deux modes :
+    python bench_stockage.py                  # dépôt JSON en mémoire, données générées
+    python bench_stockage.py --url http://localhost:8000 --annee 2025 --mois 10
+                                              # API en marche (lectures HTTP, écritures POST /presences)
+
+Le mode HTTP écrit dans les données de l'API visée : à lancer sur une copie.
+"""
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, List, Tuple
+
+from presence_index import days_in_month, presence_key
+from storage import DataRepository, save_data
+
+CODES = ("p", "p", "p", "n", "a", "c", "f")
+
+
+def percentiles(latences: List[float], erreurs: int = 0) -> Dict[str, float]:
+    if not latences:
+        return {"n": 0, "erreurs": erreurs, "p50": 0.0, "p99": 0.0, "max": 0.0}
+    latences = sorted(latences)
+    return {
+        "n": len(latences),
+        "erreurs": erreurs,
+        "p50": latences[len(latences) // 2] * 1000,
+        "p99": latences[min(len(latences) - 1, int(len(latences) * 0.99))] * 1000,
+        "max": latences[-1] * 1000,
+    }
+
+
+def mesurer(lectures: List[Callable[[], None]], lecteurs: int, duree: float,
+            ecrire: Callable[[], None] = None) -> Tuple[Dict[str, float], int]:
+    """Lance `lecteurs` threads de lecture pendant `duree` s (et un thread d'écriture si `ecrire`)."""
+    fin = time.monotonic() + duree
+    latences: List[float] = []
+    erreurs: List[str] = []
+    ecritures = [0]
+    verrou = threading.Lock()
+
+    def lire():
+        rng = random.Random()
+        locales = []
+        while time.monotonic() < fin:
+            lecture = rng.choice(lectures)
+            debut = time.perf_counter()
+            try:
+                lecture()
+            except Exception as e:
+                with verrou:
+                    erreurs.append(repr(e))
+                continue
+            locales.append(time.perf_counter() - debut)
+        with verrou:
+            latences.extend(locales)
+
+    def ecrire_en_boucle():
+        while time.monotonic() < fin:
+            ecrire()
+            ecritures[0] += 1
+
+    threads = [threading.Thread(target=lire) for _ in range(lecteurs)]
+    if ecrire:
+        threads.append(threading.Thread(target=ecrire_en_boucle))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for erreur in sorted(set(erreurs)):
+        print(f"❌ {erreurs.count(erreur)} x {erreur}")
+    return percentiles(latences, len(erreurs)), ecritures[0]
+
+
+def donnees_generees(dossier: str, employes: int, annee: int) -> List[str]:
+    """Crée employes.json et une année de presences.json et de salaires.json dans `dossier`."""
+    rng = random.Random(1)
+    matricules = [f"CC{i:05d}" for i in range(employes)]
+    save_data(f"{dossier}/employes.json", [
+        {"Matricule": m, "Nom": f"NOM{i}", "Prénom": f"Prénom {i}", "Compagne": f"C{i % 5}",
+         "Solde initial congé": "30", "Salaire de base": "250000", "Date d'embauche": "01/01/2020"}
+        for i, m in enumerate(matricules)
+    ])
+    presences = {}
+    for mois in range(1, 13):
+        for jour in range(1, days_in_month(annee, mois) + 1):
+            for m in matricules:
+                presences[presence_key(m, annee, mois, jour)] = rng.choice(CODES)
+    save_data(f"{dossier}/presences.json", presences)
+    save_data(f"{dossier}/salaires.json", {
+        f"{m}_{annee}_{mois}": {"Social": 15000.0, "Prime de production": float(rng.randint(0, 50) * 1000)}
+        for mois in range(1, 13) for m in matricules
+    })
+    return matricules
+
+
+def banc_depot(args):
+    dossier = tempfile.mkdtemp(prefix="bench_stockage_")
+    try:
+        print(f"📁 Génération : {args.employes} employé(s), une année de présences...")
+        matricules = donnees_generees(dossier, args.employes, args.annee)
+        depot = DataRepository(dossier)
+        print(f"   {depot.presences_count()} cellule(s)")
+        rng = random.Random(2)
+
+        def filtre_compagne():
+            index = depot.employe_index()
+            with depot.reading():
+                return [index.employes[i]["Matricule"] for i in index.positions(Compagne=f"C{rng.randrange(5)}")]
+
+        lectures = [
+            lambda: depot.employe(rng.choice(matricules)),
+            lambda: depot.month_codes(args.annee, rng.randint(1, 12)).get(rng.choice(matricules)),
+            lambda: depot.month_version(args.annee, rng.randint(1, 12)),
+            lambda: depot.leave_ledger().count(rng.choice(matricules)),
+            # Lectures qui parcourent les données pendant qu'elles sont modifiées
+            lambda: depot.salaires_month(args.annee, rng.randint(1, 12)),
+            lambda: depot.month_presences(args.annee, rng.randint(1, 12)),
+            filtre_compagne,
+        ]
+        for lecture in lectures:  # chargement initial hors mesure
+            lecture()
+        n = [0]
+
+        def ecrire():
+            mois = rng.randint(1, 12)
+            lot = [(rng.choice(matricules), args.annee, mois, rng.randint(1, 28), rng.choice(CODES))
+                   for _ in range(args.lot)]
+            depot.patch_presences(lot)
+            # Petites écritures de saisies avec de nouvelles clés : le dictionnaire
+            # change de taille pendant que les lectures le parcourent
+            for k in range(10):
+                depot.update_salaires({f"S{n[0]}-{k}_{args.annee}_{mois}": {"Social": 15000.0}})
+            # Ajout puis suppression : la liste des employés change de taille
+            depot.upsert_employe({"Matricule": f"TMP{n[0]}", "Nom": "TEMPORAIRE", "Compagne": f"C{n[0] % 5}"})
+            depot.delete_employe(f"TMP{n[0] - 1}")
+            n[0] += 1
+            if n[0] % args.compact_every == 0:
+                depot.compact()
+
+        seules, _ = mesurer(lectures, args.lecteurs, args.duree)
+        avec, ecritures = mesurer(lectures, args.lecteurs, args.duree, ecrire)
+        depot.close()
+        return afficher(seules, avec, ecritures, f"lot(s) de {args.lot} cellules, compactage tous les {args.compact_every}")
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+
+def banc_http(args):
+    def get(chemin: str):
+        def lecture():
+            with urllib.request.urlopen(args.url + chemin) as r:
+                r.read()
+        return lecture
+
+    with urllib.request.urlopen(f"{args.url}/employes?fields=Matricule") as r:
+        matricules = [e["Matricule"] for e in json.load(r)]
+    if not matricules:
+        raise SystemExit("Aucun employé dans l'API visée")
+    rng = random.Random(2)
+    lectures = [get("/health")] + [get(f"/employes/{m}") for m in matricules[:50]] + [
+        get(f"/presences/{args.annee}/{args.mois}"),
+        get(f"/salaires/{args.annee}/{args.mois}?resume=true"),
+        get("/employes?compagne=C1&fields=Matricule"),
+    ]
+
+    def ecrire():
+        corps = {
+            presence_key(rng.choice(matricules), args.annee, args.mois, rng.randint(1, 28)): rng.choice(CODES)
+            for _ in range(args.lot)
+        }
+        requete = urllib.request.Request(
+            f"{args.url}/presences/{args.annee}/{args.mois}", data=json.dumps(corps).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(requete) as r:
+            r.read()
+
+    seules, _ = mesurer(lectures, args.lecteurs, args.duree)
+    avec, ecritures = mesurer(lectures, args.lecteurs, args.duree, ecrire)
+    return afficher(seules, avec, ecritures, f"POST /presences de {args.lot} cellules")
+
+
+def afficher(seules: Dict[str, float], avec: Dict[str, float], ecritures: int, detail: str) -> int:
+    """Affiche les deux phases ; renvoie le nombre de lectures en erreur."""
+    print(f"{'':<24}{'lectures':>10}{'erreurs':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'max (ms)':>10}")
+    for nom, p in (("sans écriture", seules), ("pendant les écritures", avec)):
+        print(f"{nom:<24}{p['n']:>10}{p['erreurs']:>10}{p['p50']:>10.3f}{p['p99']:>10.3f}{p['max']:>10.1f}")
+    print(f"✍️  {ecritures} écriture(s) : {detail}")
+    return int(seules["erreurs"] + avec["erreurs"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des lectures pendant de grosses écritures")
+    parser.add_argument("--url", help="API à mesurer (sinon : dépôt JSON local avec données générées)")
+    parser.add_argument("--annee", type=int, default=2025)
+    parser.add_argument("--mois", type=int, default=10, help="Mois écrit en mode HTTP")
+    parser.add_argument("--employes", type=int, default=1000, help="Employés générés (mode local)")
+    parser.add_argument("--lecteurs", type=int, default=4, help="Threads de lecture")
+    parser.add_argument("--duree", type=float, default=5.0, help="Durée de chaque phase (s)")
+    parser.add_argument("--lot", type=int, default=2000, help="Cellules par écriture")
+    parser.add_argument("--compact-every", type=int, default=5, help="Compactage forcé toutes les N écritures (mode local)")
+    args = parser.parse_args()
+
+    if args.url:
+        args.url = args.url.rstrip("/")
+        erreurs = banc_http(args)
+    else:
+        erreurs = banc_depot(args)
+    if erreurs:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,26 +2,38 @@ import sys
 import os
 import json
 import datetime
-from typing import Any, Dict, List, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 from PyQt6.QtWidgets import QSpinBox
 
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QTableWidget, QTableWidgetItem, QMessageBox, QLineEdit, QScrollArea,
-    QStackedWidget, QComboBox, QFileDialog, QGridLayout
+    QStackedWidget, QComboBox, QFileDialog, QGridLayout, QProgressDialog, QTableView
 )
-from PyQt6.QtCore import Qt, QTimer, QDateTime, QLocale
+from PyQt6.QtCore import Qt, QTimer, QDateTime, QLocale, QAbstractTableModel, QModelIndex, QObject, pyqtSignal
 from PyQt6.QtGui import QColor
 
+import data_codec
+from config import Config
+from conges import LeaveLedger
+from employe_index import EmployeIndex
 # ---- PDF (fiche de paie)
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table as RLTable, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
+from fiche_paie import (
+    FICHE_COLONNES, FICHE_ROWS, IRSA_LIGNES, CacheFiches, empreinte_fiche, generer_fiches, lignes_fiche
+)
+from paie import (
+    JOURS_THEORIQUES_DEFAUT, MANUAL_COLS, SALAIRE_COLS, calcul_anciennete, calcul_droit_depuis_date, calcul_paie,
+    heures_depuis_codes, parse_float,
+)
+from paie_lot import ResumeHeures
+from presence_index import ALLOWED_PRESENCE_VALUES, MoisPresence, PresenceIndex, days_in_month
+from storage import atomic_write_data
 
 EMPLOYES_FILE = "employes.json"
 PRESENCES_FILE = "presences.json"
 SALAIRES_FILE = "salaires.json"  # saisies manuelles (primes, social, avances, etc.)
+FICHES_CACHE_DIR = "cache_fiches"  # PDF des fiches déjà rendues
 
 champs = [
     "Matricule", "Nom", "Prénom", "Adresse", "N° Téléphone", "Fonction",
@@ -32,20 +44,7 @@ champs = [
     "Adresse du contact d'urgence", "Téléphone contact urgence"
 ]
 
-ALLOWED_PRESENCE_VALUES = {"p", "n", "a", "c", "m", "f"}
-
 # ---------------------- OUTILS ----------------------
-def parse_float(s: Any, default: float = 0.0) -> float:
-    try:
-        if s is None:
-            return default
-        if isinstance(s, (int, float)):
-            return float(s)
-        s = str(s).replace(" ", "").replace("\u202f", "").replace(",", ".")
-        return float(s)
-    except Exception:
-        return default
-
 def parse_int(s: Any, default: int = 0) -> int:
     try:
         if s is None:
@@ -57,45 +56,6 @@ def parse_int(s: Any, default: int = 0) -> int:
     except Exception:
         return default
 
-def _parse_date_embauche(s: str):
-    if not s:
-        return None
-    s = s.strip()
-    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
-        try:
-            return datetime.datetime.strptime(s, fmt).date()
-        except Exception:
-            pass
-    return None
-
-def calcul_anciennete(date_embauche_str: str) -> str:
-    d = _parse_date_embauche(date_embauche_str)
-    if not d:
-        return ""
-    today = datetime.date.today()
-    years = today.year - d.year - ((today.month, today.day) < (d.month, d.day))
-    months = (today.month - d.month) % 12
-    return f"{years} ans {months} mois"
-
-def calcul_droit_depuis_date(date_embauche_str: str) -> int:
-    d = _parse_date_embauche(date_embauche_str)
-    if not d:
-        return 0
-    return 1 if (datetime.date.today() - d).days > 365 else 0
-
-def anciennete_ans_depuis_date(date_embauche_str: str) -> int:
-    d = _parse_date_embauche(date_embauche_str or "")
-    if not d:
-        return 0
-    today = datetime.date.today()
-    return today.year - d.year - ((today.month, today.day) < (d.month, d.day))
-
-def yes_flag(s: Any) -> int:
-    if isinstance(s, (int, float)):
-        return 1 if s != 0 else 0
-    val = str(s).strip().lower()
-    return 1 if val in {"1", "oui", "true", "vrai", "o", "y"} else 0
-
 def parse_month(s: str) -> int:
     """Accepte '3', '03', 'mars', 'Mars'... -> 3 ; retourne 0 si invalide."""
     if not s:
@@ -140,10 +100,15 @@ class CustomLineEdit(QLineEdit):
             super().keyPressEvent(event)
 
 class PageEMP(QWidget):
-    def __init__(self, go_home_callback, employes: List[Dict[str, str]]):
+    def __init__(self, go_home_callback, employes: List[Dict[str, str]], on_change: Callable[[str], None] | None = None,
+                 employe_index: EmployeIndex | None = None):
         super().__init__()
         self.employes = employes
+        # Index partagé avec les autres pages : toute modification de la liste passe par lui
+        self.employe_index = employe_index if employe_index is not None else EmployeIndex(employes)
         self.go_home_callback = go_home_callback
+        # Prévient la fenêtre principale qu'un fichier de données a changé ("employes", ...)
+        self.on_change = on_change or (lambda name: None)
         self.inputs_ajouter: Dict[str, QLineEdit] = {}
         self.init_ui()
 
@@ -205,7 +170,7 @@ class PageEMP(QWidget):
         btn_add.clicked.connect(self.ajouter_employe)
         btn_search.clicked.connect(self.rechercher_employe)
         btn_delete.clicked.connect(self.supprimer_employe)
-        btn_list.clicked.connect(self.afficher_liste)
+        btn_list.clicked.connect(lambda: self.afficher_liste())
         btn_modify.clicked.connect(self._modifier_depuis_formulaire)
         btn_home.clicked.connect(self.go_home_callback)
 
@@ -215,7 +180,7 @@ class PageEMP(QWidget):
 
         self.search_input = QLineEdit()
         self.search_result = QLabel("")
-        main_layout.addWidget(QLabel("Recherche par Matricule :"))
+        main_layout.addWidget(QLabel("Recherche (matricule, nom, prénom, téléphone, campagne...) :"))
         main_layout.addWidget(self.search_input)
         main_layout.addWidget(self.search_result)
         self.search_input.returnPressed.connect(self.rechercher_employe)
@@ -244,10 +209,7 @@ class PageEMP(QWidget):
         return {champ: self.inputs_ajouter[champ].text().strip() for champ in champs}
    
     def _find_emp_index_by_matricule(self, matricule: str) -> int:
-        for i, emp in enumerate(self.employes):
-            if emp.get("Matricule") == matricule:
-                return i
-        return -1
+        return self.employe_index.position(matricule)
 
     def ajouter_employe(self):
         data = self._build_form_data()
@@ -256,53 +218,63 @@ class PageEMP(QWidget):
             QMessageBox.warning(self, "Erreur", "Veuillez remplir tous les champs obligatoires.")
             return
 
-        if any(emp.get("Matricule") == data["Matricule"] for emp in self.employes):
+        if data["Matricule"] in self.employe_index:
             QMessageBox.warning(self, "Erreur", "Matricule déjà utilisé.")
             return
 
-        self.employes.append(data)
+        self.employe_index.add(data)
+        self.on_change("employes")
         QMessageBox.information(self, "Succès", "Employé ajouté.")
 
         for champ in champs:
             self.inputs_ajouter[champ].clear()
 
     def rechercher_employe(self):
-        matricule = self.search_input.text().strip()
-        if not matricule:
-            self.search_result.setText("Veuillez entrer un matricule.")
+        texte = self.search_input.text().strip()
+        if not texte:
+            self.search_result.setText("Veuillez entrer un matricule ou un nom.")
             return
-        for emp in self.employes:
-            if emp.get("Matricule") == matricule:
-                self.search_result.setText("\n".join(f"{k}: {v}" for k, v in emp.items()))
-                for c in champs:
-                    self.inputs_ajouter[c].setText(emp.get(c, ""))
-                self._auto_fill_calculated_fields()
+        # Matricule exact, sinon recherche plein texte (préfixes, sans accents)
+        emp = self.employe_index.get(texte)
+        if emp is None:
+            resultats = self.employe_index.rechercher(texte, limit=200)
+            if not resultats:
+                self.search_result.setText("Employé non trouvé.")
+                return
+            if len(resultats) > 1:
+                self.search_result.setText(f"{len(resultats)} employés trouvés (du plus pertinent au moins pertinent).")
+                self.afficher_liste(resultats)
                 return
-        self.search_result.setText("Employé non trouvé.")
+            emp = resultats[0]
+        self.search_result.setText("\n".join(f"{k}: {v}" for k, v in emp.items()))
+        for c in champs:
+            self.inputs_ajouter[c].setText(emp.get(c, ""))
+        self._auto_fill_calculated_fields()
 
     def supprimer_employe(self):
         matricule = self.delete_input.text().strip()
         if not matricule:
             QMessageBox.warning(self, "Erreur", "Veuillez entrer un matricule à supprimer.")
             return
-        for i, e in enumerate(self.employes):
-            if e.get("Matricule") == matricule:
-                choix = QMessageBox.question(
-                    self, "Confirmation", f"Supprimer l'employé {matricule} ?",
-                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-                )
-                if choix == QMessageBox.StandardButton.Yes:
-                    self.employes.pop(i)
-                    QMessageBox.information(self, "Succès", "Employé supprimé.")
-                return
-        QMessageBox.warning(self, "Erreur", "Employé non trouvé.")
+        if matricule not in self.employe_index:
+            QMessageBox.warning(self, "Erreur", "Employé non trouvé.")
+            return
+        choix = QMessageBox.question(
+            self, "Confirmation", f"Supprimer l'employé {matricule} ?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+        )
+        if choix == QMessageBox.StandardButton.Yes:
+            self.employe_index.remove(matricule)
+            self.on_change("employes")
+            QMessageBox.information(self, "Succès", "Employé supprimé.")
 
-    def afficher_liste(self):
+    def afficher_liste(self, employes: List[Dict[str, str]] | None = None):
+        employes = self.employes if employes is None else employes
         self.table.clear()
         self.table.setColumnCount(len(champs))
         self.table.setHorizontalHeaderLabels(champs)
-        self.table.setRowCount(len(self.employes))
-        for r, emp in enumerate(self.employes):
+        self.table.setRowCount(len(employes))
+        for r, emp in enumerate(employes):
             for c, champ in enumerate(champs):
                 self.table.setItem(r, c, QTableWidgetItem(emp.get(champ, "")))
         self.table.resizeColumnsToContents()
@@ -327,18 +299,176 @@ class PageEMP(QWidget):
             QMessageBox.warning(self, "Erreur", f"Employé {m} introuvable.")
             return False
 
-        self.employes[idx] = data
+        self.employe_index.replace(m, data)
+        self.on_change("employes")
         QMessageBox.information(self, "Succès", f"Employé {m} modifié.")
         self.afficher_liste()
         return True
 
 # ---------------------- UI: PRÉSENCES ----------------------
+PRESENCE_COLORS = {
+    "p": QColor("#a5d6a7"),
+    "n": QColor("#80deea"),
+    "a": QColor("#ef9a9a"),
+    "c": QColor("#fff59d"),
+    "m": QColor("#ce93d8"),
+    "f": QColor("#e0e0e0"),
+}
+
+# Colonnes de totaux : (titre, catégorie de heures_depuis_codes)
+PRESENCE_TOTALS = [
+    ("Présence (p)", "presence"), ("Nuit (n)", "nuit"), ("Absence (a)", "absence"),
+    ("Congés (c)", "conge"), ("Férié (m)", "ferie"), ("Formation (f)", "formation"),
+]
+
+
+class PresenceTableModel(QAbstractTableModel):
+    """Calendrier d'un mois (employés x jours) lu dans l'index des présences.
+
+    Les cellules sont lues à la demande par la vue (seulement celles
+    affichées) ; les totaux par ligne sont calculés une fois puis gardés en
+    cache. Les saisies restent en attente jusqu'à `take_pending()`.
+    """
+
+    def __init__(self, employes: List[Dict[str, str]], index: PresenceIndex, resume: ResumeHeures, parent=None):
+        super().__init__(parent)
+        self.employes = employes
+        self.presence_index = index
+        self.resume = resume
+        self.year = self.month = 0
+        self.days = 0
+        self._mois = MoisPresence(1970, 1)
+        # (matricule, jour) -> code saisi : une saisie reste à son employé si la liste change
+        self._pending: Dict[tuple, str] = {}
+        self._totals: Dict[int, List[int]] = {}
+
+    # ---------- Mois affiché ----------
+    def set_month(self, year: int, month: int):
+        self.beginResetModel()
+        self.year, self.month = year, month
+        self.days = days_in_month(year, month)
+        self._pending = {}
+        self._reload()
+        self.endResetModel()
+
+    def refresh(self):
+        """Relit l'index et la liste des employés.
+
+        Les saisies en attente sont gardées, sauf celles des employés supprimés entre-temps.
+        """
+        self.beginResetModel()
+        matricules = {e.get("Matricule", "") for e in self.employes}
+        self._pending = {key: code for key, code in self._pending.items() if key[0] in matricules}
+        self._reload()
+        self.endResetModel()
+
+    def _reload(self):
+        self._mois = self.presence_index.month(self.year, self.month)
+        self._totals = {}
+
+    def take_pending(self) -> List[tuple]:
+        """Saisies en attente [(matricule, jour, code)] des employés de la liste, retirées du modèle."""
+        matricules = {e.get("Matricule", "") for e in self.employes}
+        pending = [(m, day, code) for (m, day), code in self._pending.items() if m in matricules]
+        self._pending = {}
+        return pending
+
+    # ---------- Lecture ----------
+    def code(self, row: int, day: int) -> str:
+        matricule = self.employes[row].get("Matricule", "")
+        if (matricule, day) in self._pending:
+            return self._pending[(matricule, day)]
+        return self._mois.get_code(matricule, day)
+
+    def row_totals(self, row: int) -> List[int]:
+        if row not in self._totals:
+            if row == len(self.employes):
+                per_row = [self.row_totals(r) for r in range(len(self.employes))]
+                self._totals[row] = [sum(col) for col in zip(*per_row)] if per_row else [0] * len(PRESENCE_TOTALS)
+            elif any(m == self.employes[row].get("Matricule", "") for m, _ in self._pending):
+                hrs = heures_depuis_codes(self.code(row, d) for d in range(1, self.days + 1))
+                self._totals[row] = [hrs[cat] for _, cat in PRESENCE_TOTALS]
+            else:
+                if not self._totals:
+                    # Premier total demandé : cache des heures rempli pour tout le mois en une passe
+                    self.resume.heures_mois([e.get("Matricule", "") for e in self.employes], self.year, self.month)
+                hrs = self.resume.heures(self.employes[row].get("Matricule", ""), self.year, self.month)
+                self._totals[row] = [hrs[cat] for _, cat in PRESENCE_TOTALS]
+        return self._totals[row]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.employes) + 1
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else 1 + self.days + len(PRESENCE_TOTALS)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        r, c = index.row(), index.column()
+        total_row = r >= len(self.employes)
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if c == 0:
+                if total_row:
+                    return "Total"
+                emp = self.employes[r]
+                return f"{emp.get('Matricule', '')} - {emp.get('Prénom', '')}"
+            if c <= self.days:
+                return "" if total_row else self.code(r, c)
+            return str(self.row_totals(r)[c - self.days - 1])
+        if role == Qt.ItemDataRole.BackgroundRole and not total_row and 1 <= c <= self.days:
+            return PRESENCE_COLORS.get(self.code(r, c))
+        if role == Qt.ItemDataRole.TextAlignmentRole and 1 <= c <= self.days:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Vertical:
+            return str(section + 1)
+        if section == 0:
+            return "Employé"
+        if section <= self.days:
+            jours = ["L", "M", "M", "J", "V", "S", "D"]
+            return f"{jours[datetime.date(self.year, self.month, section).weekday()]}\n{section}"
+        return PRESENCE_TOTALS[section - self.days - 1][0]
+
+    # ---------- Saisie ----------
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.isValid() and index.row() < len(self.employes) and 1 <= index.column() <= self.days:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index: QModelIndex, value: Any, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        if role != Qt.ItemDataRole.EditRole or not (self.flags(index) & Qt.ItemFlag.ItemIsEditable):
+            return False
+        r, day = index.row(), index.column()
+        self._pending[(self.employes[r].get("Matricule", ""), day)] = str(value or "").strip().lower()
+        # Seuls les totaux de la ligne et la ligne Total sont à recalculer
+        self._totals.pop(r, None)
+        self._totals.pop(len(self.employes), None)
+        first_total = self.days + 1
+        last = self.columnCount() - 1
+        self.dataChanged.emit(index, index)
+        self.dataChanged.emit(self.index(r, first_total), self.index(r, last))
+        self.dataChanged.emit(self.index(len(self.employes), first_total), self.index(len(self.employes), last))
+        return True
+
+
 class PagePresence(QWidget):
-    def __init__(self, go_home_callback, employes: List[Dict[str, str]], presence_data: Dict[str, str]):
+    def __init__(self, go_home_callback, employes: List[Dict[str, str]], presences: PresenceIndex,
+                 on_change: Callable[[str], None] | None = None, resume: ResumeHeures | None = None):
         super().__init__()
         self.go_home_callback = go_home_callback
         self.employes = employes
-        self.presence_data = presence_data
+        # Présences partagées avec les autres pages (une matrice par mois)
+        self.index = presences
+        self.resume = resume if resume is not None else ResumeHeures(presences)
+        self.on_change = on_change or (lambda name: None)
+        # Jours de congé par matricule, mis à jour cellule par cellule
+        self.conges = LeaveLedger.from_index(presences)
         self.init_ui()
 
     def init_ui(self):
@@ -360,7 +490,12 @@ class PagePresence(QWidget):
         self.btn_prev_month.clicked.connect(self.prev_month)
         self.btn_next_month.clicked.connect(self.next_month)
 
-        self.table = QTableWidget()
+        self.model = PresenceTableModel(self.employes, self.index, self.resume, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # Largeurs fixes : pas de parcours de toutes les cellules (resizeColumnsToContents)
+        self.table.horizontalHeader().setDefaultSectionSize(36)
+        self.table.verticalHeader().setDefaultSectionSize(24)
         layout.addWidget(self.table)
 
         btns = QHBoxLayout()
@@ -382,81 +517,26 @@ class PagePresence(QWidget):
         self.current_month = today.month
         self.update_calendar()
 
+    def showEvent(self, event):
+        # La liste des employés a pu changer depuis une autre page
+        self.model.refresh()
+        super().showEvent(event)
+
     def _mois_label_fr(self, year: int, month: int) -> str:
         ql = QLocale(QLocale.Language.French, QLocale.Country.France)
         return f"{ql.monthName(month).capitalize()} {year}"
 
     def update_calendar(self):
-        fd = datetime.date(self.current_year, self.current_month, 1)
         self.label_mois.setText(self._mois_label_fr(self.current_year, self.current_month))
-        nm = datetime.date(self.current_year + (self.current_month // 12), (self.current_month % 12) + 1, 1)
-        days_in_month = (nm - fd).days
-        jours = ["L", "M", "M", "J", "V", "S", "D"]
+        self.model.set_month(self.current_year, self.current_month)
+        self.table.setColumnWidth(0, 180)
+        for c in range(self.model.days + 1, self.model.columnCount()):
+            self.table.setColumnWidth(c, 90)
 
-        self.table.clear()
-        headers = ["Employé"] + [
-            f"{jours[(fd + datetime.timedelta(days=i)).weekday()]}\n{(fd + datetime.timedelta(days=i)).day}"
-            for i in range(days_in_month)
-        ] + ["Présence (p)", "Nuit (n)", "Absence (a)", "Congés (c)", "Férié (m)", "Formation (f)"]
-        self.table.setColumnCount(len(headers))
-        self.table.setHorizontalHeaderLabels(headers)
-        self.table.setRowCount(len(self.employes) + 1)
-
-        total_pres = total_nuit = total_abs = total_cong = total_ferie = total_form = 0
-
-        for r, emp in enumerate(self.employes):
-            self.table.setItem(r, 0, QTableWidgetItem(f"{emp.get('Matricule', '')} - {emp.get('Prénom', '')}"))
-            pres = nuit = abs_ = cong = ferie = form = 0
-            for d in range(days_in_month):
-                key = f"{emp.get('Matricule','')}_{self.current_year}_{self.current_month}_{d+1}"
-                val = self.presence_data.get(key, "").lower()
-                cell = QTableWidgetItem(val)
-                cell.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                if val == "p":
-                    cell.setBackground(QColor("#a5d6a7"))
-                    pres += 8
-                elif val == "n":
-                    cell.setBackground(QColor("#80deea"))
-                    pres += 8
-                    nuit += 8
-                elif val == "a":
-                    cell.setBackground(QColor("#ef9a9a"))
-                    abs_ += 8
-                elif val == "c":
-                    cell.setBackground(QColor("#fff59d"))
-                    cong += 8
-                elif val == "m":
-                    cell.setBackground(QColor("#ce93d8"))
-                    ferie += 8
-                    pres += 8
-                elif val == "f":
-                    cell.setBackground(QColor("#e0e0e0"))
-                    form += 8
-                self.table.setItem(r, d + 1, cell)
-            self.table.setItem(r, days_in_month + 1, QTableWidgetItem(str(pres)))
-            self.table.setItem(r, days_in_month + 2, QTableWidgetItem(str(nuit)))
-            self.table.setItem(r, days_in_month + 3, QTableWidgetItem(str(abs_)))
-            self.table.setItem(r, days_in_month + 4, QTableWidgetItem(str(cong)))
-            self.table.setItem(r, days_in_month + 5, QTableWidgetItem(str(ferie)))
-            self.table.setItem(r, days_in_month + 6, QTableWidgetItem(str(form)))
-
-            total_pres += pres
-            total_nuit += nuit
-            total_abs += abs_
-            total_cong += cong
-            total_ferie += ferie
-            total_form += form
-
-        r = len(self.employes)
-        self.table.setItem(r, 0, QTableWidgetItem("Total"))
-        self.table.setItem(r, days_in_month + 1, QTableWidgetItem(str(total_pres)))
-        self.table.setItem(r, days_in_month + 2, QTableWidgetItem(str(total_nuit)))
-        self.table.setItem(r, days_in_month + 3, QTableWidgetItem(str(total_abs)))
-        self.table.setItem(r, days_in_month + 4, QTableWidgetItem(str(total_cong)))
-        self.table.setItem(r, days_in_month + 5, QTableWidgetItem(str(total_ferie)))
-        self.table.setItem(r, days_in_month + 6, QTableWidgetItem(str(total_form)))
-
-        self.table.resizeColumnsToContents()
+    def _set_presence(self, matricule: str, year: int, month: int, day: int, val: str):
+        """Écrit une cellule dans l'index et le compteur de congés ('' = suppression)."""
+        old = self.index.set(matricule, year, month, day, val)
+        self.conges.apply(matricule, old, val)
 
     def prev_month(self):
         self.current_month -= 1
@@ -474,41 +554,19 @@ class PagePresence(QWidget):
 
 
     def save_presence(self):
-        fd = datetime.date(self.current_year, self.current_month, 1)
-        nm = datetime.date(
-            self.current_year + (self.current_month // 12),
-            (self.current_month % 12) + 1,
-            1
-        )
-        days_in_month = (nm - fd).days
-
-        # Enregistrement des valeurs de la table dans presence_data
-        for r, emp in enumerate(self.employes):
-            matricule = emp.get("Matricule", "")
-            for d in range(days_in_month):
-                item = self.table.item(r, d + 1)
-                if item:
-                    val = item.text().lower()
-                    key = f"{matricule}_{self.current_year}_{self.current_month}_{d+1}"
-                    if val in ALLOWED_PRESENCE_VALUES:
-                        self.presence_data[key] = val
-                    else:
-                        self.presence_data.pop(key, None)
-                        item.setText("")
-
-        # Mise à jour du solde de congé pour chaque employé individuellement
-        for emp in self.employes:
-            matricule = emp.get("Matricule", "")
-            solde_initial = parse_float(emp.get("Solde initial congé", 0))
-
-            # Compter TOUS les jours de congé 'c' enregistrés dans presence_data pour ce matricule
-            total_conges = sum(
-                1 for key, val in self.presence_data.items()
-                if key.startswith(f"{matricule}_") and val == "c"
-            )
-
-            # Nouveau solde = solde initial - tous ses congés
-            emp["Solde de congé"] = str(max(solde_initial - total_conges, 0))
+        # Enregistrement des saisies du calendrier dans l'index des présences
+        pending = self.model.take_pending()
+        for matricule, day, val in pending:
+            if val not in ALLOWED_PRESENCE_VALUES:
+                val = ""
+            self._set_presence(matricule, self.current_year, self.current_month, day, val)
+        self.model.refresh()
+        if pending:
+            self.on_change("presences")
+
+        # Mise à jour du solde de congé : solde initial - tous ses congés (compteur incrémental)
+        if self.conges.update_soldes(self.employes):
+            self.on_change("employes")
 
         QMessageBox.information(self, "Succès", "Présences enregistrées.")
 
@@ -534,43 +592,132 @@ class PagePresence(QWidget):
             if not isinstance(day, int) or day < 1 or day > dim:
                 continue
             v = val.strip().lower() if isinstance(val, str) else ""
-            key = f"{matricule}_{y}_{m}_{day}"
-            if v in ALLOWED_PRESENCE_VALUES:
-                if self.presence_data.get(key) != v:
-                    self.presence_data[key] = v
-                    changed = True
-            else:
-                if key in self.presence_data:
-                    self.presence_data.pop(key, None)
-                    changed = True
+            if v not in ALLOWED_PRESENCE_VALUES:
+                v = ""
+            if self.index.get(matricule, y, m, day) != v:
+                self._set_presence(matricule, y, m, day, v)
+                changed = True
 
         if changed:
+            self.on_change("presences")
             self.update_calendar()
         return changed
 
 # ---------------------- UI: SALAIRE ----------------------
-SALAIRE_COLS = [
-    "Matricule", "Nom", "Prénom", "Compagne", "Salaire de base", "Taux horaire", "Solde de congé",
-    "Heures de présence", "Heures de congé", "Heures férié majoré", "Heures nuit majoré",
-    "Montant travaillé", "Majoration de nuit", "Majoration férié", "Indemnité congé", "Indemnité formation",
-    "Prime de production", "Prime d’assiduité", "Prime d’ancienneté", "Prime élite", "Prime de responsabilité",
-    "Indemnité repas", "Indemnité transport", "Salaire brut", "Avance sur salaire", "OSTIE", "CNaPS", "Social",
-    "IGR", "Reste à payer",
-    "1ère tranche (0%)", "2ème tranche (5%)", "3ème tranche (10%)", "4ème tranche (15%)", "5ème tranche (20%)",
-    "Rep1", "Rep2", "Rep3", "Rep4", "Rep5", "Reptot"
-]
+class SalaireTableModel(QAbstractTableModel):
+    """Tableau des salaires d'un mois, calculé ligne par ligne à la demande.
+
+    Une ligne n'est calculée que lorsque la vue l'affiche, puis mémorisée par
+    (matricule, année, mois, jours théoriques). Les saisies manuelles restent
+    en attente jusqu'à `commit_pending()` ; modifier une saisie ne recalcule
+    que la ligne de l'employé.
+    """
+
+    def __init__(self, employes: List[Dict[str, str]], resume: ResumeHeures, salaires_store: Dict[str, Any], parent=None):
+        super().__init__(parent)
+        self.employes = employes
+        self.resume = resume
+        self.salaires_store = salaires_store
+        self.year = self.month = 0
+        self.jours_theoriques = JOURS_THEORIQUES_DEFAUT
+        self._rows: Dict[tuple, List[Any]] = {}
+        self._pending: Dict[str, Dict[str, float]] = {}  # clé de salaire -> saisies non enregistrées
+        # Une cellule du calendrier modifiée : seule la ligne de l'employé pour ce mois est à recalculer
+        resume.presences.add_listener(self._presence_changed)
+
+    def _presence_changed(self, matricule: str, year: int, month: int):
+        for key in [k for k in self._rows if k[:3] == (matricule, year, month)]:
+            del self._rows[key]
+
+    def set_period(self, year: int, month: int, jours_theoriques: int):
+        self.beginResetModel()
+        self.year, self.month, self.jours_theoriques = year, month, jours_theoriques
+        self.endResetModel()
+
+    def invalidate(self):
+        """Oublie les lignes calculées (présences, employés ou saisies modifiés ailleurs)."""
+        self.beginResetModel()
+        self._rows = {}
+        self.endResetModel()
+
+    def _key(self, matricule: str) -> str:
+        return f"{matricule}_{self.year}_{self.month}"
+
+    def _hours(self, matricule: str) -> Dict[str, int]:
+        return self.resume.heures(matricule, self.year, self.month)
+
+    def row_values(self, row: int) -> List[Any]:
+        """Valeurs de la ligne (ordre de SALAIRE_COLS), calculées au premier accès."""
+        emp = self.employes[row]
+        m = emp.get("Matricule", "")
+        memo_key = (m, self.year, self.month, self.jours_theoriques)
+        values = self._rows.get(memo_key)
+        if values is None:
+            key = self._key(m)
+            manual = {**self.salaires_store.get(key, {}), **self._pending.get(key, {})}
+            values = calcul_paie(emp, self.year, self.month, self._hours(m), manual, self.jours_theoriques).as_row()
+            self._rows[memo_key] = values
+        return values
+
+    def commit_pending(self) -> int:
+        """Écrit les saisies en attente dans salaires_store ; renvoie le nombre d'employés concernés."""
+        for key, values in self._pending.items():
+            self.salaires_store[key] = {**self.salaires_store.get(key, {}), **values}
+        count = len(self._pending)
+        self._pending = {}
+        return count
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.employes)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(SALAIRE_COLS)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.employes):
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return str(self.row_values(index.row())[index.column()])
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            val = self.row_values(index.row())[index.column()]
+            if isinstance(val, (int, float)) or str(val).lstrip("-+").replace(".", "").isdigit():
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return SALAIRE_COLS[section]
+        return str(section + 1)
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.isValid() and SALAIRE_COLS[index.column()] in MANUAL_COLS:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index: QModelIndex, value: Any, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        if role != Qt.ItemDataRole.EditRole or not (self.flags(index) & Qt.ItemFlag.ItemIsEditable):
+            return False
+        r = index.row()
+        m = self.employes[r].get("Matricule", "")
+        self._pending.setdefault(self._key(m), {})[SALAIRE_COLS[index.column()]] = parse_float(value, 0)
+        # Seule la ligne de l'employé est recalculée
+        self._rows.pop((m, self.year, self.month, self.jours_theoriques), None)
+        self.dataChanged.emit(self.index(r, 0), self.index(r, len(SALAIRE_COLS) - 1))
+        return True
 
-MANUAL_COLS = {
-    "Prime de production", "Prime d’assiduité", "Prime d’ancienneté", "Prime élite",
-    "Prime de responsabilité", "Social", "Avance sur salaire"
-}
 
 class PageSalaire(QWidget):
-    def __init__(self, go_home_callback, employes: List[Dict[str, str]], presence_data: Dict[str, str], salaires_store: Dict[str, Any]):
+    def __init__(self, go_home_callback, employes: List[Dict[str, str]], presences: PresenceIndex, salaires_store: Dict[str, Any],
+                 on_change: Callable[[str], None] | None = None, resume: ResumeHeures | None = None):
         super().__init__()
         self.go_home_callback = go_home_callback
+        self.on_change = on_change or (lambda name: None)
         self.employes = employes
-        self.presence_data = presence_data
+        self.presences = presences
+        self.resume = resume if resume is not None else ResumeHeures(presences)
         self.salaires_store = salaires_store
         self.init_ui()
 
@@ -608,9 +755,11 @@ class PageSalaire(QWidget):
         header.addWidget(self.btn_home)
         layout.addLayout(header)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(len(SALAIRE_COLS))
-        self.table.setHorizontalHeaderLabels(SALAIRE_COLS)
+        self.model = SalaireTableModel(self.employes, self.resume, self.salaires_store, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        # Largeur fixe : resizeColumnsToContents calculerait toutes les lignes
+        self.table.horizontalHeader().setDefaultSectionSize(110)
         layout.addWidget(self.table)
 
         self.btn_recalc.clicked.connect(self.recalculate_all)
@@ -622,196 +771,38 @@ class PageSalaire(QWidget):
 
         self.populate_rows()
 
-    def _hours_from_presence(self, matricule: str, year: int, month: int) -> Dict[str, int]:
-        fd = datetime.date(year, month, 1)
-        nm = datetime.date(year + (month // 12), (month % 12) + 1, 1)
-        days_in_month = (nm - fd).days
-        res = {"presence": 0, "conge": 0, "ferie": 0, "nuit": 0, "formation": 0, "absence": 0}
-        for d in range(1, days_in_month + 1):
-            key = f"{matricule}_{year}_{month}_{d}"
-            val = self.presence_data.get(key, "").lower()
-            if val == "p":
-                res["presence"] += 8
-            elif val == "n":
-                res["presence"] += 8
-                res["nuit"] += 8
-            elif val == "a":
-                res["absence"] += 8
-            elif val == "c":
-                res["conge"] += 8
-            elif val == "m":
-                res["presence"] += 8
-                res["ferie"] += 8
-            elif val == "f":
-                res["formation"] += 8
-        return res
-
-    def _key(self, matricule: str, year: int, month: int) -> str:
-        return f"{matricule}_{year}_{month}"
+    def showEvent(self, event):
+        # Présences ou employés ont pu être modifiés depuis une autre page
+        self.model.invalidate()
+        super().showEvent(event)
 
     def populate_rows(self):
-        year = self.cmb_year.currentData()
-        month = self.cmb_month.currentData()
-        jours_theoriques = self.spin_days.value()
-        self.table.setRowCount(len(self.employes))
-
-        for r, emp in enumerate(self.employes):
-            m = emp.get("Matricule", "")
-            nom = emp.get("Nom", "")
-            prenom = emp.get("Prénom", "")
-            comp = emp.get("Compagne", "")
-            sal_base = parse_float(emp.get("Salaire de base", 0))
-            solde_conge = parse_float(emp.get("Solde de congé", 0))
-            droit_tr = calcul_droit_depuis_date(emp.get("Date d'embauche", ""))
-            droit_ostie = calcul_droit_depuis_date(emp.get("Date d'embauche", ""))
-            anciennete_ans = anciennete_ans_depuis_date(emp.get("Date d'embauche", ""))
-
-            hrs = self._hours_from_presence(m, year, month)
-            h_presence = hrs["presence"]
-            h_conge = hrs["conge"]
-            h_ferie = hrs["ferie"]
-            h_nuit = hrs["nuit"]
-            h_form = hrs["formation"]
-            absences = hrs["absence"] // 8
-
-            jours_corriges = max(0, jours_theoriques - absences)
-            taux_h = sal_base / (jours_corriges * 8) if jours_corriges > 0 else 0.0
-
-            key = self._key(m, year, month)
-            manual = self.salaires_store.get(key, {})
-            prime_prod = parse_float(manual.get("Prime de production", 0))
-            prime_assid = parse_float(manual.get("Prime d’assiduité", 0))
-            prime_anc = parse_float(manual.get("Prime d’ancienneté", 0))
-            prime_elite = parse_float(manual.get("Prime élite", 0))
-            prime_resp = parse_float(manual.get("Prime de responsabilité", 0))
-            social = parse_float(manual.get("Social", 15000))
-            avance = parse_float(manual.get("Avance sur salaire", 0))
-
-            montant_trav = h_presence * taux_h
-            maj_nuit = h_nuit * taux_h * 0.30
-            maj_ferie = h_ferie * taux_h * 1.00
-            indem_conge = h_conge * taux_h
-            indem_form = h_form * 10000
-            jours_presence_arr = int(round(h_presence / 8))
-            indem_repas = jours_presence_arr * 2500 * (1 if droit_tr else 0)
-            indem_transport = jours_presence_arr * 1200 * (1 if droit_tr else 0)
-
-            brut = (
-                montant_trav + maj_nuit + maj_ferie + indem_conge + indem_form +
-                prime_prod + prime_assid + prime_anc + prime_elite + prime_resp +
-                indem_repas + indem_transport
-            )
-
-            ostie = 0
-            cnaps = 0
-            if anciennete_ans >= 1 and droit_ostie:
-                ostie = brut * 0.01
-                cnaps = brut * 0.01
-
-            base = max(0.0, brut)
-            tranche1 = max(0.0, min(base, 350000))
-            tranche2 = max(0.0, min(base, 400000) - 350000)
-            tranche3 = max(0.0, min(base, 500000) - 400000)
-            tranche4 = max(0.0, min(base, 600000) - 500000)
-            tranche5 = max(0.0, base - 600000)
-
-            rep1 = tranche1 * 0.00
-            rep2 = tranche2 * 0.05
-            rep3 = tranche3 * 0.10
-            rep4 = tranche4 * 0.15
-            rep5 = tranche5 * 0.20
-            reptot = rep1 + rep2 + rep3 + rep4 + rep5
-            if reptot == 0:
-                reptot = 2000
-
-            # Si matricule vide -> IGR = 0, sinon IGR = reptot * droit_ostie (droit_ostie venant de la date d'embauche)
-            if not m:
-                igr = 0
-            else:
-                igr = reptot * droit_ostie
-
-            # On peut calculer le reste ici (mais tu peux aussi le recalculer ailleurs si tu préfères)
-            reste = brut - (avance + ostie + cnaps + social + igr)
-
-
-            values = [
-                m, nom, prenom, comp,
-                round(sal_base), round(taux_h), (solde_conge),
-                int(h_presence), int(h_conge), int(h_ferie), int(h_nuit),
-                round(montant_trav), round(maj_nuit), round(maj_ferie), round(indem_conge), round(indem_form),
-                round(prime_prod), round(prime_assid), round(prime_anc), round(prime_elite), round(prime_resp),
-                round(indem_repas), round(indem_transport), round(brut), round(avance), round(ostie), round(cnaps), round(social),
-                round(igr), round(reste),
-                round(tranche1), round(tranche2), round(tranche3), round(tranche4), round(tranche5),
-                round(rep1), round(rep2), round(rep3), round(rep4), round(rep5), round(reptot)
-            ]
-
-            for c, val in enumerate(values):
-                item = QTableWidgetItem(str(val))
-                if SALAIRE_COLS[c] in MANUAL_COLS:
-                    item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                else:
-                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                if isinstance(val, (int, float)) or str(val).lstrip("-+").replace(".", "").isdigit():
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                self.table.setItem(r, c, item)
-
-        self.table.resizeColumnsToContents()
+        self.model.set_period(self.cmb_year.currentData(), self.cmb_month.currentData(), self.spin_days.value())
 
     def recalculate_all(self):
+        # Comme à l'origine, les saisies en cours sont reportées dans salaires_store
+        # (la fiche de paie les relit) avant le recalcul
         self.save_manual_inputs(temp_only=True)
-        self.populate_rows()
+        self.model.invalidate()
 
     def save_manual_inputs(self, temp_only: bool = False):
-        year = self.cmb_year.currentData()
-        month = self.cmb_month.currentData()
-        for r, emp in enumerate(self.employes):
-            m = emp.get("Matricule", "")
-            key = self._key(m, year, month)
-            row_manual: Dict[str, Any] = self.salaires_store.get(key, {})
-            for col_name in MANUAL_COLS:
-                cidx = SALAIRE_COLS.index(col_name)
-                item = self.table.item(r, cidx)
-                if item:
-                    row_manual[col_name] = parse_float(item.text(), 0)
-            self.salaires_store[key] = row_manual
+        if self.model.commit_pending():
+            self.on_change("salaires")
         if not temp_only:
             QMessageBox.information(self, "Sauvegarde", "Saisies manuelles enregistrées.")
 
 # ---------------------- FICHE DE PAIE (utilise données) ----------------------
 class PageFicheDePaie(QWidget):
-    FICHE_ROWS = [
-        "salaire de base",
-        "Prime de responsabilité",
-        "Prime assiduité",
-        "prime d'ancienneté",
-        "Prime production",
-        "Avance sur salaire",
-        "Prime Elité",
-        "indemnité de congé",
-        "Indemnité IRSA",
-        "cnaps 1%",
-        "ostie 1%",
-        "IRSA 1ere tranche",
-        "IRSA 2eme tranche",
-        "IRSA 3eme tranche",
-        "IRSA 4eme tranche",
-        "IRSA 5eme tranche",
-        "IRSA à payer",
-        "Majoration de nuit",
-        "Majoration férié",
-        "Indemnité de rep",
-        "Indemnité de trans",
-        "Social",
-        "B1",
-        "S1",
-        "Salaire net à payer"
-    ]
-
-    def __init__(self, go_home_callback, employes: List[Dict[str, str]], presence_data: Dict[str, str], salaires_store: Dict[str, Any]):
+    FICHE_ROWS = FICHE_ROWS
+    IRSA_LIGNES = IRSA_LIGNES
+
+    def __init__(self, go_home_callback, employes: List[Dict[str, str]], presences: PresenceIndex, salaires_store: Dict[str, Any],
+                 employe_index: EmployeIndex | None = None, resume: ResumeHeures | None = None):
         super().__init__()
         self.employes = employes
-        self.presence_data = presence_data
+        self.employe_index = employe_index if employe_index is not None else EmployeIndex(employes)
+        self.presences = presences
+        self.resume = resume if resume is not None else ResumeHeures(presences)
         self.salaires_store = salaires_store
 
         self.setWindowTitle("Fiche de paie")
@@ -852,9 +843,7 @@ class PageFicheDePaie(QWidget):
         # tableau
         self.table = QTableWidget()
         self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels(
-            ["DÉTAIL DES RUBRIQUES", "Présent", "Bases", "TAUX", "BRUT", "BASE", "Retenues", "Reste à payer"]
-        )
+        self.table.setHorizontalHeaderLabels(FICHE_COLONNES)
         self.table.setRowCount(len(self.FICHE_ROWS))
         for i, lib in enumerate(self.FICHE_ROWS):
             item = QTableWidgetItem(lib)
@@ -875,38 +864,11 @@ class PageFicheDePaie(QWidget):
         layout.addLayout(btns)
 
     # ---------- LOGIQUE (réutilise les calculs de PageSalaire) ----------
-    def _hours_from_presence(self, matricule: str, year: int, month: int) -> Dict[str, int]:
-        fd = datetime.date(year, month, 1)
-        nm = datetime.date(year + (month // 12), (month % 12) + 1, 1)
-        days_in_month = (nm - fd).days
-        res = {"presence": 0, "conge": 0, "ferie": 0, "nuit": 0, "formation": 0, "absence": 0}
-        for d in range(1, days_in_month + 1):
-            key = f"{matricule}_{year}_{month}_{d}"
-            val = self.presence_data.get(key, "").lower()
-            if val == "p":
-                res["presence"] += 8
-            elif val == "n":
-                res["presence"] += 8
-                res["nuit"] += 8
-            elif val == "a":
-                res["absence"] += 8
-            elif val == "c":
-                res["conge"] += 8
-            elif val == "m":
-                res["presence"] += 8
-                res["ferie"] += 8
-            elif val == "f":
-                res["formation"] += 8
-        return res
-
     def _key(self, matricule: str, year: int, month: int) -> str:
         return f"{matricule}_{year}_{month}"
 
     def _find_employee(self, matricule: str) -> Dict[str, str] | None:
-        for emp in self.employes:
-            if emp.get("Matricule") == matricule:
-                return emp
-        return None
+        return self.employe_index.get(matricule)
 
     def _maybe_autofill(self):
         try:
@@ -958,192 +920,16 @@ class PageFicheDePaie(QWidget):
                 QMessageBox.warning(self, "Fiche de paie", "Employé introuvable.")
                 return
 
-            # --- Données employé ---
-            sal_base = parse_float(emp.get("Salaire de base", 0))
-            droit_tr = calcul_droit_depuis_date(emp.get("Date d'embauche", ""))
-            droit_ostie = calcul_droit_depuis_date(emp.get("Date d'embauche", ""))
-            anciennete_ans = anciennete_ans_depuis_date(emp.get("Date d'embauche", ""))
-
-            # --- Heures depuis présences ---
-            hrs = self._hours_from_presence(matricule, annee, mois)
-            h_presence = hrs["presence"]                     # heures totales présentes
-            h_conge = hrs["conge"]
-            h_ferie = hrs["ferie"]
-            h_nuit = hrs["nuit"]
-            h_form = hrs["formation"]
-            absences = hrs["absence"] // 8
-
-            # Jours théoriques = 22 par défaut
-            jours_theoriques = 22
-            jours_corriges = max(0, jours_theoriques - absences)
-            taux_h = sal_base / (jours_corriges * 8) if jours_corriges > 0 else 0.0
-
-            # --- Saisies manuelles ---
-            key = self._key(matricule, annee, mois)
-            manual = self.salaires_store.get(key, {})
-            prime_prod = parse_float(manual.get("Prime de production", 0))
-            prime_assid = parse_float(manual.get("Prime d’assiduité", 0))
-            prime_anc = parse_float(manual.get("Prime d’ancienneté", 0))
-            prime_elite = parse_float(manual.get("Prime élite", 0))
-            prime_resp = parse_float(manual.get("Prime de responsabilité", 0))
-            social = parse_float(manual.get("Social", 15000))
-            avance = parse_float(manual.get("Avance sur salaire", 0))
-
-            # --- Calculs ---
-            montant_trav = h_presence * taux_h
-            # taux de majoration (valeur par heure) 
-            taux_maj_nuit = taux_h * 0.30
-            taux_maj_ferie = taux_h * 1.00
-            # montant des majorations
-            maj_nuit_amount = h_nuit * taux_maj_nuit
-            maj_ferie_amount = h_ferie * taux_maj_ferie
-            indem_conge = h_conge * taux_h
-            jours_presence_arr = int(round(h_presence / 8)) if h_presence > 0 else 0
-            indem_repas = jours_presence_arr * 2500 if droit_tr else 0
-            indem_transport = jours_presence_arr * 1200 if droit_tr else 0
-
-            brut = (
-                montant_trav + maj_nuit_amount + maj_ferie_amount + indem_conge +
-                prime_prod + prime_assid + prime_anc + prime_elite + prime_resp +
-                indem_repas + indem_transport
-            )
+            # --- Calcul (même moteur que la page Salaire) ---
+            hrs = self.resume.heures(matricule, annee, mois)
+            manual = self.salaires_store.get(self._key(matricule, annee, mois), {})
+            res = calcul_paie(emp, annee, mois, hrs, manual, JOURS_THEORIQUES_DEFAUT)
 
-            ostie = cnaps = 0
-            if anciennete_ans >= 1 and droit_ostie:
-                ostie = brut * 0.01
-                cnaps = brut * 0.01
-
-            # --- IRSA ---
-            base = max(0.0, brut)
-            tranche1 = max(0.0, min(base, 350000))
-            tranche2 = max(0.0, min(base, 400000) - 350000)
-            tranche3 = max(0.0, min(base, 500000) - 400000)
-            tranche4 = max(0.0, min(base, 600000) - 500000)
-            tranche5 = max(0.0, base - 600000)
-            rep1 = tranche1 * 0.00
-            rep2 = tranche2 * 0.05
-            rep3 = tranche3 * 0.10
-            rep4 = tranche4 * 0.15
-            rep5 = tranche5 * 0.20
-            reptot = rep1 + rep2 + rep3 + rep4 + rep5
-            if reptot == 0:
-                reptot = 2000
-
-            # IGR = reptot * droit_ostie (droit_ostie vaut 1 ou 0)
-            igr = reptot * droit_ostie
-
-            # --- Fonction utilitaire pour remplir une ligne ---
-            def set_row(row_index, present="", bases="", taux="", brut_amount="", retenue_amount=""):
-                def setcol(c, val):
-                    self.table.setItem(row_index, c, QTableWidgetItem("" if val in ("", None) else str(val)))
-                setcol(1, present)
-                setcol(2, bases)
-                setcol(3, taux)
-                setcol(4, brut_amount)
-                setcol(5, bases)   # colonne "BASE" laissée pour cohérence
-                setcol(6, retenue_amount)
-
-            # --- Remplissage ---
-            total_brut = 0.0
-            total_retenues = 0.0
-
-            for i, lib in enumerate(self.FICHE_ROWS):
-                if lib == "salaire de base":
-                    set_row(i, present=int(h_presence), bases="", taux=round(taux_h), brut_amount=round(montant_trav))
-                    total_brut += montant_trav
-
-                elif lib in ["Prime de responsabilité", "Prime assiduité", "prime d'ancienneté", "Prime production", "Prime Elité"]:
-                    val = {
-                        "Prime de responsabilité": prime_resp,
-                        "Prime assiduité": prime_assid,
-                        "prime d'ancienneté": prime_anc,
-                        "Prime production": prime_prod,
-                        "Prime Elité": prime_elite,
-                    }[lib]
-                    set_row(i, brut_amount=round(val))
-                    total_brut += val
-
-                elif lib == "Majoration de nuit":
-                    set_row(i, present=int(h_nuit), bases="30%", taux=int(round(taux_maj_nuit)), brut_amount=round(maj_nuit_amount))
-                    total_brut += maj_nuit_amount
-
-                elif lib == "Majoration férié":
-                    set_row(i, present=int(h_ferie), bases="100%", taux=int(round(taux_maj_ferie)), brut_amount=round(maj_ferie_amount))
-                    total_brut += maj_ferie_amount
-
-                elif lib == "indemnité de congé":
-                    set_row(i, present=int(h_conge), taux=round(taux_h), brut_amount=round(indem_conge))
-                    total_brut += indem_conge
-
-                elif lib == "Indemnité IRSA":
-                    set_row(i, brut_amount=round(igr))
-                    total_brut += igr
-
-                elif lib == "Indemnité de rep":
-                    set_row(i, present=jours_presence_arr, taux=2500, brut_amount=round(indem_repas))
-                    total_brut += indem_repas
-
-                elif lib == "Indemnité de trans":
-                    set_row(i, present=jours_presence_arr, taux=1200, brut_amount=round(indem_transport))
-                    total_brut += indem_transport
-
-                elif lib == "Social":
-                    set_row(i, retenue_amount=round(social))
-                    total_retenues += social
-
-                elif lib == "cnaps 1%":
-                    set_row(i, retenue_amount=round(cnaps))
-                    total_retenues += cnaps
-
-                elif lib == "ostie 1%":
-                    set_row(i, retenue_amount=round(ostie))
-                    total_retenues += ostie
-
-                elif lib in ["IRSA 1ere tranche", "IRSA 2eme tranche", "IRSA 3eme tranche", "IRSA 4eme tranche", "IRSA 5eme tranche"]:
-                    taux_map = {
-                        "IRSA 1ere tranche": "0%",
-                        "IRSA 2eme tranche": "5%",
-                        "IRSA 3eme tranche": "10%",
-                        "IRSA 4eme tranche": "15%",
-                        "IRSA 5eme tranche": "20%",
-                    }
-                    base_map = {
-                        "IRSA 1ere tranche": tranche1,
-                        "IRSA 2eme tranche": tranche2,
-                        "IRSA 3eme tranche": tranche3,
-                        "IRSA 4eme tranche": tranche4,
-                        "IRSA 5eme tranche": tranche5,
-                    }
-                    val_map = {
-                        "IRSA 1ere tranche": rep1,
-                        "IRSA 2eme tranche": rep2,
-                        "IRSA 3eme tranche": rep3,
-                        "IRSA 4eme tranche": rep4,
-                        "IRSA 5eme tranche": rep5,
-                    }
-                    set_row(i, bases=round(base_map[lib]), taux=taux_map[lib], retenue_amount=round(val_map[lib]))
-                    # ⚠️ ces valeurs ne s'ajoutent pas à total_retenues directement
-
-                elif lib == "IRSA à payer":
-                    set_row(i, retenue_amount=round(igr))
-                    total_retenues += igr
-
-                elif lib == "Avance sur salaire":
-                    set_row(i, retenue_amount=round(avance))
-                    total_retenues += avance
-
-                elif lib == "B1":
-                    set_row(i, brut_amount=int(round(total_brut)))
-
-                elif lib == "S1":
-                    set_row(i, retenue_amount=int(round(total_retenues)))
-
-
-            # --- Calcul du Net après la boucle ---
-            net = total_brut - total_retenues
-            net_text = f"{int(round(net)):,}".replace(",", " ") + " Ar"
-            i_net = self.FICHE_ROWS.index("Salaire net à payer")
-            self.table.setItem(i_net, 7, QTableWidgetItem(net_text))
+            # --- Remplissage (mêmes lignes que la fiche PDF) ---
+            for i, ligne in enumerate(lignes_fiche(res)):
+                for c, val in enumerate(ligne[1:], start=1):
+                    if val or c < 7:
+                        self.table.setItem(i, c, QTableWidgetItem(val))
 
             self.table.resizeColumnsToContents()
 
@@ -1170,127 +956,39 @@ class PageFicheDePaie(QWidget):
         if not path:
             return
 
-        styles = getSampleStyleSheet()
-        style_title = styles["Heading1"]
-        style_title.alignment = 1
-        style_title.fontSize = 18
-        style_info = styles["Normal"]
-        style_info.fontSize = 10
-
-        # --- IMPORTANT : recréer la liste elements à chaque export ---
-        elements = []
+        # Mois/année de la fiche affichée, sinon le mois courant
+        mois = parse_month(self.inputs["Mois"].text())
+        annee = parse_int(self.inputs["Année"].text(), 0)
+        if not (1 <= mois <= 12) or annee <= 0:
+            today = datetime.date.today()
+            mois, annee = today.month, today.year
 
+        fiches = []
+        empreintes = []
+        for matricule in selection:
+            emp = self._find_employee(matricule)
+            if not emp:
+                continue
+            hrs = self.resume.heures(matricule, annee, mois)
+            manual = self.salaires_store.get(self._key(matricule, annee, mois), {})
+            fiches.append((emp, calcul_paie(emp, annee, mois, hrs, manual, JOURS_THEORIQUES_DEFAUT)))
+            codes = self.presences.month(annee, mois).get(matricule, [])
+            empreintes.append(empreinte_fiche(emp, annee, mois, codes, manual, JOURS_THEORIQUES_DEFAUT))
+
+        # Rendu hors interface (pool de processus), avancement affiché au fil de l'eau
+        progress = QProgressDialog("Génération des fiches de paie…", None, 0, len(fiches), self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
         try:
-            for idx, matricule in enumerate(selection):
-                emp = self._find_employee(matricule)
-                if not emp:
-                    continue
-
-                # remplir les champs avec les données employé
-                self.inputs["Matricule"].setText(emp.get("Matricule", ""))
-                self.inputs["Nom"].setText(emp.get("Nom", ""))
-                self.inputs["Prénom"].setText(emp.get("Prénom", ""))
-                self.inputs["Fonction"].setText(emp.get("Fonction", ""))
-                self.inputs["Mode de paiement"].setText(emp.get("Mode de paiement", ""))
-                self.inputs["Catégorie"].setText(emp.get("Catégorie", ""))
-                self.inputs["Congé disponible"].setText(emp.get("Solde de congé", ""))
-                self.inputs["compagne"].setText(emp.get("Compagne", ""))
-                self.inputs["Salaire de base"].setText(emp.get("Salaire de base", ""))
-
-                # recalcul automatique
-                self._auto_compute_sheet()
-
-                # ---- En-tête ----
-                elements.append(Paragraph("COLARYS CONCEPT", style_title))
-                elements.append(Spacer(1, 20))
-
-                left_labels = ["Nom", "Prénom", "Matricule", "Fonction", "Mode de paiement", "Salaire de base"]
-                right_labels = ["Mois", "Catégorie", "Congé disponible", "compagne", "Année"]
-
-                data_info = []
-                data_info = []
-                max_len = max(len(left_labels), len(right_labels))
-                for i in range(max_len):
-                    left_text = ""
-                    right_text = ""
-
-                    if i < len(left_labels):
-                        lbl = left_labels[i]
-                        if lbl in self.inputs:
-                            left_text = f"<b>{lbl}:</b> {self.inputs[lbl].text()}"
-
-                    if i < len(right_labels):
-                        lbl = right_labels[i]
-                        if lbl in self.inputs:
-                            right_text = f"<b>{lbl}:</b> {self.inputs[lbl].text()}"
-
-                    data_info.append([Paragraph(left_text, style_info), Paragraph(right_text, style_info)])
-
-                info_table = RLTable(data_info, colWidths=[200, 200])
-                info_table.setStyle(TableStyle([
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ]))
-                elements.append(info_table)
-                elements.append(Spacer(1, 15))
-
-                # ---- Tableau principal ----
-                data = []
-                headers = [self.table.horizontalHeaderItem(col).text() for col in range(self.table.columnCount())]
-                data.append(headers)
-
-                for row in range(self.table.rowCount()):
-                    row_data = []
-                    for col in range(self.table.columnCount()):
-                        item = self.table.item(row, col)
-                        row_data.append(item.text() if item else "")
-                    data.append(row_data)
-
-                table = RLTable(data, repeatRows=1)
-                style = TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 9),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                ])
-                table.setStyle(style)
-                elements.append(table)
-                elements.append(Spacer(1, 15))
-
-                # ---- Signatures ----
-                nom_salarie = f"{emp.get('Nom', '')} {emp.get('Prénom', '')}".strip()
-                footer_data = [
-                    ["EMPLOYEUR", "SALARIÉ"],
-                    ["", ""],
-                    ["COLLARD Mialy Rinah", nom_salarie if nom_salarie else "Nom Prénom"]
-                ]
-                footer = RLTable(footer_data, colWidths=[200, 200])
-                footer.setStyle(TableStyle([
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('BOTTOMPADDING', (0, 1), (-1, 2), 20),
-                ]))
-                elements.append(footer)
-
-                # saut de page entre employés
-                if idx < len(selection) - 1:
-                    elements.append(PageBreak())
-
-            # --- Génération du PDF ---
-            pdf = SimpleDocTemplate(
-                path, pagesize=A4,
-                leftMargin=25, rightMargin=25,
-                topMargin=25, bottomMargin=25
-            )
-            pdf.build(elements)
-
+            cache = CacheFiches(FICHES_CACHE_DIR)
+            for evt in generer_fiches(fiches, fusion=path, cache=cache, empreintes=empreintes):
+                progress.setValue(evt["fait"])
+                QApplication.processEvents()
+            progress.close()
             QMessageBox.information(self, "Export PDF", f"Fiche(s) exportée(s) avec succès dans :\n{path}")
 
         except Exception as e:
+            progress.close()
             QMessageBox.critical(self, "Erreur Export PDF", f"Une erreur est survenue :\n{e}")
 
 from PyQt6.QtWidgets import (
@@ -1465,10 +1163,83 @@ class PageAccueil(QWidget):
         self.datetime_label.setText(texte)
 
 # ---------------------- MAIN ----------------------
+class AutoSaver(QObject):
+    """Sauvegarde différée des données modifiées, écrite sur un thread de fond.
+
+    Les pages signalent leurs modifications par `mark_dirty(nom)`. L'écriture
+    part `delay_ms` après la dernière modification : les données modifiées
+    sont copiées sur le thread de l'interface (copies peu coûteuses, comme
+    les matrices de présences), puis mises au format du fichier, sérialisées
+    et écrites par un thread unique (les écritures restent dans l'ordre).
+    Sans modification, rien n'est écrit.
+    """
+
+    save_failed = pyqtSignal(str, str)  # nom, message d'erreur
+
+    def __init__(self, write: Callable[[str, Any], None], snapshots: Dict[str, Callable[[], Any]], delay_ms: int = 3000, parent=None):
+        super().__init__(parent)
+        self._write = write          # (nom, copie des données) -> écrit ; lève une exception en cas d'échec
+        self._snapshots = snapshots  # nom -> copie des données en mémoire
+        self._dirty: Set[str] = set()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auto_save")
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.flush)
+        self.save_failed.connect(self._on_failed)
+
+    def mark_dirty(self, name: str):
+        self._dirty.add(name)
+        self._timer.start()  # redémarre le délai à chaque modification
+
+    def flush(self) -> Optional[Future]:
+        """Lance l'écriture des données modifiées ; None s'il n'y a rien à écrire."""
+        self._timer.stop()
+        if not self._dirty:
+            return None
+        snapshots = {name: self._snapshots[name]() for name in self._dirty}
+        self._dirty.clear()
+        return self._executor.submit(self._save, snapshots)
+
+    def _save(self, snapshots: Dict[str, Any]) -> List[tuple]:
+        failures = []
+        for name, data in snapshots.items():
+            try:
+                self._write(name, data)
+            except Exception as e:
+                failures.append((name, str(e)))
+                self.save_failed.emit(name, str(e))
+        if not failures:
+            print(f"Sauvegarde automatique effectuée ({', '.join(snapshots)}).")
+        return failures
+
+    def _on_failed(self, name: str, message: str):
+        self._dirty.add(name)  # nouvel essai à la prochaine sauvegarde
+        QMessageBox.critical(self.parent(), "Erreur de sauvegarde", f"Impossible d'enregistrer {name}: {message}")
+
+    def close(self) -> List[tuple]:
+        """Écrit les dernières modifications, attend la fin des écritures et renvoie les échecs."""
+        if self._closed:
+            return []
+        self._closed = True
+        self.save_failed.disconnect(self._on_failed)
+        future = self.flush()
+        failures = future.result() if future else []
+        self._executor.shutdown(wait=True)
+        return failures
+
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
+        # Stockage SQLite si Config.STORAGE_BACKEND == "sqlite", sinon fichiers JSON
+        self.sqlite = None
+        if Config.STORAGE_BACKEND == "sqlite":
+            from sqlite_storage import SqliteRepository
+            self.sqlite = SqliteRepository(Config.SQLITE_PATH or "colarys.db")
         self.employes: List[Dict[str, str]] = self.load_data(EMPLOYES_FILE, default=[])
+        employes_charges = [dict(emp) for emp in self.employes]
         self.update_conges_automatique()
         
         # Vérification augmentation mensuelle automatique
@@ -1498,9 +1269,26 @@ class MainWindow(QWidget):
 
 
 
-        self.presences: Dict[str, str] = self.load_data(PRESENCES_FILE, default={})
+        # presences.json (format plat) n'est que le format d'échange : en mémoire, une matrice par mois
+        self.presences = PresenceIndex.from_flat(self.load_data(PRESENCES_FILE, default={}))
         self.salaires: Dict[str, Any] = self.load_data(SALAIRES_FILE, default={})
 
+        # Sauvegarde des seules données modifiées, hors du thread de l'interface
+        self.files = {"employes": EMPLOYES_FILE, "presences": PRESENCES_FILE, "salaires": SALAIRES_FILE}
+        self.autosaver = AutoSaver(
+            self.write_snapshot,
+            {
+                "employes": lambda: [dict(emp) for emp in self.employes],
+                # Copie des matrices seulement : le format plat est construit sur le thread de sauvegarde
+                "presences": self.presences.copy,
+                "salaires": lambda: {k: dict(v) if isinstance(v, dict) else v for k, v in self.salaires.items()},
+            },
+            parent=self,
+        )
+        if self.employes != employes_charges:
+            # Soldes de congé mis à jour au démarrage
+            self.autosaver.mark_dirty("employes")
+
         self.stack = QStackedWidget()
         self.page_accueil = PageAccueil(
             go_emp_callback=lambda: self.stack.setCurrentWidget(self.page_emp),
@@ -1508,10 +1296,17 @@ class MainWindow(QWidget):
             go_salaire_callback=lambda: self.stack.setCurrentWidget(self.page_salaire),
             go_fiche_callback=lambda: self.stack.setCurrentWidget(self.page_fiche)
         )
-        self.page_emp = PageEMP(self.go_home, self.employes)
-        self.page_presence = PagePresence(self.go_home, self.employes, self.presences)
-        self.page_salaire = PageSalaire(self.go_home, self.employes, self.presences, self.salaires)
-        self.page_fiche = PageFicheDePaie(self.go_home, self.employes, self.presences, self.salaires)
+        mark_dirty = self.autosaver.mark_dirty
+        # Index des employés partagé : PageEMP le tient à jour, les autres pages le lisent
+        self.employe_index = EmployeIndex(self.employes)
+        self.page_emp = PageEMP(self.go_home, self.employes, mark_dirty, self.employe_index)
+        # Heures par (matricule, année, mois) partagées par le calendrier, la paie et les fiches
+        self.resume_heures = ResumeHeures(self.presences)
+        self.page_presence = PagePresence(self.go_home, self.employes, self.presences, mark_dirty, self.resume_heures)
+        self.page_salaire = PageSalaire(self.go_home, self.employes, self.presences, self.salaires, mark_dirty, self.resume_heures)
+        self.page_fiche = PageFicheDePaie(
+            self.go_home, self.employes, self.presences, self.salaires, self.employe_index, self.resume_heures
+        )
 
         self.stack.addWidget(self.page_accueil)
         self.stack.addWidget(self.page_emp)
@@ -1553,15 +1348,17 @@ class MainWindow(QWidget):
 
 
     def load_data(self, filename: str, default: Union[List[Any], Dict[str, Any]]):
+        if self.sqlite:
+            return self.sqlite.load_snapshot(filename)
         if os.path.exists(filename):
             try:
-                with open(filename, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(default, list) and isinstance(data, list):
-                        return data
-                    if isinstance(default, dict) and isinstance(data, dict):
-                        return data
-            except (json.JSONDecodeError, OSError):
+                # JSON indenté ou compact (data_codec.py)
+                data = data_codec.read_file(filename)
+                if isinstance(default, list) and isinstance(data, list):
+                    return data
+                if isinstance(default, dict) and isinstance(data, dict):
+                    return data
+            except (ValueError, OSError):
                 pass
         try:
             os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
@@ -1569,12 +1366,27 @@ class MainWindow(QWidget):
             pass
         return default
 
+    def write_snapshot(self, name: str, data: Any):
+        """Écrit la copie prise par l'AutoSaver (thread de sauvegarde) ; les présences y sont mises au format plat."""
+        if isinstance(data, PresenceIndex):
+            data = data.to_flat()
+        self.write_data(self.files[name], data)
+
+    def write_data(self, filename: str, data: Union[List[Any], Dict[str, Any]]):
+        """Écrit un fichier de données (appelé aussi depuis le thread de sauvegarde) ; lève une exception en cas d'échec."""
+        if self.sqlite:
+            if not self.sqlite.save_snapshot(filename, data):
+                raise RuntimeError(f"échec de l'écriture dans {self.sqlite.db_path}")
+            return
+        # Fichier temporaire + renommage : un arrêt brutal ne tronque jamais le fichier ;
+        # format (indenté ou compact) choisi par Config.DATA_FORMAT
+        atomic_write_data(filename, data)
+
     def save_data(self, filename: str, data: Union[List[Any], Dict[str, Any]]):
         try:
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-        except OSError as e:
-            QMessageBox.critical(self, "Erreur de sauvegarde", f"Impossible d'écrire {filename}: {e}")
+            self.write_data(filename, data)
+        except (OSError, RuntimeError) as e:
+            QMessageBox.critical(self, "Erreur de sauvegarde", f"Impossible d'enregistrer {filename}: {e}")
 
     def go_home(self):
         if hasattr(self, "page_salaire"):
@@ -1582,16 +1394,14 @@ class MainWindow(QWidget):
         self.stack.setCurrentWidget(self.page_accueil)
 
     def closeEvent(self, event):
-        self.save_data(EMPLOYES_FILE, self.employes)
-        self.save_data(PRESENCES_FILE, self.presences)
-        self.save_data(SALAIRES_FILE, self.salaires)
+        self.page_salaire.save_manual_inputs(temp_only=True)
+        for name, message in self.autosaver.close():
+            QMessageBox.critical(self, "Erreur de sauvegarde", f"Impossible d'enregistrer {self.files[name]}: {message}")
         event.accept()
 
     def auto_save(self):
-        self.save_data(EMPLOYES_FILE, self.employes)
-        self.save_data(PRESENCES_FILE, self.presences)
-        self.save_data(SALAIRES_FILE, self.salaires)
-        print("Sauvegarde automatique effectuée.")
+        # Filet de sécurité toutes les 2 minutes : n'écrit que si des données ont changé
+        self.autosaver.flush()
 
     
 
@@ -6,4 +6,9 @@ class Config:
     DEBUG = os.getenv('DEBUG', False)
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', 5002))
-    CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
\ No newline at end of file
+    CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
+    # Stockage des données : "json" (fichiers data/*.json) ou "sqlite"
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json').lower()
+    SQLITE_PATH = os.getenv('SQLITE_PATH', '')
+    # Écriture des fichiers JSON : "json" (indenté) ou "compact" (tables en colonnes, voir data_codec.py)
+    DATA_FORMAT = os.getenv('DATA_FORMAT', 'json').lower()
@@ -0,0 +1,94 @@
+# python-app/conges.py
+"""
+Compteur de jours de congé ('c') par employé.
+
+Le solde de congé vaut `Solde initial congé - nombre de jours 'c'`. Au lieu
+de recompter tout l'historique des présences à chaque enregistrement, le
+compteur est construit une fois puis mis à jour par différences quand une
+cellule change.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from paie import parse_float
+from presence_index import PresenceIndex, parse_presence_key
+
+CODE_CONGE = "c"
+
+
+class LeaveLedger:
+    """Nombre de jours de congé posés par matricule."""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+
+    @classmethod
+    def from_presences(cls, presences: Dict[str, str]) -> "LeaveLedger":
+        ledger = cls()
+        ledger.rebuild(presences)
+        return ledger
+
+    @classmethod
+    def from_index(cls, index: PresenceIndex) -> "LeaveLedger":
+        """Compteur construit par réduction sur les matrices de l'index.
+
+        Les entrées hors matrices (`index.extra`, par exemple un jour au-delà
+        de la fin du mois) sont comptées comme dans `from_presences`.
+        """
+        ledger = cls()
+        ledger._counts = Counter(index.count_code(CODE_CONGE)) + cls._count(index.extra)
+        return ledger
+
+    @classmethod
+    def from_counts(cls, counts: Dict[str, int]) -> "LeaveLedger":
+        """Compteur construit depuis des nombres de congés déjà calculés (matricule -> jours)."""
+        ledger = cls()
+        ledger._counts = Counter({m: n for m, n in counts.items() if n > 0})
+        return ledger
+
+    def rebuild(self, presences: Dict[str, str]):
+        """Recompte tout depuis le dictionnaire plat des présences."""
+        self._counts = self._count(presences)
+
+    @staticmethod
+    def _count(presences: Dict[str, str]) -> Counter:
+        counts: Counter = Counter()
+        for key, val in presences.items():
+            if val == CODE_CONGE:
+                parsed = parse_presence_key(key)
+                if parsed:
+                    counts[parsed[0]] += 1
+        return counts
+
+    def apply(self, matricule: str, old_code: str, new_code: str):
+        """Répercute le passage d'une cellule de `old_code` à `new_code`."""
+        if old_code == new_code:
+            return
+        if old_code == CODE_CONGE:
+            self._counts[matricule] -= 1
+            if self._counts[matricule] <= 0:
+                del self._counts[matricule]
+        if new_code == CODE_CONGE:
+            self._counts[matricule] += 1
+
+    def count(self, matricule: str) -> int:
+        return self._counts.get(matricule, 0)
+
+    def solde(self, emp: Dict[str, str]) -> str:
+        """Solde de congé de l'employé : solde initial - tous ses congés."""
+        solde_initial = parse_float(emp.get("Solde initial congé", 0))
+        return str(max(solde_initial - self.count(emp.get("Matricule", "")), 0))
+
+    def update_soldes(self, employes: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Met à jour "Solde de congé" et renvoie les employés dont le solde a changé."""
+        changed = []
+        for emp in employes:
+            solde = self.solde(emp)
+            if emp.get("Solde de congé") != solde:
+                emp["Solde de congé"] = solde
+                changed.append(emp)
+        return changed
+
+    def verify(self, presences: Dict[str, str]) -> bool:
+        """Vérifie que les compteurs correspondent à un recomptage complet."""
+        return +self._counts == self._count(presences)
@@ -0,0 +1,306 @@
+# python-app/data_codec.py
+"""
+Formats d'écriture des fichiers de données (employes.json, presences.json, salaires.json).
+
+Deux formats :
+- "json" : JSON indenté, lisible à l'œil (format historique, toujours
+  disponible comme export) ;
+- "compact" : JSON sans indentation, précédé d'un en-tête de schéma, où les
+  données sont rangées en colonnes pour ne plus répéter les clés :
+    * salaires : une table par mois (colonnes = noms des saisies, une ligne
+      de valeurs par matricule) ;
+    * présences : par mois, une chaîne d'un caractère par jour et par
+      matricule ("." = pas de saisie) ;
+    * employés : colonnes = champs, une ligne par employé.
+  Encodé par orjson s'il est installé, sinon par le module json standard.
+
+`decode()` reconnaît les deux formats : le choix du format n'affecte que
+l'écriture, et les données relues sont identiques à celles écrites. Ce qui
+ne rentre pas dans les colonnes (clé non standard, valeur nulle, code de
+présence inconnu) est conservé tel quel à côté des tables.
+
+Depuis la ligne de commande :
+    python data_codec.py convertir data compact       # réécrit les fichiers au format compact
+    python data_codec.py exporter data export/        # copies JSON indentées dans export/
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from presence_index import ALLOWED_PRESENCE_VALUES, parse_presence_key, presence_key
+
+try:
+    import orjson
+except ImportError:  # optionnel : repli sur le module json standard
+    orjson = None
+
+FORMAT_JSON = "json"
+FORMAT_COMPACT = "compact"
+FORMATS = (FORMAT_JSON, FORMAT_COMPACT)
+
+# En-tête des fichiers compacts (version du schéma des tables ci-dessous)
+FORMAT_ID = "colarys-compact"
+SCHEMA_VERSION = 1
+_ENTETE = b'{"format":"' + FORMAT_ID.encode("ascii") + b'"'
+
+# Nom de fichier -> nature des données (les autres fichiers sont écrits sans tables)
+KINDS = {"employes.json": "employes", "presences.json": "presences", "salaires.json": "salaires"}
+
+# Jour sans saisie dans une ligne de présences
+_VIDE = "."
+
+
+def kind_for(filename: str) -> Optional[str]:
+    return KINDS.get(os.path.basename(filename))
+
+
+def dumps_compact(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_pretty(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, indent=4).encode("utf-8")
+
+
+def loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# --- tables en colonnes ----------------------------------------------------
+
+def _table(records: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    """[(clé, {champ: valeur})] -> {"colonnes", "cles", "lignes"}.
+
+    Une ligne est la liste des valeurs dans l'ordre des colonnes (None pour
+    un champ absent) ; un enregistrement qui n'est pas un dict ou qui
+    contient une valeur nulle est gardé tel quel à la place de sa ligne.
+    """
+    colonnes: Dict[str, int] = {}
+    for _, rec in records:
+        if isinstance(rec, dict):
+            for champ in rec:
+                if champ not in colonnes:
+                    colonnes[champ] = len(colonnes)
+    lignes = []
+    for _, rec in records:
+        if not isinstance(rec, dict) or None in rec.values():
+            lignes.append({"brut": rec})
+            continue
+        ligne = [None] * len(colonnes)
+        for champ, valeur in rec.items():
+            ligne[colonnes[champ]] = valeur
+        lignes.append(ligne)
+    return {"colonnes": list(colonnes), "cles": [cle for cle, _ in records], "lignes": lignes}
+
+
+def _records(table: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    colonnes = table["colonnes"]
+    records = []
+    for cle, ligne in zip(table["cles"], table["lignes"]):
+        if isinstance(ligne, dict):
+            records.append((cle, ligne["brut"]))
+        else:
+            records.append((cle, {c: v for c, v in zip(colonnes, ligne) if v is not None}))
+    return records
+
+
+def _encode_employes(employes: List[Any]) -> Dict[str, Any]:
+    table = _table([("", emp) for emp in employes])
+    del table["cles"]
+    return table
+
+
+def _decode_employes(table: Dict[str, Any]) -> List[Any]:
+    return [rec for _, rec in _records({**table, "cles": [""] * len(table["lignes"])})]
+
+
+def _encode_salaires(salaires: Dict[str, Any]) -> Dict[str, Any]:
+    from storage import parse_salaire_key, salaire_key
+
+    par_mois: Dict[str, List[Tuple[str, Any]]] = {}
+    autres = {}
+    for cle, rec in salaires.items():
+        parsed = parse_salaire_key(cle)
+        if parsed is None or salaire_key(*parsed) != cle:
+            autres[cle] = rec
+            continue
+        matricule, year, month = parsed
+        par_mois.setdefault(f"{year}-{month}", []).append((matricule, rec))
+    return {"mois": {mois: _table(records) for mois, records in par_mois.items()}, "autres": autres}
+
+
+def _decode_salaires(data: Dict[str, Any]) -> Dict[str, Any]:
+    salaires = {}
+    for mois, table in data["mois"].items():
+        prefixe = "_" + mois.replace("-", "_")
+        for matricule, rec in _records(table):
+            salaires[matricule + prefixe] = rec
+    salaires.update(data["autres"])
+    return salaires
+
+
+# Jours tels qu'écrits par `presence_key` ("4", pas "04")
+_JOURS_IDS = {str(day): day for day in range(1, 32)}
+# Codes rangés dans les lignes (un caractère chacun)
+_CODES_LIGNE = frozenset(ALLOWED_PRESENCE_VALUES)
+
+
+def _encode_presences(presences: Dict[str, Any]) -> Dict[str, Any]:
+    par_mois: Dict[str, Dict[str, Dict[int, str]]] = {}
+    # "MATRICULE_ANNEE_MOIS" -> jours du matricule dans son mois (None si la clé est à garder telle quelle)
+    lignes_par_prefixe: Dict[str, Optional[Dict[int, str]]] = {}
+    autres = {}
+    for cle, code in presences.items():
+        prefixe, _, jour = cle.rpartition("_")
+        if prefixe in lignes_par_prefixe:
+            jours = lignes_par_prefixe[prefixe]
+        else:
+            parsed = parse_presence_key(prefixe + "_1")
+            jours = None
+            if parsed is not None and presence_key(*parsed) == prefixe + "_1":
+                matricule, year, month, _ = parsed
+                jours = par_mois.setdefault(f"{year}-{month}", {}).setdefault(matricule, {})
+            lignes_par_prefixe[prefixe] = jours
+        day = _JOURS_IDS.get(jour)
+        if jours is None or day is None or not isinstance(code, str) or code not in _CODES_LIGNE:
+            autres[cle] = code
+            continue
+        jours[day] = code
+    mois = {}
+    for nom, lignes in par_mois.items():
+        matricules = [m for m, jours in lignes.items() if jours]
+        codes = []
+        for matricule in matricules:
+            jours = lignes[matricule]
+            ligne = [_VIDE] * max(jours)
+            for day, code in jours.items():
+                ligne[day - 1] = code
+            codes.append("".join(ligne))
+        if matricules:
+            mois[nom] = {"matricules": matricules, "codes": codes}
+    return {"mois": mois, "autres": autres}
+
+
+_JOURS = [str(day) for day in range(32)]
+
+
+def _decode_presences(data: Dict[str, Any]) -> Dict[str, str]:
+    presences = {}
+    for nom, table in data["mois"].items():
+        suffixe = "_" + nom.replace("-", "_") + "_"
+        for matricule, ligne in zip(table["matricules"], table["codes"]):
+            prefixe = matricule + suffixe
+            if _VIDE in ligne:
+                presences.update({prefixe + _JOURS[day]: code for day, code in enumerate(ligne, 1) if code != _VIDE})
+            else:
+                presences.update(zip([prefixe + jour for jour in _JOURS[1:len(ligne) + 1]], ligne))
+    presences.update(data["autres"])
+    return presences
+
+
+_ENCODERS = {"employes": _encode_employes, "salaires": _encode_salaires, "presences": _encode_presences}
+_DECODERS = {"employes": _decode_employes, "salaires": _decode_salaires, "presences": _decode_presences}
+_TYPES = {"employes": list, "salaires": dict, "presences": dict}
+
+
+# --- fichiers ----------------------------------------------------------------
+
+def encode(filename: str, data: Any, fmt: str = FORMAT_JSON) -> bytes:
+    """Contenu du fichier `filename` au format `fmt` ("json" ou "compact")."""
+    if fmt == FORMAT_JSON:
+        return dumps_pretty(data)
+    if fmt != FORMAT_COMPACT:
+        raise ValueError(f"Format de données inconnu : {fmt!r} (attendu : {', '.join(FORMATS)})")
+    kind = kind_for(filename)
+    if kind is None or not isinstance(data, _TYPES[kind]):
+        kind, contenu = "brut", data
+    else:
+        contenu = _ENCODERS[kind](data)
+    return dumps_compact({"format": FORMAT_ID, "schema": SCHEMA_VERSION, "kind": kind, "data": contenu})
+
+
+def is_compact(raw: bytes) -> bool:
+    return raw.startswith(_ENTETE)
+
+
+def decode(raw: bytes) -> Any:
+    """Données d'un fichier, quel que soit son format.
+
+    Lève ValueError si le fichier compact a été écrit par une version plus
+    récente du schéma.
+    """
+    obj = loads(raw)
+    if not is_compact(raw):
+        return obj
+    if obj.get("schema", 0) > SCHEMA_VERSION:
+        raise ValueError(f"schéma {obj.get('schema')} plus récent que celui pris en charge ({SCHEMA_VERSION})")
+    decoder = _DECODERS.get(obj.get("kind"))
+    return decoder(obj["data"]) if decoder else obj["data"]
+
+
+def read_file(filename: str) -> Any:
+    with open(filename, "rb") as f:
+        return decode(f.read())
+
+
+# --- ligne de commande -------------------------------------------------------
+
+def convertir(data_dir: str, fmt: str):
+    """Réécrit les fichiers de données de `data_dir` au format `fmt`, sous le verrou du dossier."""
+    from file_lock import FileLock
+    from storage import LOCK_FILE, atomic_write_bytes
+
+    with FileLock(os.path.join(data_dir, LOCK_FILE)):
+        for nom in KINDS:
+            chemin = os.path.join(data_dir, nom)
+            if not os.path.exists(chemin):
+                continue
+            avant = os.path.getsize(chemin)
+            debut = time.perf_counter()
+            atomic_write_bytes(chemin, encode(chemin, read_file(chemin), fmt))
+            print(f"💾 {nom} : {avant} -> {os.path.getsize(chemin)} octets ({time.perf_counter() - debut:.2f} s)")
+
+
+def exporter(data_dir: str, dossier: str):
+    """Copies JSON indentées des données de `data_dir`, modifications du journal comprises."""
+    from storage import DataRepository, atomic_write_bytes
+
+    os.makedirs(dossier, exist_ok=True)
+    depot = DataRepository(data_dir)
+    try:
+        for store in (depot.employes, depot.presences, depot.salaires):
+            chemin = os.path.join(dossier, os.path.basename(store.filename))
+            atomic_write_bytes(chemin, dumps_pretty(store.get()))
+            print(f"📤 {chemin}")
+    finally:
+        depot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversion et export des fichiers de données")
+    sub = parser.add_subparsers(dest="commande", required=True)
+    p = sub.add_parser("convertir", help="Réécrit les fichiers au format donné")
+    p.add_argument("data", help="Dossier des données")
+    p.add_argument("format", choices=FORMATS)
+    p = sub.add_parser("exporter", help="Copie les fichiers en JSON indenté")
+    p.add_argument("data", help="Dossier des données")
+    p.add_argument("dossier", help="Dossier de destination")
+    args = parser.parse_args()
+
+    if args.commande == "convertir":
+        convertir(args.data, args.format)
+    else:
+        if os.path.abspath(args.dossier) == os.path.abspath(args.data):
+            sys.exit("Le dossier d'export doit être différent du dossier des données")
+        exporter(args.data, args.dossier)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# python-app/employe_index.py
+"""
+Index des employés : matricule -> position dans la liste, et index
+secondaires Compagne / Fonction / Catégorie -> matricules. La recherche plein
+texte (`search()`, voir employe_search.py) est construite à la première
+requête puis tenue à jour par les mêmes méthodes.
+
+La liste des employés reste la référence (ordre d'affichage, contenu de
+employes.json). L'index la modifie lui-même (`add`, `replace`, `remove`)
+pour que la liste et les index restent cohérents.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from employe_search import EmployeSearch
+from journal import OP_EMPLOYE, OP_EMPLOYE_SUPPR
+
+# Champs avec un index secondaire
+INDEXED_FIELDS = ("Compagne", "Fonction", "Catégorie")
+
+
+class EmployeIndex:
+    """Recherche en O(1) par matricule et par valeur d'un champ indexé."""
+
+    def __init__(self, employes: List[Dict[str, str]], fields: Iterable[str] = INDEXED_FIELDS):
+        self.employes = employes
+        self.fields = tuple(fields)
+        self._positions: Dict[str, int] = {}
+        self._secondary: Dict[str, Dict[str, Set[str]]] = {}
+        self._search: Optional[EmployeSearch] = None
+        self.rebuild()
+
+    def rebuild(self):
+        """Reconstruit les index depuis la liste (après une modification hors de l'index)."""
+        self._positions = {}
+        self._secondary = {field: {} for field in self.fields}
+        self._search = None
+        for i, emp in enumerate(self.employes):
+            m = emp.get("Matricule", "")
+            # En cas de doublon, le premier employé de la liste gagne (comme une recherche linéaire)
+            if m not in self._positions:
+                self._positions[m] = i
+                self._index(emp)
+
+    def _reindex_positions(self, start: int):
+        seen = set()
+        for i in range(start, len(self.employes)):
+            m = self.employes[i].get("Matricule", "")
+            if m not in seen and self._positions.get(m, i) >= start:
+                self._positions[m] = i
+            seen.add(m)
+
+    def _index(self, emp: Dict[str, str]):
+        m = emp.get("Matricule", "")
+        for field in self.fields:
+            self._secondary[field].setdefault(emp.get(field, ""), set()).add(m)
+
+    def _unindex(self, emp: Dict[str, str]):
+        m = emp.get("Matricule", "")
+        for field in self.fields:
+            values = self._secondary[field]
+            value = emp.get(field, "")
+            matricules = values.get(value)
+            if matricules is not None:
+                matricules.discard(m)
+                if not matricules:
+                    del values[value]
+
+    # ---------- Lecture ----------
+    def __len__(self) -> int:
+        return len(self.employes)
+
+    def __contains__(self, matricule: str) -> bool:
+        return matricule in self._positions
+
+    def position(self, matricule: str) -> int:
+        """Position dans la liste ; -1 si le matricule est inconnu."""
+        return self._positions.get(matricule, -1)
+
+    def get(self, matricule: str) -> Optional[Dict[str, str]]:
+        i = self._positions.get(matricule)
+        return None if i is None else self.employes[i]
+
+    def positions(self, **criteria: str) -> List[int]:
+        """Positions (dans l'ordre de la liste) des employés dont les champs indexés valent `criteria`.
+
+        Exemple : positions(Compagne="Orange", Fonction="Téléconseiller").
+        """
+        matricules: Optional[Set[str]] = None
+        for field, value in criteria.items():
+            found = self._secondary[field].get(value, set())
+            matricules = set(found) if matricules is None else matricules & found
+        if matricules is None:
+            return list(range(len(self.employes)))
+        return sorted(self._positions[m] for m in matricules)
+
+    def find(self, **criteria: str) -> List[Dict[str, str]]:
+        """Employés dont les champs indexés valent `criteria`, dans l'ordre de la liste."""
+        return [self.employes[i] for i in self.positions(**criteria)]
+
+    def search(self) -> EmployeSearch:
+        """Index de recherche plein texte (construit au premier appel)."""
+        if self._search is None:
+            self._search = EmployeSearch(self.employes)
+        return self._search
+
+    def rechercher(self, query: str, limit: Optional[int] = 20) -> List[Dict[str, str]]:
+        """Employés correspondant à `query` (nom, prénom, téléphone, ...), du plus pertinent au moins pertinent."""
+        return [self.get(m) for m in self.search().matricules(query, limit)]
+
+    def values(self, field: str) -> List[str]:
+        """Valeurs distinctes d'un champ indexé."""
+        return sorted(self._secondary[field])
+
+    # ---------- Modifications (liste + index) ----------
+    def add(self, emp: Dict[str, str]):
+        self.employes.append(emp)
+        m = emp.get("Matricule", "")
+        if m not in self._positions:
+            self._positions[m] = len(self.employes) - 1
+            self._index(emp)
+            if self._search is not None:
+                self._search.add(emp)
+
+    def replace(self, matricule: str, emp: Dict[str, str]) -> bool:
+        """Remplace l'employé `matricule` (le matricule peut changer) ; False s'il est introuvable."""
+        i = self._positions.get(matricule)
+        if i is None:
+            return False
+        new = emp.get("Matricule", "")
+        if len(self._positions) < len(self.employes) or (new != matricule and new in self._positions):
+            # Matricules en double dans la liste : index reconstruit
+            self.employes[i] = emp
+            self.rebuild()
+            return True
+        self._unindex(self.employes[i])
+        del self._positions[matricule]
+        self.employes[i] = emp
+        self._positions[new] = i
+        self._index(emp)
+        if self._search is not None:
+            self._search.update(matricule, emp)
+        return True
+
+    def upsert(self, matricule: Optional[str], emp: Dict[str, str]):
+        """Remplace l'employé `matricule` s'il existe, sinon ajoute `emp` en fin de liste."""
+        if not self.replace(matricule or emp.get("Matricule", ""), emp):
+            self.add(emp)
+
+    def remove(self, matricule: str) -> bool:
+        """Supprime tous les employés ayant ce matricule ; False s'il n'y en a aucun."""
+        if matricule not in self._positions:
+            return False
+        first = self._positions.pop(matricule)
+        self._unindex(self.employes[first])
+        self.employes[:] = [e for e in self.employes if e.get("Matricule", "") != matricule]
+        self._reindex_positions(first)
+        if self._search is not None:
+            self._search.remove(matricule)
+        return True
+
+    def apply_entry(self, entry: Dict[str, Any]):
+        """Applique une entrée du journal (ajout/modification/suppression d'employés)."""
+        if entry.get("op") == OP_EMPLOYE:
+            for matricule, emp in entry["items"]:
+                self.upsert(matricule, emp)
+        elif entry.get("op") == OP_EMPLOYE_SUPPR:
+            self.remove(entry["matricule"])
@@ -0,0 +1,199 @@
+# python-app/employe_search.py
+"""
+Recherche plein texte des employés (nom, prénom, téléphone, campagne, ...).
+
+Index inversé en mémoire : chaque champ texte est découpé en tokens sans
+accents et en minuscules ("Andriamamonjy Voahary" -> andriamamonjy, voahary),
+et chaque token pointe vers les matricules qui le contiennent. Les tokens
+distincts sont aussi gardés dans une liste triée : tous les tokens qui
+commencent par un préfixe forment une tranche contiguë, trouvée par bisection.
+
+Une requête "andria voa" renvoie les employés dont un token commence par
+"andria" ET un token commence par "voa", classés par pertinence (token exact
+avant préfixe, matricule/nom avant adresse).
+"""
+import bisect
+import functools
+import heapq
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Champs indexés et leur poids dans le classement (les champs numériques de
+# `champs` - salaire, soldes, droits - ne sont pas indexés)
+SEARCH_FIELDS: Dict[str, int] = {
+    "Matricule": 8,
+    "Nom": 6,
+    "Prénom": 5,
+    "N° Téléphone": 4,
+    "Compagne": 3,
+    "Fonction": 3,
+    "Catégorie": 2,
+    "Adresse": 1,
+    "Mode de paiement": 1,
+    "Situation maritale": 1,
+    "Contact d'urgence - Nom et prénom": 1,
+    "Téléphone contact urgence": 1,
+    "Adresse du contact d'urgence": 1,
+}
+
+# Nombre de termes dont les scores restent en cache entre deux requêtes
+# (saisie au fil de l'eau : "ra", "rak", "rako", ...)
+TERM_CACHE_SIZE = 256
+
+# Bonus quand le terme de la requête est un token complet (et pas seulement un préfixe)
+EXACT_BONUS = 2
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents : "Téléopérateur" -> "teleoperateur"."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+@functools.lru_cache(maxsize=65536)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Tokens d'un texte ; un numéro "034 04 079 05" donne aussi "0340407905"."""
+    folded = fold(text or "")
+    tokens = _TOKEN_RE.findall(folded)
+    digits = "".join(t for t in tokens if t.isdigit())
+    if len(tokens) > 1 and len(digits) >= 6 and all(t.isdigit() for t in tokens):
+        tokens.append(digits)
+    return tuple(tokens)
+
+
+class EmployeSearch:
+    """Index inversé token -> {matricule: poids}, avec recherche par préfixe."""
+
+    def __init__(self, employes: Iterable[Dict[str, str]] = (), fields: Optional[Dict[str, int]] = None):
+        self.fields = dict(SEARCH_FIELDS if fields is None else fields)
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._tokens: List[str] = []  # tokens distincts, triés
+        self._doc_tokens: Dict[str, Dict[str, int]] = {}
+        self._term_cache: Dict[str, Dict[str, int]] = {}
+        self.build(employes)
+
+    def build(self, employes: Iterable[Dict[str, str]]):
+        self._postings = {}
+        self._doc_tokens = {}
+        self._term_cache = {}
+        for emp in employes:
+            m = emp.get("Matricule", "")
+            # Matricule en double : le premier employé de la liste gagne (comme EmployeIndex)
+            if m not in self._doc_tokens:
+                self._doc_tokens[m] = self._weights(emp)
+                for token, weight in self._doc_tokens[m].items():
+                    self._postings.setdefault(token, {})[m] = weight
+        self._tokens = sorted(self._postings)
+
+    def _weights(self, emp: Dict[str, str]) -> Dict[str, int]:
+        weights: Dict[str, int] = {}
+        for field, weight in self.fields.items():
+            for token in tokenize(emp.get(field) or ""):
+                if weights.get(token, 0) < weight:
+                    weights[token] = weight
+        return weights
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    # ---------- Mises à jour incrémentales ----------
+    def add(self, emp: Dict[str, str]):
+        m = emp.get("Matricule", "")
+        if m in self._doc_tokens:
+            self.remove(m)
+        weights = self._doc_tokens[m] = self._weights(emp)
+        self._term_cache.clear()
+        for token, weight in weights.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                bisect.insort(self._tokens, token)
+            posting[m] = weight
+
+    def remove(self, matricule: str):
+        weights = self._doc_tokens.pop(matricule, None)
+        if weights is None:
+            return
+        self._term_cache.clear()
+        for token in weights:
+            posting = self._postings[token]
+            del posting[matricule]
+            if not posting:
+                del self._postings[token]
+                i = bisect.bisect_left(self._tokens, token)
+                del self._tokens[i]
+
+    def update(self, matricule: Optional[str], emp: Dict[str, str]):
+        """Ré-indexe un employé modifié (son matricule a pu changer)."""
+        if matricule is not None:
+            self.remove(matricule)
+        self.add(emp)
+
+    # ---------- Recherche ----------
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._tokens, prefix)
+        end = bisect.bisect_left(self._tokens, prefix + "\uffff", start)
+        return self._tokens[start:end]
+
+    def _term_scores(self, term: str) -> Dict[str, int]:
+        scores = self._term_cache.get(term)
+        if scores is not None:
+            return scores
+        scores = {}
+        for token in self._prefix_tokens(term):
+            bonus = EXACT_BONUS if token == term else 0
+            for m, weight in self._postings[token].items():
+                score = weight + bonus
+                if scores.get(m, 0) < score:
+                    scores[m] = score
+        if len(self._term_cache) >= TERM_CACHE_SIZE:
+            self._term_cache.clear()
+        self._term_cache[term] = scores
+        return scores
+
+    def _doc_score(self, matricule: str, term: str) -> int:
+        """Score d'un seul employé pour un terme (0 s'il ne correspond pas)."""
+        best = 0
+        for token, weight in self._doc_tokens[matricule].items():
+            if token.startswith(term):
+                score = weight + (EXACT_BONUS if token == term else 0)
+                if best < score:
+                    best = score
+        return best
+
+    def _cost(self, term: str) -> int:
+        if term in self._term_cache:
+            return len(self._term_cache[term])
+        return sum(len(self._postings[token]) for token in self._prefix_tokens(term))
+
+    def search(self, query: str, limit: Optional[int] = 20) -> List[Tuple[str, int]]:
+        """(matricule, score) des employés correspondant à tous les termes, du plus pertinent au moins pertinent."""
+        terms = sorted(set(tokenize(query)), key=self._cost)
+        if not terms:
+            return []
+        # Terme le plus sélectif d'abord ; les suivants sont vérifiés sur les
+        # seuls candidats restants quand ils sont peu nombreux
+        scores = self._term_scores(terms[0])
+        for term in terms[1:]:
+            if not scores:
+                break
+            if term in self._term_cache or len(scores) * 4 > self._cost(term):
+                term_scores = self._term_scores(term)
+                scores = {m: s + term_scores[m] for m, s in scores.items() if m in term_scores}
+            else:
+                narrowed = {}
+                for m, s in scores.items():
+                    score = self._doc_score(m, term)
+                    if score:
+                        narrowed[m] = s + score
+                scores = narrowed
+        key = lambda item: (-item[1], item[0])
+        if limit is None:
+            return sorted(scores.items(), key=key)
+        return heapq.nsmallest(limit, scores.items(), key=key)
+
+    def matricules(self, query: str, limit: Optional[int] = 20) -> List[str]:
+        return [m for m, _ in self.search(query, limit)]
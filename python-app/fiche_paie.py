@@ -0,0 +1,580 @@
+# python-app/fiche_paie.py
+"""
+Génération des fiches de paie PDF sans interface graphique.
+
+Les fiches sont construites directement depuis les résultats de paie
+(`paie.ResultatPaie`) et les fiches employés, puis rendues par ReportLab dans
+un pool de processus : un PDF par employé, ou un seul fichier fusionné
+(fusion par pypdf si installé, sinon rendu en un seul document).
+
+Le pool est démarré en mode "spawn" (`pool_rendu`) : un serveur
+multithreadé (uvicorn) ne doit pas être dupliqué par fork. Un service garde
+un seul pool pour toute sa durée de vie et le passe à `generer_fiches` ;
+la ligne de commande en crée un le temps de la génération.
+
+Les PDF rendus peuvent être gardés dans un `CacheFiches`, rangés par
+empreinte de leurs données (employé, codes de présence du mois, saisies
+manuelles, version du modèle) : une réimpression ne rend que les fiches
+dont les données ont changé.
+
+Depuis la ligne de commande :
+    python fiche_paie.py 2025 10 --data data --sortie fiches
+    python fiche_paie.py 2025 10 --fusion fiches_2025_10.pdf --matricules CC0001 CC0002
+"""
+import argparse
+import datetime
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table as RLTable, TableStyle
+
+from paie import (
+    INDEM_FORMATION_HEURE, INDEM_REPAS_JOUR, INDEM_TRANSPORT_JOUR, IRSA_TRANCHES, JOURS_THEORIQUES_DEFAUT, ResultatPaie,
+    anciennete_ans_depuis_date, calcul_droit_depuis_date,
+)
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # fusion en un seul rendu ReportLab
+    PdfWriter = None
+
+FICHE_ROWS = [
+    "salaire de base",
+    "Prime de responsabilité",
+    "Prime assiduité",
+    "prime d'ancienneté",
+    "Prime production",
+    "Avance sur salaire",
+    "Prime Elité",
+    "indemnité de congé",
+    "Indemnité formation",
+    "Indemnité IRSA",
+    "cnaps 1%",
+    "ostie 1%",
+    "IRSA 1ere tranche",
+    "IRSA 2eme tranche",
+    "IRSA 3eme tranche",
+    "IRSA 4eme tranche",
+    "IRSA 5eme tranche",
+    "IRSA à payer",
+    "Majoration de nuit",
+    "Majoration férié",
+    "Indemnité de rep",
+    "Indemnité de trans",
+    "Social",
+    "B1",
+    "S1",
+    "Salaire net à payer"
+]
+
+IRSA_LIGNES = ["IRSA 1ere tranche", "IRSA 2eme tranche", "IRSA 3eme tranche", "IRSA 4eme tranche", "IRSA 5eme tranche"]
+
+FICHE_COLONNES = ["DÉTAIL DES RUBRIQUES", "Présent", "Bases", "TAUX", "BRUT", "BASE", "Retenues", "Reste à payer"]
+
+# À incrémenter à chaque changement de la mise en page ou du contenu des fiches
+# (invalide les PDF du cache)
+TEMPLATE_VERSION = 1
+
+# Signataire côté employeur
+EMPLOYEUR = "COLLARD Mialy Rinah"
+
+# Fiche = (employé, résultat de paie)
+Fiche = Tuple[Dict[str, str], ResultatPaie]
+
+
+def lignes_fiche(res: ResultatPaie) -> List[List[str]]:
+    """Lignes du tableau de la fiche (colonnes FICHE_COLONNES), textes prêts à afficher."""
+    lignes = []
+    total_brut = 0.0
+    total_retenues = 0.0
+
+    for lib in FICHE_ROWS:
+        present = bases = taux = brut_amount = retenue_amount = ""
+
+        if lib == "salaire de base":
+            present, taux, brut_amount = int(res.h_presence), round(res.taux_horaire), round(res.montant_travaille)
+            total_brut += res.montant_travaille
+
+        elif lib in ["Prime de responsabilité", "Prime assiduité", "prime d'ancienneté", "Prime production", "Prime Elité"]:
+            val = {
+                "Prime de responsabilité": res.prime_responsabilite,
+                "Prime assiduité": res.prime_assiduite,
+                "prime d'ancienneté": res.prime_anciennete,
+                "Prime production": res.prime_production,
+                "Prime Elité": res.prime_elite,
+            }[lib]
+            brut_amount = round(val)
+            total_brut += val
+
+        elif lib == "Majoration de nuit":
+            present, bases, taux, brut_amount = int(res.h_nuit), "30%", int(round(res.taux_maj_nuit)), round(res.maj_nuit)
+            total_brut += res.maj_nuit
+
+        elif lib == "Majoration férié":
+            present, bases, taux, brut_amount = int(res.h_ferie), "100%", int(round(res.taux_maj_ferie)), round(res.maj_ferie)
+            total_brut += res.maj_ferie
+
+        elif lib == "indemnité de congé":
+            present, taux, brut_amount = int(res.h_conge), round(res.taux_horaire), round(res.indem_conge)
+            total_brut += res.indem_conge
+
+        elif lib == "Indemnité formation":
+            present, taux, brut_amount = int(res.h_formation), INDEM_FORMATION_HEURE, round(res.indem_formation)
+            total_brut += res.indem_formation
+
+        elif lib == "Indemnité IRSA":
+            brut_amount = round(res.igr)
+            total_brut += res.igr
+
+        elif lib == "Indemnité de rep":
+            present, taux, brut_amount = res.jours_presence, INDEM_REPAS_JOUR, round(res.indem_repas)
+            total_brut += res.indem_repas
+
+        elif lib == "Indemnité de trans":
+            present, taux, brut_amount = res.jours_presence, INDEM_TRANSPORT_JOUR, round(res.indem_transport)
+            total_brut += res.indem_transport
+
+        elif lib == "Social":
+            retenue_amount = round(res.social)
+            total_retenues += res.social
+
+        elif lib == "cnaps 1%":
+            retenue_amount = round(res.cnaps)
+            total_retenues += res.cnaps
+
+        elif lib == "ostie 1%":
+            retenue_amount = round(res.ostie)
+            total_retenues += res.ostie
+
+        elif lib in IRSA_LIGNES:
+            t = IRSA_LIGNES.index(lib)
+            bases, taux, retenue_amount = round(res.tranches[t]), f"{IRSA_TRANCHES[t][2]:.0%}", round(res.reps[t])
+            # ⚠️ ces valeurs ne s'ajoutent pas à total_retenues directement
+
+        elif lib == "IRSA à payer":
+            retenue_amount = round(res.igr)
+            total_retenues += res.igr
+
+        elif lib == "Avance sur salaire":
+            retenue_amount = round(res.avance)
+            total_retenues += res.avance
+
+        elif lib == "B1":
+            brut_amount = int(round(total_brut))
+
+        elif lib == "S1":
+            retenue_amount = int(round(total_retenues))
+
+        # colonne "BASE" = "Bases" pour cohérence ; "Reste à payer" seulement sur la ligne du net
+        lignes.append([lib, present, bases, taux, brut_amount, bases, retenue_amount, ""])
+
+    net = total_brut - total_retenues
+    lignes[FICHE_ROWS.index("Salaire net à payer")][7] = f"{int(round(net)):,}".replace(",", " ") + " Ar"
+    return [["" if val in ("", None) else str(val) for val in ligne] for ligne in lignes]
+
+
+def elements_fiche(emp: Dict[str, str], res: ResultatPaie) -> List[Any]:
+    """Éléments ReportLab d'une fiche (une page)."""
+    styles = getSampleStyleSheet()
+    style_title = styles["Heading1"]
+    style_title.alignment = 1
+    style_title.fontSize = 18
+    style_info = styles["Normal"]
+    style_info.fontSize = 10
+
+    elements = []
+
+    # ---- En-tête ----
+    elements.append(Paragraph("COLARYS CONCEPT", style_title))
+    elements.append(Spacer(1, 20))
+
+    infos = {
+        "Nom": emp.get("Nom", ""),
+        "Prénom": emp.get("Prénom", ""),
+        "Matricule": emp.get("Matricule", ""),
+        "Fonction": emp.get("Fonction", ""),
+        "Mode de paiement": emp.get("Mode de paiement", ""),
+        "Salaire de base": emp.get("Salaire de base", ""),
+        "Mois": str(res.mois),
+        "Catégorie": emp.get("Catégorie", ""),
+        "Congé disponible": emp.get("Solde de congé", ""),
+        "compagne": emp.get("Compagne", ""),
+        "Année": str(res.annee),
+    }
+    left_labels = ["Nom", "Prénom", "Matricule", "Fonction", "Mode de paiement", "Salaire de base"]
+    right_labels = ["Mois", "Catégorie", "Congé disponible", "compagne", "Année"]
+
+    data_info = []
+    for i in range(max(len(left_labels), len(right_labels))):
+        left_text = f"<b>{left_labels[i]}:</b> {infos[left_labels[i]]}" if i < len(left_labels) else ""
+        right_text = f"<b>{right_labels[i]}:</b> {infos[right_labels[i]]}" if i < len(right_labels) else ""
+        data_info.append([Paragraph(left_text, style_info), Paragraph(right_text, style_info)])
+
+    info_table = RLTable(data_info, colWidths=[200, 200])
+    info_table.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    elements.append(info_table)
+    elements.append(Spacer(1, 15))
+
+    # ---- Tableau principal ----
+    table = RLTable([FICHE_COLONNES] + lignes_fiche(res), repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ]))
+    elements.append(table)
+    elements.append(Spacer(1, 15))
+
+    # ---- Signatures ----
+    nom_salarie = f"{emp.get('Nom', '')} {emp.get('Prénom', '')}".strip()
+    footer_data = [
+        ["EMPLOYEUR", "SALARIÉ"],
+        ["", ""],
+        [EMPLOYEUR, nom_salarie if nom_salarie else "Nom Prénom"]
+    ]
+    footer = RLTable(footer_data, colWidths=[200, 200])
+    footer.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 1), (-1, 2), 20),
+    ]))
+    elements.append(footer)
+    return elements
+
+
+def _construire(cible: Any, fiches: Sequence[Fiche]):
+    elements = []
+    for idx, (emp, res) in enumerate(fiches):
+        elements.extend(elements_fiche(emp, res))
+        # saut de page entre employés
+        if idx < len(fiches) - 1:
+            elements.append(PageBreak())
+    pdf = SimpleDocTemplate(
+        cible, pagesize=A4,
+        leftMargin=25, rightMargin=25,
+        topMargin=25, bottomMargin=25
+    )
+    pdf.build(elements)
+
+
+def rendre_pdf(fiches: Sequence[Fiche]) -> bytes:
+    """PDF (en mémoire) des fiches données, une fiche par employé."""
+    buffer = io.BytesIO()
+    _construire(buffer, fiches)
+    return buffer.getvalue()
+
+
+def nom_fichier(emp: Dict[str, str], res: ResultatPaie) -> str:
+    return f"fiche_{emp.get('Matricule', '') or 'sans_matricule'}_{res.annee}_{res.mois:02d}.pdf"
+
+
+def ecrire_pdf(chemin: str, pdf: bytes):
+    """Écrit un PDF via un fichier temporaire unique puis un renommage atomique.
+
+    Plusieurs générations (threads et workers du serveur) peuvent écrire le
+    même fichier pendant qu'il est téléchargé : un lecteur voit l'ancien ou
+    le nouveau PDF, jamais un fichier partiel. Lève OSError en cas d'échec.
+    """
+    fd, tmp = tempfile.mkstemp(
+        prefix=os.path.basename(chemin) + ".", suffix=".tmp", dir=os.path.dirname(chemin) or "."
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp, chemin)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _rendre_une(fiche: Fiche) -> Tuple[str, bytes]:
+    """Tâche d'un processus du pool : (matricule, PDF)."""
+    return fiche[0].get("Matricule", ""), rendre_pdf([fiche])
+
+
+# ---------------------- CACHE DES FICHES RENDUES ----------------------
+def empreinte_fiche(
+    emp: Dict[str, str],
+    annee: int,
+    mois: int,
+    codes: Sequence[str],
+    saisies: Dict[str, Any],
+    jours_theoriques: int = JOURS_THEORIQUES_DEFAUT,
+    today: Optional[datetime.date] = None,
+) -> str:
+    """Empreinte (SHA-256) de tout ce qui détermine le PDF d'une fiche."""
+    today = today or datetime.date.today()
+    date_emb = emp.get("Date d'embauche", "")
+    codes = [(c or "").lower() for c in codes]
+    while codes and not codes[-1]:
+        codes.pop()
+    contenu = {
+        "template": TEMPLATE_VERSION,
+        "employe": emp,
+        "periode": [annee, mois, jours_theoriques],
+        "codes": codes,
+        "saisies": saisies,
+        # droit et ancienneté dépendent de la date du jour
+        "droit": [calcul_droit_depuis_date(date_emb, today), anciennete_ans_depuis_date(date_emb, today)],
+    }
+    brut = json.dumps(contenu, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(brut.encode("utf-8")).hexdigest()
+
+
+def empreintes_fiches(
+    fiches: Sequence[Fiche],
+    codes_mois: Dict[str, Sequence[str]],
+    saisies: Dict[str, Any],
+    today: Optional[datetime.date] = None,
+) -> List[str]:
+    """Empreintes des fiches : `codes_mois` matricule -> codes du mois, `saisies` clés "MATRICULE_ANNEE_MOIS"."""
+    empreintes = []
+    for emp, res in fiches:
+        m = emp.get("Matricule", "")
+        empreintes.append(empreinte_fiche(
+            emp, res.annee, res.mois, codes_mois.get(m, []), saisies.get(f"{m}_{res.annee}_{res.mois}", {}),
+            res.jours_theoriques, today,
+        ))
+    return empreintes
+
+
+class CacheFiches:
+    """PDF déjà rendus, un fichier <empreinte>.pdf par fiche."""
+
+    def __init__(self, dossier: str):
+        self.dossier = dossier
+        os.makedirs(dossier, exist_ok=True)
+
+    def chemin(self, empreinte: str) -> str:
+        return os.path.join(self.dossier, f"{empreinte}.pdf")
+
+    def get(self, empreinte: str) -> Optional[bytes]:
+        try:
+            with open(self.chemin(empreinte), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, empreinte: str, pdf: bytes):
+        # Écriture atomique : un rendu interrompu ne laisse pas de PDF tronqué
+        try:
+            ecrire_pdf(self.chemin(empreinte), pdf)
+        except OSError as e:
+            print(f"⚠️ Fiche non mise en cache ({e})")
+
+
+def empreinte_fusion(empreintes: Sequence[str]) -> str:
+    """Empreinte d'un document fusionné : celles de ses fiches, dans l'ordre."""
+    return hashlib.sha256(("fusion:" + ",".join(empreintes)).encode("ascii")).hexdigest()
+
+
+def pool_rendu(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Pool de processus de rendu, démarrés par spawn (jamais par fork)."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _rendus_pool(pool: ProcessPoolExecutor, fiches: Sequence[Fiche]) -> Iterator[Tuple[int, str, bytes]]:
+    futures = {pool.submit(_rendre_une, fiche): i for i, fiche in enumerate(fiches)}
+    try:
+        for future in as_completed(futures):
+            yield (futures[future], *future.result())
+    finally:
+        # Génération abandonnée (client déconnecté, erreur) : le pool est
+        # partagé, les rendus pas encore commencés n'y restent pas
+        for future in futures:
+            future.cancel()
+
+
+def _rendus(
+    fiches: Sequence[Fiche], workers: Optional[int], pool: Optional[ProcessPoolExecutor] = None
+) -> Iterator[Tuple[int, str, bytes]]:
+    """(position, matricule, PDF) de chaque fiche, dans l'ordre de fin de rendu.
+
+    Avec `pool`, les rendus y sont soumis (le pool n'est pas arrêté) ;
+    sinon un pool de `workers` processus est créé pour l'occasion.
+    """
+    if pool is None and (workers == 1 or len(fiches) <= 1):
+        for i, fiche in enumerate(fiches):
+            yield (i, *_rendre_une(fiche))
+        return
+    if pool is not None:
+        yield from _rendus_pool(pool, fiches)
+        return
+    with pool_rendu(workers) as pool:
+        yield from _rendus_pool(pool, fiches)
+
+
+def generer_fiches(
+    fiches: Sequence[Fiche],
+    dossier: Optional[str] = None,
+    fusion: Optional[str] = None,
+    workers: Optional[int] = None,
+    cache: Optional[CacheFiches] = None,
+    empreintes: Optional[Sequence[str]] = None,
+    pool: Optional[ProcessPoolExecutor] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Rend les fiches et publie l'avancement.
+
+    Un PDF par employé dans `dossier`, ou un seul fichier `fusion`. Avec un
+    `cache` et les `empreintes` des fiches (`empreintes_fiches`), seules les
+    fiches absentes du cache sont rendues. Les rendus sont faits dans `pool`
+    s'il est donné (voir `pool_rendu`), sinon dans un pool de `workers`
+    processus créé pour l'occasion. Chaque fiche produit un événement
+    {"fait", "total", "matricule", "cache"} ; le dernier événement contient
+    "fichiers", la liste des PDF écrits, et "rendues", le nombre de rendus.
+    """
+    if not dossier and not fusion:
+        raise ValueError("Indiquer un dossier de sortie ou un fichier fusionné")
+    if cache is not None and empreintes is None:
+        raise ValueError("Le cache nécessite les empreintes des fiches")
+    total = len(fiches)
+
+    if fusion and PdfWriter is None:
+        # Sans pypdf, les PDF des fiches ne peuvent pas être assemblés : le
+        # document est rendu d'un bloc et mis en cache en entier, sous
+        # l'empreinte de l'ensemble de ses fiches
+        cle = empreinte_fusion(empreintes) if cache is not None else None
+        pdf = cache.get(cle) if cle is not None else None
+        depuis_cache = pdf is not None
+        if pdf is None:
+            pdf = pool.submit(rendre_pdf, list(fiches)).result() if pool is not None else rendre_pdf(fiches)
+            if cle is not None:
+                cache.put(cle, pdf)
+        ecrire_pdf(fusion, pdf)
+        yield {"fait": total, "total": total, "matricule": None, "cache": depuis_cache}
+        yield {"fait": total, "total": total, "fichiers": [fusion], "rendues": 0 if depuis_cache else total}
+        return
+
+    en_cache = []
+    a_rendre = []
+    for i, (emp, _) in enumerate(fiches):
+        pdf = cache.get(empreintes[i]) if cache is not None else None
+        if pdf is None:
+            a_rendre.append(i)
+        else:
+            en_cache.append((i, emp.get("Matricule", ""), pdf, True))
+    rendus = (
+        (a_rendre[j], matricule, pdf, False)
+        for j, matricule, pdf in _rendus([fiches[i] for i in a_rendre], workers, pool)
+    )
+
+    pdfs: List[Optional[bytes]] = [None] * total
+    fichiers = []
+    for fait, (i, matricule, pdf, depuis_cache) in enumerate(itertools.chain(en_cache, rendus), start=1):
+        if cache is not None and not depuis_cache:
+            cache.put(empreintes[i], pdf)
+        if fusion:
+            pdfs[i] = pdf
+        else:
+            chemin = os.path.join(dossier, nom_fichier(*fiches[i]))
+            ecrire_pdf(chemin, pdf)
+            fichiers.append(chemin)
+        yield {"fait": fait, "total": total, "matricule": matricule, "cache": depuis_cache}
+
+    if fusion:
+        writer = PdfWriter()
+        for pdf in pdfs:
+            writer.append(io.BytesIO(pdf))
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        ecrire_pdf(fusion, buffer.getvalue())
+        fichiers = [fusion]
+    yield {"fait": total, "total": total, "fichiers": fichiers, "rendues": len(a_rendre)}
+
+
+def fiches_du_mois(
+    depot: Any,
+    annee: int,
+    mois: int,
+    jours_theoriques: int = JOURS_THEORIQUES_DEFAUT,
+    matricules: Optional[Sequence[str]] = None,
+) -> List[Fiche]:
+    """(employé, résultat) du mois pour les employés d'un stockage, dans l'ordre de la liste des employés."""
+    return fiches_et_empreintes_du_mois(depot, annee, mois, jours_theoriques, matricules, empreintes=False)[0]
+
+
+def fiches_et_empreintes_du_mois(
+    depot: Any,
+    annee: int,
+    mois: int,
+    jours_theoriques: int = JOURS_THEORIQUES_DEFAUT,
+    matricules: Optional[Sequence[str]] = None,
+    empreintes: bool = True,
+) -> Tuple[List[Fiche], Optional[List[str]]]:
+    """Fiches du mois (voir `fiches_du_mois`) et leurs empreintes pour le cache.
+
+    Paie et empreintes partent de la même lecture du stockage et de la même
+    date : une écriture faite entre les deux ne peut pas ranger dans le cache
+    un PDF calculé sur les anciennes données sous l'empreinte des nouvelles.
+    """
+    from paie_lot import donnees_du_mois, paie_du_mois
+
+    today = datetime.date.today()
+    donnees = donnees_du_mois(depot, annee, mois)
+    lot = paie_du_mois(depot, annee, mois, jours_theoriques, today, donnees)
+    voulus = set(matricules) if matricules else None
+    fiches = [
+        (emp, lot.resultat(i)) for i, emp in enumerate(lot.employes)
+        if voulus is None or emp.get("Matricule", "") in voulus
+    ]
+    if not empreintes:
+        return fiches, None
+    _, codes_mois, saisies = donnees
+    return fiches, empreintes_fiches(fiches, codes_mois, saisies, today)
+
+
+def main():
+    from storage import open_repository
+
+    parser = argparse.ArgumentParser(description="Génération des fiches de paie PDF d'un mois")
+    parser.add_argument("annee", type=int)
+    parser.add_argument("mois", type=int)
+    parser.add_argument("--data", default="data", help="Dossier des données")
+    parser.add_argument("--jours", type=int, default=JOURS_THEORIQUES_DEFAUT, help="Jours de travail théoriques")
+    parser.add_argument("--matricules", nargs="*", help="Limiter à ces employés")
+    parser.add_argument("--sortie", default="fiches", help="Dossier des PDF (un par employé)")
+    parser.add_argument("--fusion", help="Écrire un seul PDF fusionné à ce chemin")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--cache", default=None, help="Dossier du cache des fiches rendues (défaut : <data>/fiches/cache)")
+    parser.add_argument("--sans-cache", action="store_true", help="Rendre toutes les fiches")
+    args = parser.parse_args()
+
+    depot = open_repository(args.data)
+    fiches, empreintes = fiches_et_empreintes_du_mois(
+        depot, args.annee, args.mois, args.jours, args.matricules, empreintes=not args.sans_cache
+    )
+    cache = None
+    if not args.sans_cache:
+        cache = CacheFiches(args.cache or os.path.join(args.data, "fiches", "cache"))
+    if not args.fusion:
+        os.makedirs(args.sortie, exist_ok=True)
+    for evt in generer_fiches(fiches, None if args.fusion else args.sortie, args.fusion, args.workers, cache, empreintes):
+        if "fichiers" in evt:
+            print(f"✅ {len(evt['fichiers'])} fichier(s) écrit(s), {evt['rendues']} fiche(s) rendue(s)")
+        else:
+            print(f"📄 {evt['fait']}/{evt['total']} {evt['matricule'] or ''}{' (cache)' if evt['cache'] else ''}".rstrip())
+
+
+if __name__ == "__main__":
+    main()
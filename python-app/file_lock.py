@@ -0,0 +1,79 @@
+# python-app/file_lock.py
+"""
+Verrou exclusif entre processus, posé sur un fichier du dossier de données.
+
+Plusieurs workers uvicorn ouvrent le même dossier data : toute écriture (et
+toute relecture du journal ou des fichiers JSON) se fait sous ce verrou pour
+qu'aucun processus ne lise un état à moitié écrit par un autre.
+
+Le verrou est réentrant dans un processus : un thread qui le détient déjà
+peut le reprendre (les écritures imbriquées du stockage en ont besoin).
+"""
+import os
+import threading
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_fd(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                # LK_LOCK réessaie pendant ~10 s puis lève OSError : on attend plus longtemps
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_fd(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """Verrou exclusif entre processus (fcntl.flock / msvcrt.locking), réentrant par thread."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = -1
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+                _lock_fd(self._fd)
+            except BaseException:
+                if self._fd >= 0:
+                    os.close(self._fd)
+                    self._fd = -1
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_fd(self._fd)
+            finally:
+                os.close(self._fd)
+                self._fd = -1
+        self._lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,384 @@
+# python-app/import_presences.py
+"""
+Import en masse des présences depuis un export de pointage (CSV ou XLSX).
+
+Le fichier est lu ligne par ligne (csv.reader, ou openpyxl en lecture seule) :
+la mémoire utilisée ne dépend pas du nombre de lignes. Chaque ligne désigne
+un agent (matricule, ou nom et prénom), un jour et un code de présence. Les
+cellules valides sont écrites par lots de `TAILLE_LOT`, une transaction par
+lot, et le solde de congé des employés touchés n'est recalculé qu'une fois,
+à la fin. Les lignes refusées (agent inconnu ou ambigu, date ou code
+invalide) sont signalées au fur et à mesure (rapport CSV en ligne de commande).
+
+Colonnes reconnues dans l'en-tête (sans tenir compte des accents ni de la casse) :
+    agent : Matricule, ou Nom + Prénom, ou Agent / Nom complet
+    jour  : Date (2025-10-04, 04/10/2025, date Excel), ou Jour (avec --annee et --mois)
+    code  : Code / Présence / Statut (p, n, a, c, m, f ou libellé : présent, nuit, absent...)
+
+Depuis la ligne de commande :
+    python import_presences.py pointage_2025_10.csv --data data --rejets rejets.csv
+    python import_presences.py pointage.xlsx --annee 2025 --mois 10
+"""
+import argparse
+import csv
+import datetime
+import functools
+import io
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from employe_search import fold
+from presence_index import ALLOWED_PRESENCE_VALUES
+
+# Cellules écrites par transaction
+TAILLE_LOT = 1000
+# Rejets gardés en détail dans le rapport (les suivants sont seulement comptés)
+MAX_REJETS_DETAIL = 1000
+
+# Nom de colonne (replié par `fold`) -> rôle
+COLONNES = {
+    "matricule": "matricule", "mat": "matricule", "id agent": "matricule", "code agent": "matricule",
+    "nom": "nom",
+    "prenom": "prenom", "prenoms": "prenom",
+    "agent": "agent", "nom complet": "agent", "nom et prenom": "agent", "nom et prenoms": "agent", "employe": "agent",
+    "date": "date",
+    "jour": "jour",
+    "code": "code", "presence": "code", "statut": "code", "etat": "code",
+}
+
+# Libellés des exports de pointage -> code de présence
+LIBELLES_CODES = {
+    "present": "p", "presence": "p",
+    "nuit": "n",
+    "absent": "a", "absence": "a",
+    "conge": "c",
+    "ferie": "m",
+    "formation": "f",
+}
+
+# Formats de date acceptés dans une cellule texte
+FORMATS_DATE = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%Y/%m/%d")
+
+Cellule = Tuple[str, int, int, int, str]
+
+
+@dataclass
+class RapportImport:
+    """Bilan d'un import."""
+    lignes: int = 0
+    cellules: int = 0
+    vides: int = 0
+    lots: int = 0
+    nb_rejets: int = 0
+    rejets: List[Dict[str, Any]] = field(default_factory=list)
+    matricules: Set[str] = field(default_factory=set)
+    mois: Set[Tuple[int, int]] = field(default_factory=set)
+    duree: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "lignes": self.lignes,
+            "cellules": self.cellules,
+            "vides": self.vides,
+            "lots": self.lots,
+            "employes": len(self.matricules),
+            "mois": [f"{y}-{m:02d}" for y, m in sorted(self.mois)],
+            "nb_rejets": self.nb_rejets,
+            "rejets": self.rejets,
+            "duree": round(self.duree, 3),
+        }
+
+
+class ResolveurAgents:
+    """Retrouve le matricule d'un agent par son matricule ou son nom (sans accents ni casse)."""
+
+    def __init__(self, employes: List[Dict[str, str]]):
+        # Copie de la liste (DataRepository.data_copy) : l'import écrit pendant qu'il la lit
+        self.employes = employes
+        self.matricules = {emp.get("Matricule", "") for emp in employes}
+        self._noms: Optional[Dict[str, Optional[str]]] = None
+
+    def _par_nom(self) -> Dict[str, Optional[str]]:
+        # Construit au premier nom rencontré ; None pour un nom porté par plusieurs employés
+        if self._noms is None:
+            self._noms = {}
+            for emp in self.employes:
+                nom, prenom = emp.get("Nom", ""), emp.get("Prénom", "")
+                for cle in {_cle_nom(f"{nom} {prenom}"), _cle_nom(f"{prenom} {nom}")}:
+                    if not cle:
+                        continue
+                    if cle in self._noms and self._noms[cle] != emp.get("Matricule"):
+                        self._noms[cle] = None
+                    else:
+                        self._noms[cle] = emp.get("Matricule")
+        return self._noms
+
+    def resoudre(self, matricule: str = "", nom: str = "") -> Tuple[Optional[str], str]:
+        """(matricule, "") si l'agent est trouvé, sinon (None, motif du rejet)."""
+        if matricule:
+            if matricule in self.matricules:
+                return matricule, ""
+            if not nom:
+                return None, f"Matricule inconnu: {matricule}"
+        cle = _cle_nom(nom)
+        if not cle:
+            return None, "Agent non renseigné"
+        noms = self._par_nom()
+        if cle not in noms:
+            return None, f"Agent inconnu: {nom}"
+        if noms[cle] is None:
+            return None, f"Nom porté par plusieurs employés: {nom}"
+        return noms[cle], ""
+
+
+# Les mêmes noms, dates et codes reviennent sur des milliers de lignes : leur
+# analyse est mémorisée (taille bornée, la mémoire reste constante)
+@functools.lru_cache(maxsize=16384)
+def _cle_nom(nom: str) -> str:
+    return " ".join(fold(nom).split())
+
+
+def texte_cellule(valeur: Any) -> str:
+    if valeur is None:
+        return ""
+    if isinstance(valeur, float) and valeur.is_integer():
+        valeur = int(valeur)
+    return str(valeur).strip()
+
+
+def lire_csv(fichier: IO[bytes]) -> Iterator[List[str]]:
+    """Lignes d'un CSV binaire (UTF-8 avec ou sans BOM), séparateur détecté (, ; ou tabulation)."""
+    texte = io.TextIOWrapper(fichier, encoding="utf-8-sig", errors="replace", newline="")
+    debut = texte.read(4096)
+    try:
+        dialecte = csv.Sniffer().sniff(debut, delimiters=",;\t")
+    except csv.Error:
+        dialecte = csv.excel
+    # Le début déjà lu (complété jusqu'à la fin de sa ligne) est remis devant
+    # le reste du flux, sans relire le fichier
+    debut = io.StringIO(debut + texte.readline(), newline="")
+    yield from csv.reader(itertools.chain(debut, texte), dialecte)
+
+
+def lire_xlsx(fichier: IO[bytes]) -> Iterator[Tuple[Any, ...]]:
+    """Lignes de la première feuille d'un classeur, lues en mode streaming d'openpyxl."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("openpyxl est requis pour importer un fichier .xlsx (pip install openpyxl)")
+    classeur = load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        yield from classeur.worksheets[0].iter_rows(values_only=True)
+    finally:
+        classeur.close()
+
+
+def lire_lignes(fichier: IO[bytes], nom_fichier: str) -> Iterator[Sequence[Any]]:
+    """Lignes brutes d'un fichier CSV ou XLSX, selon l'extension de `nom_fichier`."""
+    extension = os.path.splitext(nom_fichier)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        return lire_xlsx(fichier)
+    if extension in (".csv", ".txt", ""):
+        return lire_csv(fichier)
+    raise ValueError(f"Format non pris en charge: {extension} (CSV ou XLSX attendu)")
+
+
+def _colonnes(entete: Sequence[Any]) -> Dict[str, int]:
+    roles: Dict[str, int] = {}
+    for i, nom in enumerate(entete):
+        role = COLONNES.get(" ".join(fold(texte_cellule(nom)).split()))
+        if role and role not in roles:
+            roles[role] = i
+    manquantes = []
+    if "matricule" not in roles and "agent" not in roles and "nom" not in roles:
+        manquantes.append("Matricule ou Nom")
+    if "date" not in roles and "jour" not in roles:
+        manquantes.append("Date ou Jour")
+    if "code" not in roles:
+        manquantes.append("Code")
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes dans l'en-tête: {', '.join(manquantes)}")
+    return roles
+
+
+def _date(valeur: Any, jour: Any, annee: Optional[int], mois: Optional[int]) -> Tuple[Optional[datetime.date], str]:
+    if isinstance(valeur, datetime.datetime):
+        return valeur.date(), ""
+    if isinstance(valeur, datetime.date):
+        return valeur, ""
+    texte = texte_cellule(valeur)
+    if texte:
+        return date_texte(texte)
+    texte = texte_cellule(jour)
+    if not texte:
+        return None, "Date non renseignée"
+    if annee is None or mois is None:
+        return None, "Jour sans année ni mois (préciser annee et mois)"
+    try:
+        return datetime.date(annee, mois, int(texte)), ""
+    except ValueError:
+        return None, f"Jour invalide: {texte}"
+
+
+@functools.lru_cache(maxsize=4096)
+def date_texte(texte: str) -> Tuple[Optional[datetime.date], str]:
+    texte = texte.split(" ")[0].split("T")[0]
+    for fmt in FORMATS_DATE:
+        try:
+            return datetime.datetime.strptime(texte, fmt).date(), ""
+        except ValueError:
+            continue
+    return None, f"Date invalide: {texte}"
+
+
+@functools.lru_cache(maxsize=1024)
+def _code(texte: str) -> Tuple[Optional[str], str]:
+    folded = fold(texte)
+    code = LIBELLES_CODES.get(folded, folded)
+    if not code or code in ALLOWED_PRESENCE_VALUES:
+        return code, ""
+    return None, f"Code invalide: {texte}"
+
+
+def importer_presences(
+    depot: Any,
+    lignes: Iterator[Sequence[Any]],
+    annee: Optional[int] = None,
+    mois: Optional[int] = None,
+    taille_lot: int = TAILLE_LOT,
+    on_rejet: Optional[Callable[[int, Sequence[Any], str], None]] = None,
+) -> RapportImport:
+    """Importe les lignes d'un export de pointage dans le dépôt.
+
+    `annee` / `mois` complètent une colonne Jour et limitent l'import à ce
+    mois (les dates d'un autre mois sont rejetées). Un code vide ne modifie
+    rien. `on_rejet(numéro de ligne, valeurs, motif)` reçoit chaque rejet.
+    """
+    debut = time.perf_counter()
+    rapport = RapportImport()
+    resolveur = ResolveurAgents(depot.data_copy("employes"))
+    lot: List[Cellule] = []
+
+    def rejeter(numero: int, valeurs: Sequence[Any], motif: str):
+        rapport.nb_rejets += 1
+        if len(rapport.rejets) < MAX_REJETS_DETAIL:
+            rapport.rejets.append({"ligne": numero, "motif": motif})
+        if on_rejet:
+            on_rejet(numero, valeurs, motif)
+
+    def ecrire():
+        if not lot:
+            return
+        if not depot.update_presence_cells(lot):
+            raise RuntimeError(f"Échec de l'écriture du lot {rapport.lots + 1}")
+        rapport.lots += 1
+        lot.clear()
+
+    roles: Optional[Dict[str, int]] = None
+    for numero, valeurs in enumerate(lignes, start=1):
+        if not any(texte_cellule(v) for v in valeurs):
+            continue
+        if roles is None:
+            roles = _colonnes(valeurs)
+            continue
+        rapport.lignes += 1
+
+        def valeur(role: str) -> Any:
+            i = roles.get(role)
+            return valeurs[i] if i is not None and i < len(valeurs) else None
+
+        nom = texte_cellule(valeur("agent")) or f"{texte_cellule(valeur('nom'))} {texte_cellule(valeur('prenom'))}".strip()
+        matricule, motif = resolveur.resoudre(texte_cellule(valeur("matricule")), nom)
+        if matricule is None:
+            rejeter(numero, valeurs, motif)
+            continue
+        date, motif = _date(valeur("date"), valeur("jour"), annee, mois)
+        if date is None:
+            rejeter(numero, valeurs, motif)
+            continue
+        if annee is not None and mois is not None and (date.year, date.month) != (annee, mois):
+            rejeter(numero, valeurs, f"Date hors de {mois:02d}/{annee}: {date.isoformat()}")
+            continue
+        code, motif = _code(texte_cellule(valeur("code")))
+        if code is None:
+            rejeter(numero, valeurs, motif)
+            continue
+        if not code:
+            rapport.vides += 1
+            continue
+        lot.append((matricule, date.year, date.month, date.day, code))
+        rapport.cellules += 1
+        rapport.matricules.add(matricule)
+        rapport.mois.add((date.year, date.month))
+        if len(lot) >= taille_lot:
+            ecrire()
+    if roles is None:
+        raise ValueError("Fichier vide : aucun en-tête trouvé")
+    ecrire()
+
+    # Soldes de congé recalculés une seule fois, pour les employés touchés
+    if rapport.matricules:
+        depot.update_soldes(rapport.matricules)
+    rapport.duree = time.perf_counter() - debut
+    return rapport
+
+
+class RapportRejetsCsv:
+    """Écrit les rejets dans un CSV (ouvert au premier rejet seulement)."""
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self._fichier = None
+        self._writer = None
+
+    def __call__(self, numero: int, valeurs: Sequence[Any], motif: str):
+        if self._writer is None:
+            self._fichier = open(self.chemin, "w", encoding="utf-8-sig", newline="")
+            self._writer = csv.writer(self._fichier, delimiter=";")
+            self._writer.writerow(["ligne", "motif", "valeurs"])
+        self._writer.writerow([numero, motif, " | ".join(texte_cellule(v) for v in valeurs)])
+
+    def close(self):
+        if self._fichier:
+            self._fichier.close()
+
+
+def main():
+    from storage import open_repository
+
+    parser = argparse.ArgumentParser(description="Import des présences depuis un export de pointage (CSV ou XLSX)")
+    parser.add_argument("fichier", help="Fichier .csv ou .xlsx")
+    parser.add_argument("--data", default="data", help="Dossier des données")
+    parser.add_argument("--annee", type=int, help="Année (colonne Jour, ou limite l'import à ce mois)")
+    parser.add_argument("--mois", type=int, help="Mois (avec --annee)")
+    parser.add_argument("--lot", type=int, default=TAILLE_LOT, help="Cellules écrites par transaction")
+    parser.add_argument("--rejets", help="Rapport CSV des lignes refusées (défaut : <fichier>_rejets.csv)")
+    args = parser.parse_args()
+    if (args.annee is None) != (args.mois is None):
+        parser.error("--annee et --mois vont ensemble")
+
+    chemin_rejets = args.rejets or f"{os.path.splitext(args.fichier)[0]}_rejets.csv"
+    rejets = RapportRejetsCsv(chemin_rejets)
+    depot = open_repository(args.data)
+    try:
+        with open(args.fichier, "rb") as f:
+            rapport = importer_presences(
+                depot, lire_lignes(f, args.fichier), args.annee, args.mois, args.lot, on_rejet=rejets
+            )
+    finally:
+        rejets.close()
+        depot.close()
+
+    print(f"✅ {rapport.cellules} cellule(s) importée(s) en {rapport.lots} lot(s), "
+          f"{len(rapport.matricules)} employé(s), {rapport.lignes} ligne(s) lue(s) en {rapport.duree:.1f} s")
+    if rapport.vides:
+        print(f"ℹ️ {rapport.vides} ligne(s) sans code ignorée(s)")
+    if rapport.nb_rejets:
+        print(f"⚠️ {rapport.nb_rejets} ligne(s) refusée(s) : voir {chemin_rejets}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# python-app/journal.py
+"""
+Journal des modifications (write-ahead log) des fichiers de données.
+
+Chaque modification (employé ajouté/modifié/supprimé, cellule de présence,
+saisie de salaire) est ajoutée en fin de fichier sous forme d'une ligne JSON
+puis synchronisée sur disque (fsync) avant d'être appliquée en mémoire.
+Les fichiers JSON complets ne sont réécrits qu'au compactage ; au démarrage,
+le journal est rejoué sur ces fichiers.
+
+Le journal est partagé par les processus qui ouvrent le même dossier (workers
+de l'API) : chacun lit les lignes ajoutées par les autres (`read_new`). La
+première ligne porte un identifiant de génération, renouvelé à chaque
+compactage, qui permet de savoir que le journal a été vidé entre-temps.
+
+Une dernière ligne incomplète (arrêt brutal pendant une écriture) est coupée
+avant l'ajout suivant : sans cela, la nouvelle entrée serait collée à la
+ligne illisible et perdue avec elle à la relecture.
+"""
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+# Opérations du journal
+OP_GENERATION = "generation"          # {"id": ...} : première ligne du journal
+OP_EMPLOYE = "employe"                # {"matricule": ancien matricule, "data": employé}
+OP_EMPLOYE_SUPPR = "employe_suppr"    # {"matricule": ...}
+OP_PRESENCE = "presence"              # {"cells": [[matricule, année, mois, jour, code], ...]}
+OP_SALAIRE = "salaire"                # {"data": {"MATRICULE_ANNEE_MOIS": {...}}}
+
+
+def _encode(entry: Dict[str, Any]) -> bytes:
+    return (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class Journal:
+    """Fichier append-only de modifications au format JSON Lines.
+
+    Les écritures et `read_new()` doivent se faire sous le verrou entre
+    processus du dossier (voir file_lock.py).
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        self.generation = ""
+        self.entries: List[Dict[str, Any]] = []
+        # Octets du fichier déjà lus (ou écrits) par ce processus
+        self.offset = 0
+        self._file = open(self.filename, "ab")
+        if self._file.tell() == 0:
+            self._write_header(self._file)
+        self.entries = self._read_from(0)
+        self._cut_torn_tail()
+
+    def _write_header(self, f):
+        f.write(_encode({"op": OP_GENERATION, "id": uuid.uuid4().hex}))
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _read_from(self, offset: int) -> List[Dict[str, Any]]:
+        """Lit les lignes complètes à partir de `offset` et avance `self.offset`.
+
+        `self.offset` s'arrête après la dernière ligne lisible.
+        """
+        entries: List[Dict[str, Any]] = []
+        with open(self.filename, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # ligne en cours d'écriture par un autre processus
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Dernière ligne tronquée par un arrêt brutal : on l'ignore
+                    print(f"⚠️ Entrée de journal illisible ignorée dans {self.filename}")
+                    break
+                offset += len(line)
+                if entry.get("op") == OP_GENERATION:
+                    self.generation = entry.get("id", "")
+                else:
+                    entries.append(entry)
+        self.offset = offset
+        self._stat = self._stat_signature()
+        return entries
+
+    def _cut_torn_tail(self):
+        """Coupe ce qui suit la dernière ligne lisible (appelé sous le verrou entre processus).
+
+        Toutes les lignes des autres processus ont été lues avant (`read_new`) :
+        au-delà de `offset`, il ne reste qu'une écriture interrompue.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if size > self.offset:
+            print(f"⚠️ Fin de journal incomplète coupée dans {self.filename} ({size - self.offset} octet(s))")
+            self._file.truncate(self.offset)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._stat = self._stat_signature()
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def changed(self) -> bool:
+        """Vrai si un autre processus a modifié le fichier depuis la dernière lecture."""
+        return self._stat_signature() != self._stat
+
+    def _file_generation(self) -> str:
+        with open(self.filename, "rb") as f:
+            first = f.readline()
+        try:
+            entry = json.loads(first) if first.endswith(b"\n") else {}
+        except json.JSONDecodeError:
+            entry = {}
+        return entry.get("id", "") if entry.get("op") == OP_GENERATION else ""
+
+    def read_new(self) -> Optional[List[Dict[str, Any]]]:
+        """Entrées ajoutées par d'autres processus (pas encore dans `entries`).
+
+        None si le journal a été vidé par un compactage : il faut alors relire
+        les fichiers de données et rouvrir le journal (`reopen`).
+        """
+        with self._lock:
+            size = (self._stat_signature() or (0, 0))[0]
+            if size < self.offset or self._file_generation() != self.generation:
+                return None
+            return self._read_from(self.offset)
+
+    def reopen(self):
+        """Relit tout le journal (après un compactage par un autre processus)."""
+        with self._lock:
+            self._file.close()
+            self._open()
+
+    def append(self, entry: Dict[str, Any]):
+        """Ajoute une entrée et attend qu'elle soit écrite sur disque."""
+        data = _encode(entry)
+        with self._lock:
+            self._cut_torn_tail()
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.offset += len(data)
+            self._stat = self._stat_signature()
+            self.entries.append(entry)
+
+    def truncate(self):
+        """Vide le journal une fois son contenu écrit dans les fichiers de données.
+
+        Une nouvelle génération est écrite en tête pour que les autres
+        processus sachent que le journal a été vidé.
+        """
+        with self._lock:
+            self._file.close()
+            with open(self.filename, "wb") as f:
+                self._write_header(f)
+            self._open()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.entries)
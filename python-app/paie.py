@@ -0,0 +1,322 @@
+# python-app/paie.py
+"""
+Moteur de calcul de la paie, sans dépendance à l'interface.
+
+Un seul point d'entrée, `calcul_paie`, calcule le résultat complet d'un
+employé pour un mois (brut, cotisations, IRSA, reste à payer) à partir de sa
+fiche, de ses heures de présence et des saisies manuelles du mois. La page
+Salaire, la fiche de paie, l'API et les traitements par lot utilisent tous
+ce même calcul.
+"""
+import datetime
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# ---------------------- PARAMÈTRES DE PAIE ----------------------
+JOURS_THEORIQUES_DEFAUT = 22
+HEURES_PAR_JOUR = 8
+TAUX_MAJ_NUIT = 0.30
+TAUX_MAJ_FERIE = 1.00
+INDEM_FORMATION_HEURE = 10000
+INDEM_REPAS_JOUR = 2500
+INDEM_TRANSPORT_JOUR = 1200
+TAUX_OSTIE = 0.01
+TAUX_CNAPS = 0.01
+SOCIAL_DEFAUT = 15000
+# IRSA : (plancher, plafond, taux) par tranche ; minimum de perception si l'impôt est nul
+IRSA_TRANCHES = (
+    (0, 350000, 0.00),
+    (350000, 400000, 0.05),
+    (400000, 500000, 0.10),
+    (500000, 600000, 0.15),
+    (600000, None, 0.20),
+)
+IRSA_MINIMUM = 2000
+
+SALAIRE_COLS = [
+    "Matricule", "Nom", "Prénom", "Compagne", "Salaire de base", "Taux horaire", "Solde de congé",
+    "Heures de présence", "Heures de congé", "Heures férié majoré", "Heures nuit majoré",
+    "Montant travaillé", "Majoration de nuit", "Majoration férié", "Indemnité congé", "Indemnité formation",
+    "Prime de production", "Prime d’assiduité", "Prime d’ancienneté", "Prime élite", "Prime de responsabilité",
+    "Indemnité repas", "Indemnité transport", "Salaire brut", "Avance sur salaire", "OSTIE", "CNaPS", "Social",
+    "IGR", "Reste à payer",
+    "1ère tranche (0%)", "2ème tranche (5%)", "3ème tranche (10%)", "4ème tranche (15%)", "5ème tranche (20%)",
+    "Rep1", "Rep2", "Rep3", "Rep4", "Rep5", "Reptot"
+]
+
+MANUAL_COLS = {
+    "Prime de production", "Prime d’assiduité", "Prime d’ancienneté", "Prime élite",
+    "Prime de responsabilité", "Social", "Avance sur salaire"
+}
+
+HEURES_VIDES = {"presence": 0, "conge": 0, "ferie": 0, "nuit": 0, "formation": 0, "absence": 0}
+
+
+# ---------------------- OUTILS ----------------------
+def parse_float(s: Any, default: float = 0.0) -> float:
+    try:
+        if s is None:
+            return default
+        if isinstance(s, (int, float)):
+            return float(s)
+        s = str(s).replace(" ", "").replace("\u202f", "").replace(",", ".")
+        return float(s)
+    except Exception:
+        return default
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_embauche(s: str):
+    # Mis en cache : beaucoup d'employés partagent les mêmes dates et strptime est lent
+    if not s:
+        return None
+    s = s.strip()
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y"):
+        try:
+            return datetime.datetime.strptime(s, fmt).date()
+        except Exception:
+            pass
+    return None
+
+
+def calcul_anciennete(date_embauche_str: str, today: Optional[datetime.date] = None) -> str:
+    """Ancienneté affichée ("3 ans 2 mois") ; chaîne vide si la date est illisible."""
+    d = _parse_date_embauche(date_embauche_str)
+    if not d:
+        return ""
+    today = today or datetime.date.today()
+    years = today.year - d.year - ((today.month, today.day) < (d.month, d.day))
+    months = (today.month - d.month) % 12
+    return f"{years} ans {months} mois"
+
+
+def calcul_droit_depuis_date(date_embauche_str: str, today: Optional[datetime.date] = None) -> int:
+    d = _parse_date_embauche(date_embauche_str)
+    if not d:
+        return 0
+    today = today or datetime.date.today()
+    return 1 if (today - d).days > 365 else 0
+
+
+def anciennete_ans_depuis_date(date_embauche_str: str, today: Optional[datetime.date] = None) -> int:
+    d = _parse_date_embauche(date_embauche_str or "")
+    if not d:
+        return 0
+    today = today or datetime.date.today()
+    return today.year - d.year - ((today.month, today.day) < (d.month, d.day))
+
+
+def heures_depuis_codes(codes: Iterable[str]) -> Dict[str, int]:
+    """Heures par catégorie à partir des codes de présence des jours du mois."""
+    res = dict(HEURES_VIDES)
+    for val in codes:
+        val = (val or "").lower()
+        if val == "p":
+            res["presence"] += 8
+        elif val == "n":
+            res["presence"] += 8
+            res["nuit"] += 8
+        elif val == "a":
+            res["absence"] += 8
+        elif val == "c":
+            res["conge"] += 8
+        elif val == "m":
+            res["presence"] += 8
+            res["ferie"] += 8
+        elif val == "f":
+            res["formation"] += 8
+    return res
+
+
+def irsa_tranches(base: float) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+    """Montants imposables par tranche et impôt correspondant."""
+    base = max(0.0, base)
+    tranches = []
+    reps = []
+    for plancher, plafond, taux in IRSA_TRANCHES:
+        haut = base if plafond is None else min(base, plafond)
+        montant = max(0.0, haut - plancher)
+        tranches.append(montant)
+        reps.append(montant * taux)
+    return tuple(tranches), tuple(reps)
+
+
+# ---------------------- RÉSULTAT ----------------------
+@dataclass(frozen=True)
+class ResultatPaie:
+    """Paie calculée d'un employé pour un mois (montants non arrondis)."""
+    matricule: str
+    nom: str
+    prenom: str
+    compagne: str
+    annee: int
+    mois: int
+    jours_theoriques: int
+    salaire_base: float
+    taux_horaire: float
+    solde_conge: float
+    h_presence: int
+    h_conge: int
+    h_ferie: int
+    h_nuit: int
+    h_formation: int
+    jours_presence: int
+    montant_travaille: float
+    taux_maj_nuit: float
+    taux_maj_ferie: float
+    maj_nuit: float
+    maj_ferie: float
+    indem_conge: float
+    indem_formation: float
+    prime_production: float
+    prime_assiduite: float
+    prime_anciennete: float
+    prime_elite: float
+    prime_responsabilite: float
+    indem_repas: float
+    indem_transport: float
+    brut: float
+    avance: float
+    ostie: float
+    cnaps: float
+    social: float
+    igr: float
+    reste: float
+    tranches: Tuple[float, ...]
+    reps: Tuple[float, ...]
+    reptot: float
+
+    def as_row(self) -> List[Any]:
+        """Valeurs affichées, dans l'ordre de SALAIRE_COLS."""
+        return [
+            self.matricule, self.nom, self.prenom, self.compagne,
+            round(self.salaire_base), round(self.taux_horaire), self.solde_conge,
+            int(self.h_presence), int(self.h_conge), int(self.h_ferie), int(self.h_nuit),
+            round(self.montant_travaille), round(self.maj_nuit), round(self.maj_ferie),
+            round(self.indem_conge), round(self.indem_formation),
+            round(self.prime_production), round(self.prime_assiduite), round(self.prime_anciennete),
+            round(self.prime_elite), round(self.prime_responsabilite),
+            round(self.indem_repas), round(self.indem_transport), round(self.brut), round(self.avance),
+            round(self.ostie), round(self.cnaps), round(self.social),
+            round(self.igr), round(self.reste),
+            *(round(t) for t in self.tranches),
+            *(round(r) for r in self.reps), round(self.reptot),
+        ]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Valeurs affichées indexées par nom de colonne (SALAIRE_COLS)."""
+        return dict(zip(SALAIRE_COLS, self.as_row()))
+
+
+# ---------------------- CALCUL ----------------------
+def calcul_paie(
+    emp: Dict[str, str],
+    annee: int,
+    mois: int,
+    heures: Dict[str, int],
+    manual: Optional[Dict[str, Any]] = None,
+    jours_theoriques: int = JOURS_THEORIQUES_DEFAUT,
+    today: Optional[datetime.date] = None,
+) -> ResultatPaie:
+    """Calcule la paie d'un employé pour (année, mois).
+
+    `heures` vient de `heures_depuis_codes` (présences du mois) et `manual`
+    des saisies manuelles de salaires.json pour ce mois.
+    """
+    manual = manual or {}
+    m = emp.get("Matricule", "")
+    sal_base = parse_float(emp.get("Salaire de base", 0))
+    date_emb = emp.get("Date d'embauche", "")
+    droit_tr = calcul_droit_depuis_date(date_emb, today)
+    droit_ostie = droit_tr
+    anciennete_ans = anciennete_ans_depuis_date(date_emb, today)
+
+    h_presence = heures["presence"]
+    h_conge = heures["conge"]
+    h_ferie = heures["ferie"]
+    h_nuit = heures["nuit"]
+    h_form = heures["formation"]
+    absences = heures["absence"] // HEURES_PAR_JOUR
+
+    jours_corriges = max(0, jours_theoriques - absences)
+    taux_h = sal_base / (jours_corriges * HEURES_PAR_JOUR) if jours_corriges > 0 else 0.0
+
+    prime_prod = parse_float(manual.get("Prime de production", 0))
+    prime_assid = parse_float(manual.get("Prime d’assiduité", 0))
+    prime_anc = parse_float(manual.get("Prime d’ancienneté", 0))
+    prime_elite = parse_float(manual.get("Prime élite", 0))
+    prime_resp = parse_float(manual.get("Prime de responsabilité", 0))
+    social = parse_float(manual.get("Social", SOCIAL_DEFAUT))
+    avance = parse_float(manual.get("Avance sur salaire", 0))
+
+    montant_trav = h_presence * taux_h
+    taux_maj_nuit = taux_h * TAUX_MAJ_NUIT
+    taux_maj_ferie = taux_h * TAUX_MAJ_FERIE
+    maj_nuit = h_nuit * taux_maj_nuit
+    maj_ferie = h_ferie * taux_maj_ferie
+    indem_conge = h_conge * taux_h
+    indem_form = h_form * INDEM_FORMATION_HEURE
+    jours_presence = int(round(h_presence / HEURES_PAR_JOUR))
+    indem_repas = jours_presence * INDEM_REPAS_JOUR * (1 if droit_tr else 0)
+    indem_transport = jours_presence * INDEM_TRANSPORT_JOUR * (1 if droit_tr else 0)
+
+    brut = (
+        montant_trav + maj_nuit + maj_ferie + indem_conge + indem_form +
+        prime_prod + prime_assid + prime_anc + prime_elite + prime_resp +
+        indem_repas + indem_transport
+    )
+
+    ostie = cnaps = 0.0
+    if anciennete_ans >= 1 and droit_ostie:
+        ostie = brut * TAUX_OSTIE
+        cnaps = brut * TAUX_CNAPS
+
+    tranches, reps = irsa_tranches(brut)
+    reptot = sum(reps)
+    if reptot == 0:
+        reptot = IRSA_MINIMUM
+
+    # Sans matricule -> IGR = 0, sinon IGR = reptot * droit_ostie (droit venant de la date d'embauche)
+    igr = reptot * droit_ostie if m else 0
+    reste = brut - (avance + ostie + cnaps + social + igr)
+
+    return ResultatPaie(
+        matricule=m, nom=emp.get("Nom", ""), prenom=emp.get("Prénom", ""), compagne=emp.get("Compagne", ""),
+        annee=annee, mois=mois, jours_theoriques=jours_theoriques,
+        salaire_base=sal_base, taux_horaire=taux_h,
+        solde_conge=parse_float(emp.get("Solde de congé", 0)),
+        h_presence=h_presence, h_conge=h_conge, h_ferie=h_ferie, h_nuit=h_nuit, h_formation=h_form,
+        jours_presence=jours_presence,
+        montant_travaille=montant_trav, taux_maj_nuit=taux_maj_nuit, taux_maj_ferie=taux_maj_ferie,
+        maj_nuit=maj_nuit, maj_ferie=maj_ferie, indem_conge=indem_conge, indem_formation=indem_form,
+        prime_production=prime_prod, prime_assiduite=prime_assid, prime_anciennete=prime_anc,
+        prime_elite=prime_elite, prime_responsabilite=prime_resp,
+        indem_repas=indem_repas, indem_transport=indem_transport,
+        brut=brut, avance=avance, ostie=ostie, cnaps=cnaps, social=social, igr=igr, reste=reste,
+        tranches=tranches, reps=reps, reptot=reptot,
+    )
+
+
+def calcul_paie_roster(
+    employes: Iterable[Dict[str, str]],
+    annee: int,
+    mois: int,
+    heures_de: Callable[[str], Dict[str, int]],
+    saisies: Dict[str, Any],
+    jours_theoriques: int = JOURS_THEORIQUES_DEFAUT,
+    today: Optional[datetime.date] = None,
+) -> List[ResultatPaie]:
+    """Paie de tous les employés d'un mois.
+
+    `heures_de(matricule)` renvoie les heures du mois ; `saisies` est le
+    dictionnaire des saisies manuelles (clés "MATRICULE_ANNEE_MOIS").
+    """
+    today = today or datetime.date.today()
+    return [
+        calcul_paie(
+            emp, annee, mois, heures_de(emp.get("Matricule", "")),
+            saisies.get(f"{emp.get('Matricule', '')}_{annee}_{mois}", {}), jours_theoriques, today,
+        )
+        for emp in employes
+    ]
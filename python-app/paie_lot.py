@@ -0,0 +1,334 @@
+# python-app/paie_lot.py
+"""
+Calcul de la paie de tout l'effectif d'un mois en une passe NumPy.
+
+Les employés et la matrice des présences du mois (employés x jours) sont
+chargés dans des tableaux, puis chaque colonne de SALAIRE_COLS est calculée
+pour tous les employés à la fois, tranches IRSA comprises (np.clip). Les
+formules sont celles de `paie.calcul_paie`, appliquées dans le même ordre.
+
+Contrôle de parité avec le calcul employé par employé (code de sortie 1 en cas
+d'écart) :
+    python paie_lot.py 2025 10 --data data --verifier
+"""
+import argparse
+import datetime
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from paie import (
+    HEURES_PAR_JOUR, INDEM_FORMATION_HEURE, INDEM_REPAS_JOUR, INDEM_TRANSPORT_JOUR, IRSA_MINIMUM, IRSA_TRANCHES,
+    HEURES_VIDES, JOURS_THEORIQUES_DEFAUT, SALAIRE_COLS, SOCIAL_DEFAUT, TAUX_CNAPS, TAUX_MAJ_FERIE, TAUX_MAJ_NUIT, TAUX_OSTIE,
+    ResultatPaie, anciennete_ans_depuis_date, calcul_droit_depuis_date, parse_float,
+)
+from presence_index import CODE_IDS, CODES, MoisPresence, PresenceIndex, days_in_month
+
+# Saisies manuelles : (clé dans salaires.json, valeur par défaut)
+SAISIES = (
+    ("Prime de production", 0), ("Prime d’assiduité", 0), ("Prime d’ancienneté", 0), ("Prime élite", 0),
+    ("Prime de responsabilité", 0), ("Social", SOCIAL_DEFAUT), ("Avance sur salaire", 0),
+)
+
+# Colonnes numériques arrondies dans l'ordre de SALAIRE_COLS (après Matricule, Nom, Prénom, Compagne)
+_COLONNES_ARRONDIES = (
+    "salaire_base", "taux_horaire",
+)
+_COLONNES_APRES_SOLDE = (
+    "h_presence", "h_conge", "h_ferie", "h_nuit",
+    "montant_travaille", "maj_nuit", "maj_ferie", "indem_conge", "indem_formation",
+    "prime_production", "prime_assiduite", "prime_anciennete", "prime_elite", "prime_responsabilite",
+    "indem_repas", "indem_transport", "brut", "avance", "ostie", "cnaps", "social", "igr", "reste",
+    "tranche1", "tranche2", "tranche3", "tranche4", "tranche5",
+    "rep1", "rep2", "rep3", "rep4", "rep5", "reptot",
+)
+
+
+def matrice_codes(matricules: Sequence[str], codes_mois: Dict[str, Sequence[str]], nb_jours: int) -> np.ndarray:
+    """Matrice uint8 employés x jours à partir de {matricule: [code du jour 1, ...]}."""
+    if isinstance(codes_mois, MoisPresence) and codes_mois.days == nb_jours:
+        # Déjà sous forme de matrice : simple sélection des lignes
+        return codes_mois.matrice(matricules)
+    mat = np.zeros((len(matricules), nb_jours), dtype=np.uint8)
+    for r, m in enumerate(matricules):
+        codes = codes_mois.get(m)
+        if codes:
+            mat[r, :len(codes)] = [CODE_IDS.get((c or "").lower(), 0) for c in codes[:nb_jours]]
+    return mat
+
+
+def heures_matrice(codes: np.ndarray) -> Dict[str, np.ndarray]:
+    """Heures par catégorie (comme `paie.heures_depuis_codes`) pour chaque ligne d'une matrice de codes."""
+    jours = {code: np.count_nonzero(codes == CODE_IDS[code], axis=-1).astype(np.int64) for code in CODES[1:]}
+    return {
+        "presence": (jours["p"] + jours["n"] + jours["m"]) * HEURES_PAR_JOUR,
+        "conge": jours["c"] * HEURES_PAR_JOUR,
+        "ferie": jours["m"] * HEURES_PAR_JOUR,
+        "nuit": jours["n"] * HEURES_PAR_JOUR,
+        "formation": jours["f"] * HEURES_PAR_JOUR,
+        "absence": jours["a"] * HEURES_PAR_JOUR,
+    }
+
+
+def heures_employe(mois: MoisPresence, matricule: str) -> Dict[str, int]:
+    """Heures du mois d'un employé, lues sur sa ligne de la matrice."""
+    r = mois.row(matricule)
+    if r < 0:
+        return dict(HEURES_VIDES)
+    return {cat: int(h) for cat, h in heures_matrice(mois.codes[r]).items()}
+
+
+class ResumeHeures:
+    """Heures par (matricule, année, mois), partagées entre calendrier, paie et fiches.
+
+    Une entrée est calculée au premier accès et reste en cache jusqu'à ce
+    qu'une cellule de ce mois change pour ce matricule (PresenceIndex.set).
+    Les dictionnaires renvoyés sont partagés : ne pas les modifier.
+    """
+
+    def __init__(self, presences: PresenceIndex):
+        self.presences = presences
+        self._cache: Dict[tuple, Dict[str, int]] = {}
+        presences.add_listener(self.invalidate)
+
+    def invalidate(self, matricule: str, annee: int, mois: int):
+        self._cache.pop((matricule, annee, mois), None)
+
+    def clear(self):
+        self._cache = {}
+
+    def heures(self, matricule: str, annee: int, mois: int) -> Dict[str, int]:
+        key = (matricule, annee, mois)
+        hrs = self._cache.get(key)
+        if hrs is None:
+            hrs = self._cache[key] = heures_employe(self.presences.month(annee, mois), matricule)
+        return hrs
+
+    def heures_mois(self, matricules: Sequence[str], annee: int, mois: int) -> List[Dict[str, int]]:
+        """Heures de plusieurs employés ; les absents du cache sont calculés en une réduction."""
+        manquants = [m for m in dict.fromkeys(matricules) if (m, annee, mois) not in self._cache]
+        if manquants:
+            par_categorie = heures_matrice(self.presences.month(annee, mois).matrice(manquants))
+            for i, m in enumerate(manquants):
+                self._cache[(m, annee, mois)] = {cat: int(h[i]) for cat, h in par_categorie.items()}
+        return [self._cache[(m, annee, mois)] for m in matricules]
+
+
+@dataclass
+class PaieLot:
+    """Résultat du calcul par lot : une colonne NumPy par grandeur."""
+    annee: int
+    mois: int
+    jours_theoriques: int
+    employes: List[Dict[str, str]]
+    colonnes: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.employes)
+
+    def resultat(self, i: int) -> ResultatPaie:
+        """Résultat de l'employé `i` sous forme de ResultatPaie."""
+        c = self.colonnes
+        emp = self.employes[i]
+        f = lambda name: float(c[name][i])
+        return ResultatPaie(
+            matricule=emp.get("Matricule", ""), nom=emp.get("Nom", ""), prenom=emp.get("Prénom", ""),
+            compagne=emp.get("Compagne", ""), annee=self.annee, mois=self.mois,
+            jours_theoriques=self.jours_theoriques,
+            salaire_base=f("salaire_base"), taux_horaire=f("taux_horaire"), solde_conge=f("solde_conge"),
+            h_presence=int(c["h_presence"][i]), h_conge=int(c["h_conge"][i]), h_ferie=int(c["h_ferie"][i]),
+            h_nuit=int(c["h_nuit"][i]), h_formation=int(c["h_formation"][i]),
+            jours_presence=int(c["jours_presence"][i]),
+            montant_travaille=f("montant_travaille"), taux_maj_nuit=f("taux_maj_nuit"),
+            taux_maj_ferie=f("taux_maj_ferie"), maj_nuit=f("maj_nuit"), maj_ferie=f("maj_ferie"),
+            indem_conge=f("indem_conge"), indem_formation=f("indem_formation"),
+            prime_production=f("prime_production"), prime_assiduite=f("prime_assiduite"),
+            prime_anciennete=f("prime_anciennete"), prime_elite=f("prime_elite"),
+            prime_responsabilite=f("prime_responsabilite"),
+            indem_repas=f("indem_repas"), indem_transport=f("indem_transport"),
+            brut=f("brut"), avance=f("avance"), ostie=f("ostie"), cnaps=f("cnaps"), social=f("social"),
+            igr=f("igr"), reste=f("reste"),
+            tranches=tuple(f(f"tranche{k}") for k in range(1, 6)),
+            reps=tuple(f(f"rep{k}") for k in range(1, 6)),
+            reptot=f("reptot"),
+        )
+
+    def as_rows(self) -> List[List[Any]]:
+        """Valeurs affichées de chaque employé, dans l'ordre de SALAIRE_COLS."""
+        c = self.colonnes
+        avant = np.rint(np.column_stack([c[k] for k in _COLONNES_ARRONDIES])).astype(np.int64).tolist()
+        apres = np.rint(np.column_stack([c[k] for k in _COLONNES_APRES_SOLDE])).astype(np.int64).tolist()
+        soldes = c["solde_conge"].tolist()
+        return [
+            [emp.get("Matricule", ""), emp.get("Nom", ""), emp.get("Prénom", ""), emp.get("Compagne", ""),
+             *avant[i], soldes[i], *apres[i]]
+            for i, emp in enumerate(self.employes)
+        ]
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        return [dict(zip(SALAIRE_COLS, row)) for row in self.as_rows()]
+
+
+def calcul_paie_lot(
+    employes: Sequence[Dict[str, str]],
+    annee: int,
+    mois: int,
+    codes: np.ndarray,
+    saisies: Dict[str, Any],
+    jours_theoriques: int = JOURS_THEORIQUES_DEFAUT,
+    today: Optional[datetime.date] = None,
+) -> PaieLot:
+    """Paie de tous les employés en une passe vectorisée.
+
+    `codes` est la matrice employés x jours de `matrice_codes` (même ordre
+    que `employes`) ; `saisies` le dictionnaire de salaires.json.
+    """
+    today = today or datetime.date.today()
+    n = len(employes)
+    f64 = lambda values: np.fromiter(values, dtype=np.float64, count=n)
+
+    # --- Données employés ---
+    sal_base = f64(parse_float(e.get("Salaire de base", 0)) for e in employes)
+    solde = f64(parse_float(e.get("Solde de congé", 0)) for e in employes)
+    droit = f64(calcul_droit_depuis_date(e.get("Date d'embauche", ""), today) for e in employes)
+    anc = f64(anciennete_ans_depuis_date(e.get("Date d'embauche", ""), today) for e in employes)
+    a_matricule = np.fromiter((bool(e.get("Matricule", "")) for e in employes), dtype=bool, count=n)
+
+    # --- Saisies manuelles ---
+    manuels = [saisies.get(f"{e.get('Matricule', '')}_{annee}_{mois}", {}) for e in employes]
+    prime_prod, prime_assid, prime_anc, prime_elite, prime_resp, social, avance = (
+        f64(parse_float(m.get(cle, defaut)) for m in manuels) for cle, defaut in SAISIES
+    )
+
+    # --- Heures depuis la matrice des présences ---
+    heures = heures_matrice(codes)
+    h_presence, h_nuit, h_ferie, h_conge, h_form = (
+        heures[cat] for cat in ("presence", "nuit", "ferie", "conge", "formation")
+    )
+    absences = heures["absence"] // HEURES_PAR_JOUR
+
+    jours_corriges = np.maximum(0, jours_theoriques - absences)
+    heures_theoriques = (jours_corriges * HEURES_PAR_JOUR).astype(np.float64)
+    taux_h = np.divide(sal_base, heures_theoriques, out=np.zeros(n), where=jours_corriges > 0)
+
+    montant_trav = h_presence * taux_h
+    taux_maj_nuit = taux_h * TAUX_MAJ_NUIT
+    taux_maj_ferie = taux_h * TAUX_MAJ_FERIE
+    maj_nuit = h_nuit * taux_maj_nuit
+    maj_ferie = h_ferie * taux_maj_ferie
+    indem_conge = h_conge * taux_h
+    indem_form = (h_form * INDEM_FORMATION_HEURE).astype(np.float64)
+    jours_presence = np.rint(h_presence / HEURES_PAR_JOUR).astype(np.int64)
+    indem_repas = (jours_presence * INDEM_REPAS_JOUR * droit)
+    indem_transport = (jours_presence * INDEM_TRANSPORT_JOUR * droit)
+
+    brut = (
+        montant_trav + maj_nuit + maj_ferie + indem_conge + indem_form +
+        prime_prod + prime_assid + prime_anc + prime_elite + prime_resp +
+        indem_repas + indem_transport
+    )
+
+    cotise = (anc >= 1) & (droit == 1)
+    ostie = np.where(cotise, brut * TAUX_OSTIE, 0.0)
+    cnaps = np.where(cotise, brut * TAUX_CNAPS, 0.0)
+
+    # --- IRSA : montant de chaque tranche = clip(base, plancher, plafond) - plancher ---
+    base = np.maximum(0.0, brut)
+    tranches = [np.clip(base, plancher, plafond) - plancher for plancher, plafond, _ in IRSA_TRANCHES]
+    reps = [t * taux for t, (_, _, taux) in zip(tranches, IRSA_TRANCHES)]
+    reptot = np.zeros(n)
+    for rep in reps:
+        reptot = reptot + rep
+    reptot = np.where(reptot == 0, float(IRSA_MINIMUM), reptot)
+
+    igr = np.where(a_matricule, reptot * droit, 0.0)
+    reste = brut - (avance + ostie + cnaps + social + igr)
+
+    colonnes = {
+        "salaire_base": sal_base, "taux_horaire": taux_h, "solde_conge": solde,
+        "h_presence": h_presence, "h_conge": h_conge, "h_ferie": h_ferie, "h_nuit": h_nuit, "h_formation": h_form,
+        "jours_presence": jours_presence,
+        "montant_travaille": montant_trav, "taux_maj_nuit": taux_maj_nuit, "taux_maj_ferie": taux_maj_ferie,
+        "maj_nuit": maj_nuit, "maj_ferie": maj_ferie, "indem_conge": indem_conge, "indem_formation": indem_form,
+        "prime_production": prime_prod, "prime_assiduite": prime_assid, "prime_anciennete": prime_anc,
+        "prime_elite": prime_elite, "prime_responsabilite": prime_resp,
+        "indem_repas": indem_repas, "indem_transport": indem_transport,
+        "brut": brut, "avance": avance, "ostie": ostie, "cnaps": cnaps, "social": social,
+        "igr": igr, "reste": reste, "reptot": reptot,
+    }
+    for k in range(5):
+        colonnes[f"tranche{k + 1}"] = tranches[k]
+        colonnes[f"rep{k + 1}"] = reps[k]
+    return PaieLot(annee, mois, jours_theoriques, list(employes), colonnes)
+
+
+def donnees_du_mois(depot: Any, annee: int, mois: int) -> Tuple[List[Dict[str, str]], MoisPresence, Dict[str, Any]]:
+    """(employés, codes du mois, saisies du mois) lus une fois dans un stockage, en copies.
+
+    Tout ce qui est dérivé de la paie (empreintes des fiches notamment) doit
+    partir de ces mêmes copies, pas d'une seconde lecture du stockage.
+    """
+    return depot.data_copy("employes"), depot.month_codes(annee, mois), depot.salaires_month(annee, mois)
+
+
+def paie_du_mois(
+    depot: Any,
+    annee: int,
+    mois: int,
+    jours_theoriques: int = JOURS_THEORIQUES_DEFAUT,
+    today: Optional[datetime.date] = None,
+    donnees: Optional[Tuple[List[Dict[str, str]], MoisPresence, Dict[str, Any]]] = None,
+) -> PaieLot:
+    """Paie d'un mois pour tous les employés d'un stockage (DataRepository ou SqliteRepository).
+
+    `donnees` : résultat de `donnees_du_mois`, s'il a déjà été lu.
+    """
+    employes, codes_mois, saisies = donnees or donnees_du_mois(depot, annee, mois)
+    codes = matrice_codes([e.get("Matricule", "") for e in employes], codes_mois, days_in_month(annee, mois))
+    return calcul_paie_lot(employes, annee, mois, codes, saisies, jours_theoriques, today)
+
+
+def main():
+    from paie import calcul_paie, heures_depuis_codes
+    from storage import open_repository
+
+    parser = argparse.ArgumentParser(description="Calcul de la paie d'un mois pour tout l'effectif")
+    parser.add_argument("annee", type=int)
+    parser.add_argument("mois", type=int)
+    parser.add_argument("--data", default="data", help="Dossier des données")
+    parser.add_argument("--jours", type=int, default=JOURS_THEORIQUES_DEFAUT, help="Jours de travail théoriques")
+    parser.add_argument("--verifier", action="store_true", help="Compare avec le calcul employé par employé")
+    args = parser.parse_args()
+
+    depot = open_repository(args.data)
+    employes = depot.data_copy("employes")
+    codes_mois = depot.month_codes(args.annee, args.mois)
+    saisies = depot.salaires_month(args.annee, args.mois)
+
+    debut = time.perf_counter()
+    rows = paie_du_mois(depot, args.annee, args.mois, args.jours).as_rows()
+    duree = (time.perf_counter() - debut) * 1000
+    print(f"✅ {len(rows)} employé(s) calculé(s) en {duree:.1f} ms")
+
+    if args.verifier:
+        ecarts = 0
+        for emp, row in zip(employes, rows):
+            m = emp.get("Matricule", "")
+            heures = heures_depuis_codes(codes_mois.get(m, []))
+            attendu = calcul_paie(emp, args.annee, args.mois, heures, saisies.get(f"{m}_{args.annee}_{args.mois}", {}),
+                                  args.jours).as_row()
+            for col, a, b in zip(SALAIRE_COLS, attendu, row):
+                if a != b:
+                    ecarts += 1
+                    print(f"❌ {m} {col}: scalaire={a} lot={b}")
+        if ecarts:
+            print(f"❌ {ecarts} écart(s)")
+            sys.exit(1)
+        print("✅ Parité vérifiée")
+
+
+if __name__ == "__main__":
+    main()
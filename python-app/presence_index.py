@@ -0,0 +1,263 @@
+# python-app/presence_index.py
+"""
+Index des présences : (année, mois) -> matrice compacte employés x jours.
+
+Sur disque, presences.json reste un dictionnaire plat
+"MATRICULE_ANNEE_MOIS_JOUR" -> code, lisible par l'application desktop.
+En mémoire, chaque mois est une matrice uint8 (un octet par cellule, 0 = pas
+de saisie) avec une table matricule -> ligne : la lecture d'un mois ne
+parcourt que ce mois, et les totaux d'heures sont des réductions sur la
+matrice (voir paie_lot.heures_matrice). `from_flat` / `to_flat` convertissent
+depuis et vers le format plat.
+"""
+import calendar
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+PresenceKey = Tuple[str, int, int, int]
+
+# Code de présence -> entier de la matrice (0 = pas de saisie). Un code
+# inconnu rencontré dans presences.json reçoit le numéro suivant.
+CODES = ("", "p", "n", "a", "c", "m", "f")
+CODE_IDS = {code: i for i, code in enumerate(CODES)}
+_codes: List[str] = list(CODES)
+
+# Codes acceptés à la saisie (desktop et API) ; "" efface la cellule
+ALLOWED_PRESENCE_VALUES = {"p", "n", "a", "c", "m", "f"}
+_code_ids: Dict[str, int] = dict(CODE_IDS)
+
+
+def code_id(code: str) -> int:
+    """Numéro d'un code dans les matrices (enregistré au premier usage)."""
+    i = _code_ids.get(code)
+    if i is None:
+        if len(_codes) > 255:
+            raise ValueError(f"Trop de codes de présence distincts : {code!r}")
+        i = _code_ids[code] = len(_codes)
+        _codes.append(code)
+    return i
+
+
+def code_name(i: int) -> str:
+    return _codes[i]
+
+
+def presence_key(matricule: str, year: int, month: int, day: int) -> str:
+    return f"{matricule}_{year}_{month}_{day}"
+
+
+def parse_presence_key(key: str) -> Optional[PresenceKey]:
+    """'CC0003_2025_10_4' -> ('CC0003', 2025, 10, 4) ; None si la clé est invalide.
+
+    Le découpage se fait par la droite : un matricule peut contenir des '_'.
+    """
+    parts = key.rsplit("_", 3)
+    if len(parts) != 4 or not parts[0]:
+        return None
+    try:
+        year, month, day = int(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return parts[0], year, month, day
+
+
+def days_in_month(year: int, month: int) -> int:
+    return calendar.monthrange(year, month)[1]
+
+
+class MoisPresence(Mapping[str, List[str]]):
+    """Présences d'un mois : matrice uint8 (employés x jours) et matricule -> ligne.
+
+    Se lit aussi comme un dictionnaire matricule -> [code du jour 1, ...]
+    limité aux employés qui ont au moins une saisie, comme l'ancien index.
+    """
+
+    def __init__(self, year: int, month: int):
+        self.year, self.month = year, month
+        self.days = days_in_month(year, month)
+        self.rows: Dict[str, int] = {}
+        self.matricules: List[str] = []
+        self._codes = np.zeros((0, self.days), dtype=np.uint8)
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Matrice des lignes utilisées (vue, ne pas modifier)."""
+        return self._codes[:len(self.matricules)]
+
+    def row(self, matricule: str, create: bool = False) -> int:
+        """Ligne d'un matricule ; -1 s'il n'a pas de ligne (et `create` est faux)."""
+        r = self.rows.get(matricule, -1)
+        if r < 0 and create:
+            r = self.rows[matricule] = len(self.matricules)
+            self.matricules.append(matricule)
+            if r >= len(self._codes):
+                # Capacité doublée : ajout d'un employé en O(1) amorti
+                grown = np.zeros((max(8, 2 * len(self._codes)), self.days), dtype=np.uint8)
+                grown[:len(self._codes)] = self._codes
+                self._codes = grown
+        return r
+
+    def copy(self) -> "MoisPresence":
+        """Copie indépendante (lignes utilisées seulement)."""
+        mois = MoisPresence(self.year, self.month)
+        mois.rows = dict(self.rows)
+        mois.matricules = list(self.matricules)
+        mois._codes = self.codes.copy()
+        return mois
+
+    def get_code(self, matricule: str, day: int) -> str:
+        r = self.rows.get(matricule, -1)
+        if r < 0 or not (1 <= day <= self.days):
+            return ""
+        return _codes[self._codes[r, day - 1]]
+
+    def set_code(self, matricule: str, day: int, code: str) -> str:
+        """Écrit un code ("" pour effacer) et renvoie l'ancien code."""
+        if not (1 <= day <= self.days):
+            return ""
+        r = self.row(matricule, create=bool(code))
+        if r < 0:
+            return ""
+        old = _codes[self._codes[r, day - 1]]
+        self._codes[r, day - 1] = code_id(code) if code else 0
+        return old
+
+    def matrice(self, matricules: Sequence[str]) -> np.ndarray:
+        """Lignes des `matricules`, dans cet ordre (lignes à 0 pour les inconnus)."""
+        rows = np.fromiter((self.rows.get(m, -1) for m in matricules), dtype=np.int64, count=len(matricules))
+        mat = np.zeros((len(matricules), self.days), dtype=np.uint8)
+        known = rows >= 0
+        mat[known] = self._codes[rows[known]]
+        return mat
+
+    def cells(self) -> int:
+        """Nombre de cellules saisies."""
+        return int(np.count_nonzero(self.codes))
+
+    def flat(self) -> Dict[str, str]:
+        """Les présences du mois au format plat de presences.json."""
+        flat: Dict[str, str] = {}
+        for r, d in zip(*np.nonzero(self.codes)):
+            flat[presence_key(self.matricules[r], self.year, self.month, int(d) + 1)] = _codes[self._codes[r, d]]
+        return flat
+
+    # ---------- Vue dictionnaire matricule -> codes ----------
+    def __getitem__(self, matricule: str) -> List[str]:
+        r = self.rows.get(matricule, -1)
+        if r < 0 or not self._codes[r].any():
+            raise KeyError(matricule)
+        return [_codes[i] for i in self._codes[r]]
+
+    def __iter__(self) -> Iterator[str]:
+        filled = self.codes.any(axis=1)
+        return (m for m, used in zip(self.matricules, filled) if used)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.codes.any(axis=1)))
+
+    def nbytes(self) -> int:
+        return self._codes.nbytes
+
+
+class PresenceIndex:
+    """Présences indexées par mois (une MoisPresence par mois saisi)."""
+
+    def __init__(self):
+        self._months: Dict[Tuple[int, int], MoisPresence] = {}
+        # Entrées de presences.json qui ne désignent pas une cellule valide :
+        # gardées telles quelles pour que to_flat() ne perde rien
+        self.extra: Dict[str, str] = {}
+        # Appelés avec (matricule, année, mois) quand une cellule change de valeur
+        self._listeners: List[Callable[[str, int, int], None]] = []
+
+    def add_listener(self, callback: Callable[[str, int, int], None]):
+        self._listeners.append(callback)
+
+    @classmethod
+    def from_flat(cls, presences: Dict[str, str]) -> "PresenceIndex":
+        index = cls()
+        for key, val in presences.items():
+            if not val:
+                continue
+            parsed = parse_presence_key(key)
+            if parsed and parsed[3] <= days_in_month(parsed[1], parsed[2]):
+                index.set(*parsed, val)
+            else:
+                index.extra[key] = val
+        return index
+
+    def _mois(self, year: int, month: int, create: bool) -> Optional[MoisPresence]:
+        mois = self._months.get((year, month))
+        if mois is None and create:
+            mois = self._months[(year, month)] = MoisPresence(year, month)
+        return mois
+
+    def get(self, matricule: str, year: int, month: int, day: int) -> str:
+        mois = self._months.get((year, month))
+        return "" if mois is None else mois.get_code(matricule, day)
+
+    def set(self, matricule: str, year: int, month: int, day: int, code: str) -> str:
+        """Écrit un code ("" pour effacer) et renvoie l'ancien code."""
+        code = (code or "").strip().lower()
+        mois = self._mois(year, month, create=bool(code))
+        if mois is None:
+            return ""
+        old = mois.set_code(matricule, day, code)
+        if old != code:
+            for callback in self._listeners:
+                callback(matricule, year, month)
+        return old
+
+    def copy(self) -> "PresenceIndex":
+        """Copie des matrices et des entrées hors grille, sans les écouteurs.
+
+        Peu coûteuse (une copie de tableau par mois) : à faire sur le thread
+        de l'interface, le passage au format plat (`to_flat`) se faisant
+        ensuite sur la copie, hors de ce thread.
+        """
+        index = PresenceIndex()
+        index._months = {ym: mois.copy() for ym, mois in self._months.items()}
+        index.extra = dict(self.extra)
+        return index
+
+    def month(self, year: int, month: int) -> MoisPresence:
+        """Matrice du mois (vue interne, ne pas modifier ; vide si le mois n'a pas de saisie)."""
+        mois = self._months.get((year, month))
+        return MoisPresence(year, month) if mois is None else mois
+
+    def month_flat(self, year: int, month: int) -> Dict[str, str]:
+        """Les présences d'un mois au format plat de presences.json."""
+        mois = self._months.get((year, month))
+        return {} if mois is None else mois.flat()
+
+    def months(self) -> Iterable[Tuple[int, int]]:
+        return self._months.keys()
+
+    def to_flat(self) -> Dict[str, str]:
+        flat: Dict[str, str] = {}
+        for mois in self._months.values():
+            flat.update(mois.flat())
+        flat.update(self.extra)
+        return flat
+
+    def count_code(self, code: str) -> Dict[str, int]:
+        """Nombre de cellules `code` par matricule, tous mois confondus."""
+        i = _code_ids.get(code)
+        counts: Dict[str, int] = {}
+        if i is None:
+            return counts
+        for mois in self._months.values():
+            per_row = np.count_nonzero(mois.codes == i, axis=1)
+            for r in np.flatnonzero(per_row):
+                m = mois.matricules[r]
+                counts[m] = counts.get(m, 0) + int(per_row[r])
+        return counts
+
+    def nbytes(self) -> int:
+        return sum(mois.nbytes() for mois in self._months.values())
+
+    def __len__(self) -> int:
+        return sum(mois.cells() for mois in self._months.values())
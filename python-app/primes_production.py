@@ -0,0 +1,272 @@
+# python-app/primes_production.py
+"""
+Prime de production à partir des exports d'appels (nombre d'appels et TMC par agent).
+
+Reprend le calcul de Calcul_tmc_appel.html côté serveur : le fichier (CSV ou
+XLSX) est lu ligne par ligne, les noms d'agents sont normalisés comme par
+`normalizeName`, puis appels et TMC sont cumulés par agent et par mois en une
+seule passe (mémoire proportionnelle au nombre d'agents, pas au nombre
+d'appels). Le montant `appels x prix_appel + TMC x prix_tmc` est écrit dans
+la saisie "Prime de production" de salaires.json, sans toucher aux autres
+saisies de l'employé.
+
+Colonnes : celles de l'export habituel (Nom, Nombre d'appels, Log, TMC,
+Shift, Remarque), reconnues par leur nom ou, à défaut, par leur position.
+Une colonne Date permet de répartir un même fichier sur plusieurs mois.
+
+Depuis la ligne de commande :
+    python primes_production.py appels_2025_10.xlsx 2025 10 --data data
+    python primes_production.py appels.csv 2025 10 --prix-appel 15 --prix-tmc 50 --simulation
+"""
+import argparse
+import datetime
+import functools
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from employe_search import fold
+from import_presences import date_texte, lire_lignes, texte_cellule
+from paie import parse_float
+from storage import VersionConflict, salaire_key
+
+# Prix par défaut du calculateur (Ar)
+PRIX_APPEL = 15
+PRIX_TMC = 50
+
+SAISIE_PRIME = "Prime de production"
+
+# Colonnes de l'export (position par défaut, comme dans Calcul_tmc_appel.html)
+POSITIONS = {"nom": 0, "appels": 1, "tmc": 3}
+# Nom de colonne (replié par `fold`) -> rôle
+COLONNES = {
+    "nom": "nom", "agent": "nom", "nom agent": "nom",
+    "nombre d'appel": "appels", "nombre d'appels": "appels", "nb appel": "appels", "nb appels": "appels",
+    "appels": "appels", "nombre appel": "appels", "nombre appels": "appels",
+    "tmc": "tmc",
+    "date": "date",
+}
+
+# Tentatives d'écriture si le mois est modifié pendant le calcul
+ESSAIS_ECRITURE = 3
+
+
+@functools.lru_cache(maxsize=16384)
+def normaliser_nom(raw: Any) -> str:
+    """Port de `normalizeName` : majuscules, sans accents ni espaces.
+
+    "" pour une ligne à ignorer (commence par un chiffre, ou TOTAL) ; tout
+    ce qui commence par MAT devient "MAT".
+    """
+    if raw is None:
+        return ""
+    s = unicodedata.normalize("NFD", str(raw).upper().strip())
+    s = "".join(c for c in s if not unicodedata.combining(c) and not c.isspace())
+    if s[:1].isdigit() or s == "TOTAL":
+        return ""
+    if s.startswith("MAT"):
+        return "MAT"
+    return s
+
+
+@dataclass
+class Tarifs:
+    prix_appel: float = PRIX_APPEL
+    prix_tmc: float = PRIX_TMC
+
+    def montant(self, appels: float, tmc: float) -> float:
+        return appels * self.prix_appel + tmc * self.prix_tmc
+
+
+@dataclass
+class TotalAgent:
+    appels: float = 0.0
+    tmc: float = 0.0
+    lignes: int = 0
+
+
+@dataclass
+class SyntheseAppels:
+    """Totaux par (agent normalisé, année, mois)."""
+    totaux: Dict[Tuple[str, int, int], TotalAgent] = field(default_factory=dict)
+    lignes: int = 0
+    ignorees: int = 0
+    duree: float = 0.0
+
+    def ajouter(self, agent: str, annee: int, mois: int, appels: float, tmc: float):
+        total = self.totaux.get((agent, annee, mois))
+        if total is None:
+            total = self.totaux[(agent, annee, mois)] = TotalAgent()
+        total.appels += appels
+        total.tmc += tmc
+        total.lignes += 1
+
+
+def _colonnes(entete: Sequence[Any]) -> Dict[str, int]:
+    roles: Dict[str, int] = {}
+    for i, nom in enumerate(entete):
+        role = COLONNES.get(" ".join(fold(texte_cellule(nom)).split()))
+        if role and role not in roles:
+            roles[role] = i
+    if "nom" in roles and "appels" in roles and "tmc" in roles:
+        return roles
+    # En-tête non reconnu : colonnes de l'export habituel
+    return {**POSITIONS, **({"date": roles["date"]} if "date" in roles else {})}
+
+
+def _mois_ligne(valeur: Any) -> Optional[Tuple[int, int]]:
+    if isinstance(valeur, (datetime.date, datetime.datetime)):
+        return valeur.year, valeur.month
+    texte = texte_cellule(valeur)
+    date = date_texte(texte)[0] if texte else None
+    return (date.year, date.month) if date else None
+
+
+def agreger_appels(lignes: Iterator[Sequence[Any]], annee: int, mois: int) -> SyntheseAppels:
+    """Cumule appels et TMC par agent et par mois, en une passe sur les lignes.
+
+    La première ligne est l'en-tête. Sans colonne Date (ou si elle est vide),
+    les appels sont comptés sur `annee` / `mois`.
+    """
+    debut = time.perf_counter()
+    synthese = SyntheseAppels()
+    roles: Optional[Dict[str, int]] = None
+    i_nom = i_appels = i_tmc = 0
+    i_date: Optional[int] = None
+    for valeurs in lignes:
+        if roles is None:
+            roles = _colonnes(valeurs)
+            i_nom, i_appels, i_tmc, i_date = roles["nom"], roles["appels"], roles["tmc"], roles.get("date")
+            continue
+        synthese.lignes += 1
+        agent = normaliser_nom(valeurs[i_nom] if i_nom < len(valeurs) else None)
+        if not agent:
+            synthese.ignorees += 1
+            continue
+        periode = (annee, mois)
+        if i_date is not None and i_date < len(valeurs):
+            periode = _mois_ligne(valeurs[i_date]) or periode
+        # Number(x) || 0 : une valeur illisible compte pour 0
+        appels = parse_float(valeurs[i_appels]) if i_appels < len(valeurs) else 0.0
+        tmc = parse_float(valeurs[i_tmc]) if i_tmc < len(valeurs) else 0.0
+        synthese.ajouter(agent, *periode, appels, tmc)
+    synthese.duree = time.perf_counter() - debut
+    return synthese
+
+
+def agents_employes(employes: List[Dict[str, str]]) -> Dict[str, Optional[str]]:
+    """Nom normalisé -> matricule (None si plusieurs employés le partagent).
+
+    Un agent est reconnu par son matricule, "NOMPRENOM", "PRENOMNOM" ou son
+    nom seul.
+    """
+    agents: Dict[str, Optional[str]] = {}
+    for emp in employes:
+        matricule = emp.get("Matricule", "")
+        nom, prenom = emp.get("Nom", ""), emp.get("Prénom", "")
+        for cle in {normaliser_nom(matricule), normaliser_nom(nom + prenom), normaliser_nom(prenom + nom),
+                    normaliser_nom(nom)}:
+            if not cle or cle == "MAT":
+                continue
+            agents[cle] = None if agents.get(cle, matricule) != matricule else matricule
+    return agents
+
+
+@dataclass
+class PrimeAgent:
+    agent: str
+    annee: int
+    mois: int
+    appels: float
+    tmc: float
+    montant: float
+    matricule: Optional[str]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "agent": self.agent, "annee": self.annee, "mois": self.mois, "appels": self.appels,
+            "tmc": self.tmc, "montant": self.montant, "matricule": self.matricule,
+        }
+
+
+def primes_par_agent(synthese: SyntheseAppels, employes: List[Dict[str, str]], tarifs: Tarifs) -> List[PrimeAgent]:
+    """Montants par agent et par mois, triés par montant décroissant (comme la synthèse du calculateur)."""
+    agents = agents_employes(employes)
+    primes = [
+        PrimeAgent(agent, annee, mois, total.appels, total.tmc, tarifs.montant(total.appels, total.tmc),
+                   agents.get(agent))
+        for (agent, annee, mois), total in synthese.totaux.items()
+    ]
+    primes.sort(key=lambda p: -p.montant)
+    return primes
+
+
+def ecrire_primes(depot: Any, primes: List[PrimeAgent]) -> int:
+    """Écrit "Prime de production" dans les saisies du mois des agents reconnus.
+
+    Les autres saisies de l'employé sont conservées. L'écriture d'un mois
+    est refusée si le mois a changé depuis sa lecture : elle est alors
+    refaite sur les données à jour. Renvoie le nombre de saisies écrites.
+    """
+    par_mois: Dict[Tuple[int, int], Dict[str, float]] = {}
+    for prime in primes:
+        if prime.matricule:
+            montants = par_mois.setdefault((prime.annee, prime.mois), {})
+            # Plusieurs graphies d'un même employé : montants cumulés
+            montants[prime.matricule] = montants.get(prime.matricule, 0.0) + prime.montant
+    ecrites = 0
+    for (annee, mois), montants in sorted(par_mois.items()):
+        for essai in range(ESSAIS_ECRITURE):
+            version = depot.month_version(annee, mois)
+            saisies = depot.salaires_month(annee, mois)
+            donnees = {}
+            for matricule, montant in montants.items():
+                cle = salaire_key(matricule, annee, mois)
+                donnees[cle] = {**saisies.get(cle, {}), SAISIE_PRIME: float(round(montant, 2))}
+            try:
+                if not depot.update_salaires(
+                    donnees, precondition=lambda: depot.month_version(annee, mois) == version
+                ):
+                    raise RuntimeError(f"Échec de l'écriture des primes {mois:02d}/{annee}")
+                break
+            except VersionConflict:
+                if essai == ESSAIS_ECRITURE - 1:
+                    raise
+        ecrites += len(montants)
+    return ecrites
+
+
+def main():
+    from storage import open_repository
+
+    parser = argparse.ArgumentParser(description="Prime de production depuis un export d'appels (CSV ou XLSX)")
+    parser.add_argument("fichier", help="Export .csv ou .xlsx")
+    parser.add_argument("annee", type=int)
+    parser.add_argument("mois", type=int)
+    parser.add_argument("--data", default="data", help="Dossier des données")
+    parser.add_argument("--prix-appel", type=float, default=PRIX_APPEL, help="Prix par appel (Ar)")
+    parser.add_argument("--prix-tmc", type=float, default=PRIX_TMC, help="Prix par TMC (Ar)")
+    parser.add_argument("--simulation", action="store_true", help="Affiche la synthèse sans écrire les saisies")
+    args = parser.parse_args()
+
+    with open(args.fichier, "rb") as f:
+        synthese = agreger_appels(lire_lignes(f, args.fichier), args.annee, args.mois)
+    depot = open_repository(args.data)
+    try:
+        primes = primes_par_agent(synthese, depot.data_copy("employes"), Tarifs(args.prix_appel, args.prix_tmc))
+        for p in primes:
+            print(f"{p.agent:<30} {p.mois:02d}/{p.annee} {p.appels:>8g} appels {p.tmc:>8g} TMC "
+                  f"{p.montant:>12,.0f} Ar  {p.matricule or '❓ inconnu'}".replace(",", " "))
+        print(f"✅ {synthese.lignes} ligne(s) lue(s) en {synthese.duree:.1f} s, {len(primes)} agent(s)")
+        inconnus = sum(1 for p in primes if not p.matricule)
+        if inconnus:
+            print(f"⚠️ {inconnus} agent(s) sans employé correspondant (non écrits)")
+        if not args.simulation:
+            print(f"💾 {ecrire_primes(depot, primes)} saisie(s) « {SAISIE_PRIME} » enregistrée(s)")
+    finally:
+        depot.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+# python-app/sqlite_storage.py
+"""
+Stockage SQLite des employés, présences et saisies de salaire.
+
+Même interface que `storage.DataRepository`, choisie par
+`Config.STORAGE_BACKEND = "sqlite"`. Les présences sont une ligne par
+(matricule, année, mois, jour) : la lecture d'un mois, le nombre de congés
+d'un employé ou les saisies d'un mois sont des requêtes indexées au lieu de
+parcourir tout un fichier JSON.
+
+Les numéros de version (table `versions`) sont dans la base : plusieurs
+processus (workers de l'API) qui ouvrent la même base voient les mêmes
+versions, et chaque écriture est une transaction `BEGIN IMMEDIATE`.
+
+Migration depuis les fichiers JSON :
+    python sqlite_storage.py migrate data data/colarys.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from conges import CODE_CONGE, LeaveLedger
+from employe_index import EmployeIndex
+from presence_index import MoisPresence, PresenceIndex, parse_presence_key, presence_key
+from storage import Precondition, VersionConflict, copy_data, load_data, parse_salaire_key, salaire_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS employes (
+    matricule TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS presences (
+    matricule TEXT NOT NULL,
+    annee INTEGER NOT NULL,
+    mois INTEGER NOT NULL,
+    jour INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    PRIMARY KEY (matricule, annee, mois, jour)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_presences_mois ON presences (annee, mois);
+CREATE INDEX IF NOT EXISTS idx_presences_code ON presences (matricule, code);
+CREATE TABLE IF NOT EXISTS salaires (
+    matricule TEXT NOT NULL,
+    annee INTEGER NOT NULL,
+    mois INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (matricule, annee, mois)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_salaires_mois ON salaires (annee, mois);
+CREATE TABLE IF NOT EXISTS versions (
+    cle TEXT PRIMARY KEY,
+    n INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+BUMP_VERSION = "INSERT INTO versions (cle, n) VALUES (?, 1) ON CONFLICT(cle) DO UPDATE SET n = n + 1"
+
+# Fichier JSON -> table, pour l'application desktop qui raisonne en fichiers
+TABLES = {"employes.json": "employes", "presences.json": "presences", "salaires.json": "salaires"}
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _month_key(year: int, month: int) -> str:
+    return f"mois:{year}-{month:02d}"
+
+
+def _write_cells(conn: sqlite3.Connection, changes: List[Tuple[str, int, int, int, str]]):
+    conn.executemany(
+        "INSERT OR REPLACE INTO presences (matricule, annee, mois, jour, code) VALUES (?, ?, ?, ?, ?)",
+        [c for c in changes if c[4]],
+    )
+    conn.executemany(
+        "DELETE FROM presences WHERE matricule = ? AND annee = ? AND mois = ? AND jour = ?",
+        [c[:4] for c in changes if not c[4]],
+    )
+
+
+def _write_soldes(conn: sqlite3.Connection, matricules: Optional[set] = None) -> bool:
+    """Recalcule "Solde de congé" (de tous les employés ou de `matricules`) ; True si l'un a changé."""
+    counts = dict(conn.execute(
+        "SELECT matricule, COUNT(*) FROM presences WHERE code = ? GROUP BY matricule", (CODE_CONGE,)
+    ))
+    ledger = LeaveLedger.from_counts(counts)
+    changed = False
+    for matricule, data in conn.execute("SELECT matricule, data FROM employes").fetchall():
+        if matricules is not None and matricule not in matricules:
+            continue
+        emp = json.loads(data)
+        if ledger.update_soldes([emp]):
+            conn.execute("UPDATE employes SET data = ? WHERE matricule = ?", (_dumps(emp), matricule))
+            changed = True
+    return changed
+
+
+class _TableView:
+    """Vue « store » d'une table : `get()` matérialise la table au format JSON d'origine.
+
+    Le résultat est mis en cache jusqu'à la prochaine modification de la table.
+    """
+
+    def __init__(self, repo: "SqliteRepository", name: str, loader: Callable[[], Any]):
+        self._repo = repo
+        self._name = name
+        self._loader = loader
+        self._cache: Any = None
+        self._cache_version = -1
+
+    @property
+    def version(self) -> int:
+        return self._repo._version(self._name)
+
+    def get(self) -> Any:
+        with self._repo._lock:
+            if self._cache_version != self.version:
+                self._cache = self._loader()
+                self._cache_version = self.version
+            return self._cache
+
+    def copy(self) -> Any:
+        return self._loader()
+
+
+class SqliteLeaveCounts(LeaveLedger):
+    """Nombre de congés par employé, lu dans la table presences (index matricule, code)."""
+
+    def __init__(self, repo: "SqliteRepository"):
+        super().__init__()
+        self._repo = repo
+
+    def count(self, matricule: str) -> int:
+        row = self._repo._query_one(
+            "SELECT COUNT(*) FROM presences WHERE matricule = ? AND code = ?", (matricule, CODE_CONGE)
+        )
+        return row[0]
+
+    def apply(self, matricule: str, old_code: str, new_code: str):
+        # Les compteurs sont tenus par la base elle-même
+        pass
+
+
+class SqliteRepository:
+    """Stockage des données dans une base SQLite locale."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.employes = _TableView(self, "employes", self._load_employes)
+        self.presences = _TableView(self, "presences", self._load_presences)
+        self.salaires = _TableView(self, "salaires", self._load_salaires)
+        self._leave_counts = SqliteLeaveCounts(self)
+        self._employe_index: Optional[EmployeIndex] = None
+        # Les listes en cache sont remplacées à chaque écriture, jamais modifiées ;
+        # seul l'index de recherche se remplit pendant les lectures (voir `reading`)
+        self._data_lock = threading.RLock()
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _query_one(self, sql: str, params: Tuple = ()) -> Tuple:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def _write(self, name: str, fn: Callable[[sqlite3.Connection], Optional[bool]],
+               months: Iterable[Tuple[int, int]] = (), precondition: Precondition = None) -> bool:
+        """Exécute `fn` dans une transaction ; False en cas d'erreur.
+
+        La transaction est prise en écriture dès le début (BEGIN IMMEDIATE) :
+        `precondition()` voit le dernier état validé par tous les processus et
+        lève VersionConflict si elle est fausse. Les versions de `name` et de
+        `months` sont incrémentées, sauf si `fn` renvoie False (rien changé).
+        """
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if precondition is not None and not precondition():
+                        raise VersionConflict("Données modifiées depuis la version fournie")
+                    if fn(self._conn) is not False:
+                        keys = [name] + [_month_key(y, mo) for y, mo in set(months)]
+                        self._conn.executemany(BUMP_VERSION, [(k,) for k in keys])
+                except BaseException:
+                    self._conn.rollback()
+                    raise
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"❌ Erreur écriture SQLite {self.db_path}: {e}")
+                return False
+            return True
+
+    def _version(self, cle: str) -> int:
+        row = self._query_one("SELECT n FROM versions WHERE cle = ?", (cle,))
+        return row[0] if row else 0
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        """Parcours des index à l'abri des autres lectures (voir DataRepository.reading)."""
+        with self._data_lock:
+            yield
+
+    def data_copy(self, name: str) -> Any:
+        """Copie des données d'une table au format JSON d'origine."""
+        return copy_data(getattr(self, name).get())
+
+    def month_version(self, year: int, month: int) -> Tuple[int, ...]:
+        """Version des données dont dépend la paie d'un mois (voir DataRepository.month_version)."""
+        with self._lock:
+            return (self._version("employes"), self._version("snapshots"), self._version(_month_key(year, month)))
+
+    def data_version(self) -> Tuple[int, ...]:
+        """Version de l'ensemble des données (voir DataRepository.data_version)."""
+        with self._lock:
+            return tuple(self._version(name) for name in ("employes", "presences", "salaires"))
+
+    # ---------- Lecture complète (format JSON d'origine) ----------
+    def _load_employes(self) -> List[Dict[str, str]]:
+        return [json.loads(data) for (data,) in self._query("SELECT data FROM employes ORDER BY position")]
+
+    def _load_presences(self) -> Dict[str, str]:
+        rows = self._query("SELECT matricule, annee, mois, jour, code FROM presences")
+        return {presence_key(m, y, mo, d): code for m, y, mo, d, code in rows}
+
+    def _load_salaires(self) -> Dict[str, Any]:
+        rows = self._query("SELECT matricule, annee, mois, data FROM salaires")
+        return {salaire_key(m, y, mo): json.loads(data) for m, y, mo, data in rows}
+
+    # ---------- Employés ----------
+    def employe_index(self) -> EmployeIndex:
+        """Index des employés sur la liste en cache, reconstruit avec elle après chaque écriture."""
+        with self._lock:
+            data = self.employes.get()
+            if self._employe_index is None or self._employe_index.employes is not data:
+                self._employe_index = EmployeIndex(data)
+            return self._employe_index
+
+    def employe(self, matricule: str) -> Optional[Dict[str, str]]:
+        """Copie de l'employé `matricule` (None s'il est inconnu)."""
+        emp = self.employe_index().get(matricule)
+        return None if emp is None else dict(emp)
+
+    def upsert_employes(self, items: Iterable[Tuple[Optional[str], Dict[str, str]]],
+                        precondition: Precondition = None) -> bool:
+        """Ajoute ou remplace des employés : [(ancien matricule ou None, employé), ...]."""
+        items = [(matricule or emp.get("Matricule", ""), emp) for matricule, emp in items]
+        if not items:
+            return True
+
+        def write(conn: sqlite3.Connection):
+            for old, emp in items:
+                new = emp.get("Matricule", "")
+                cur = conn.execute(
+                    "UPDATE employes SET matricule = ?, data = ? WHERE matricule = ?", (new, _dumps(emp), old)
+                )
+                if cur.rowcount == 0:
+                    conn.execute(
+                        "INSERT INTO employes (matricule, position, data) "
+                        "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM employes), ?)",
+                        (new, _dumps(emp)),
+                    )
+
+        return self._write("employes", write, precondition=precondition)
+
+    def upsert_employe(self, employe: Dict[str, str], matricule: Optional[str] = None,
+                       precondition: Precondition = None) -> bool:
+        return self.upsert_employes([(matricule, employe)], precondition)
+
+    def delete_employe(self, matricule: str, precondition: Precondition = None) -> bool:
+        return self._write(
+            "employes",
+            lambda conn: conn.execute("DELETE FROM employes WHERE matricule = ?", (matricule,)),
+            precondition=precondition,
+        )
+
+    def update_soldes(self, matricules: Optional[Iterable[str]] = None) -> bool:
+        """Recalcule le solde de congé (de tous les employés ou de `matricules`) dans une seule transaction."""
+        wanted = None if matricules is None else set(matricules)
+        return self._write("employes", lambda conn: _write_soldes(conn, wanted))
+
+    # ---------- Salaires ----------
+    def update_salaires(self, salaires_data: Dict[str, Any], precondition: Precondition = None) -> bool:
+        """Met à jour les saisies manuelles {"MATRICULE_ANNEE_MOIS": {...}}."""
+        rows = []
+        for key, value in salaires_data.items():
+            parsed = parse_salaire_key(key)
+            if parsed:
+                rows.append((*parsed, _dumps(value)))
+            else:
+                print(f"⚠️ Clé de salaire ignorée: {key}")
+        return self._write(
+            "salaires",
+            lambda conn: conn.executemany(
+                "INSERT OR REPLACE INTO salaires (matricule, annee, mois, data) VALUES (?, ?, ?, ?)", rows
+            ),
+            months=[(y, mo) for _, y, mo, _ in rows],
+            precondition=precondition,
+        )
+
+    def salaires_month(self, year: int, month: int) -> Dict[str, Any]:
+        rows = self._query("SELECT matricule, data FROM salaires WHERE annee = ? AND mois = ?", (year, month))
+        return {salaire_key(m, year, month): json.loads(data) for m, data in rows}
+
+    # ---------- Présences ----------
+    def presences_count(self) -> int:
+        return self._query_one("SELECT COUNT(*) FROM presences")[0]
+
+    def update_presence_cells(self, changes: Iterable[Tuple[str, int, int, int, str]],
+                              precondition: Precondition = None) -> bool:
+        """Applique des changements (matricule, année, mois, jour, code) ; code vide = suppression."""
+        changes = [(m, y, mo, d, (code or "").strip().lower()) for m, y, mo, d, code in changes]
+        if not changes:
+            return True
+
+        return self._write("presences", lambda conn: _write_cells(conn, changes),
+                           months=[(y, mo) for _, y, mo, _, _ in changes], precondition=precondition)
+
+    def patch_presences(self, changes: Iterable[Tuple[str, int, int, int, str]],
+                        precondition: Precondition = None) -> bool:
+        """Cellules et soldes de congé des employés touchés, dans une seule transaction."""
+        changes = [(m, y, mo, d, (code or "").strip().lower()) for m, y, mo, d, code in changes]
+        if not changes:
+            return True
+
+        def write(conn: sqlite3.Connection):
+            _write_cells(conn, changes)
+            if _write_soldes(conn, {c[0] for c in changes}):
+                conn.execute(BUMP_VERSION, ("employes",))
+
+        return self._write("presences", write, months=[(y, mo) for _, y, mo, _, _ in changes],
+                           precondition=precondition)
+
+    def month_presences(self, year: int, month: int) -> Dict[str, str]:
+        rows = self._query(
+            "SELECT matricule, jour, code FROM presences WHERE annee = ? AND mois = ?", (year, month)
+        )
+        return {presence_key(m, year, month, d): code for m, d, code in rows}
+
+    def month_codes(self, year: int, month: int) -> MoisPresence:
+        """matricule -> codes des jours du mois."""
+        return self.month_index(year, month).month(year, month)
+
+    def month_index(self, year: int, month: int) -> PresenceIndex:
+        """Index limité à un mois (mêmes méthodes que l'index complet du stockage JSON)."""
+        index = PresenceIndex()
+        for m, d, code in self._query(
+            "SELECT matricule, jour, code FROM presences WHERE annee = ? AND mois = ?", (year, month)
+        ):
+            index.set(m, year, month, d, code)
+        return index
+
+    def leave_ledger(self) -> LeaveLedger:
+        return self._leave_counts
+
+    # ---------- Fichiers complets (application desktop) ----------
+    def load_snapshot(self, filename: str) -> Any:
+        """Contenu équivalent au fichier JSON `filename` (employes.json, ...)."""
+        return getattr(self, TABLES[os.path.basename(filename)]).copy()
+
+    def save_snapshot(self, filename: str, data: Any) -> bool:
+        """Remplace tout le contenu de la table correspondant à `filename`."""
+        name = TABLES[os.path.basename(filename)]
+
+        def write(conn: sqlite3.Connection):
+            conn.execute(f"DELETE FROM {name}")
+            if name != "employes":
+                # Toutes les versions de mois deviennent caduques
+                conn.execute(BUMP_VERSION, ("snapshots",))
+            if name == "employes":
+                conn.executemany(
+                    "INSERT OR REPLACE INTO employes (matricule, position, data) VALUES (?, ?, ?)",
+                    [(emp.get("Matricule", ""), i, _dumps(emp)) for i, emp in enumerate(data)],
+                )
+            elif name == "presences":
+                rows = []
+                for key, code in data.items():
+                    parsed = parse_presence_key(key)
+                    if parsed and code:
+                        rows.append((*parsed, code))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO presences (matricule, annee, mois, jour, code) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            else:
+                rows = []
+                for key, value in data.items():
+                    parsed = parse_salaire_key(key)
+                    if parsed:
+                        rows.append((*parsed, _dumps(value)))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO salaires (matricule, annee, mois, data) VALUES (?, ?, ?, ?)", rows
+                )
+
+        return self._write(name, write)
+
+    def compact(self) -> bool:
+        return True
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_to_sqlite(data_dir: str, db_path: str) -> Dict[str, int]:
+    """Importe data/employes.json, presences.json et salaires.json dans la base."""
+    repo = SqliteRepository(db_path)
+    counts = {}
+    try:
+        for filename, default in (("employes.json", []), ("presences.json", {}), ("salaires.json", {})):
+            data = load_data(os.path.join(data_dir, filename), default)
+            if not repo.save_snapshot(filename, data):
+                raise RuntimeError(f"Échec de l'import de {filename}")
+            counts[filename] = len(getattr(repo, TABLES[filename]).get())
+    finally:
+        repo.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stockage SQLite Colarys Concept")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Importe les fichiers JSON dans la base SQLite")
+    migrate.add_argument("data_dir", nargs="?", default="data", help="Dossier des fichiers JSON")
+    migrate.add_argument("db_path", nargs="?", default=os.path.join("data", "colarys.db"), help="Base SQLite")
+    args = parser.parse_args()
+
+    counts = migrate_json_to_sqlite(args.data_dir, args.db_path)
+    for filename, n in counts.items():
+        print(f"✅ {filename}: {n} enregistrement(s) importé(s)")
+
+
+if __name__ == "__main__":
+    main()
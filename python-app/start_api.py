@@ -5,6 +5,7 @@ Usage:
     python start_api.py          # Démarre l'API uniquement
     python start_api.py --desktop  # Démarre l'app desktop uniquement  
     python start_api.py --both    # Démarre l'API et le desktop
+    python start_api.py --workers 4  # API en production sur 4 processus (sans --reload)
     python start_api.py --help    # Affiche l'aide
 """
 
@@ -37,8 +38,12 @@ def check_dependencies():
         print("💡 Installez les dépendances avec: pip install -r requirements.txt")
         return False
 
-def start_api():
-    """Démarre l'API FastAPI"""
+def start_api(workers: int = 1):
+    """Démarre l'API FastAPI
+    
+    Avec plusieurs workers, chaque processus ouvre le même dossier data :
+    les écritures sont sérialisées par le verrou data/data.lock (voir storage.py).
+    """
     print("🚀 Démarrage de l'API FastAPI...")
     print("📍 URL: http://localhost:8000")
     print("📚 Documentation: http://localhost:8000/docs")
@@ -58,14 +63,21 @@ def start_api():
             import shutil
             shutil.copy2(json_file, f"data/{json_file}")
     
+    commande = [
+        sys.executable, "-m", "uvicorn", 
+        "api:app", 
+        "--host", "0.0.0.0", 
+        "--port", "8000", 
+    ]
+    if workers > 1:
+        # --reload et --workers sont incompatibles : mode production
+        print(f"⚙️  {workers} workers")
+        commande += ["--workers", str(workers)]
+    else:
+        commande.append("--reload")
+    
     try:
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", 
-            "api:app", 
-            "--host", "0.0.0.0", 
-            "--port", "8000", 
-            "--reload"
-        ], check=True)
+        subprocess.run(commande, check=True)
     except subprocess.CalledProcessError as e:
         print(f"❌ Erreur lors du démarrage de l'API: {e}")
     except KeyboardInterrupt:
@@ -102,6 +114,12 @@ def main():
         action='store_true', 
         help='Démarre l\'API et l\'application desktop'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Nombre de processus de l\'API (plus de 1 : sans rechargement automatique)'
+    )
     
     args = parser.parse_args()
     
@@ -118,7 +136,7 @@ def main():
         print("🔧 Mode: API + Desktop")
         
         # Démarrer l'API dans un thread séparé
-        api_thread = Thread(target=start_api)
+        api_thread = Thread(target=start_api, args=(args.workers,))
         api_thread.daemon = True
         api_thread.start()
         
@@ -131,7 +149,7 @@ def main():
     else:
         # Mode API uniquement (par défaut)
         print("🔧 Mode: API uniquement")
-        start_api()
+        start_api(args.workers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,660 @@
+# python-app/storage.py
+"""
+Couche d'accès aux fichiers de données (employes.json, presences.json, salaires.json).
+
+Chaque fichier est chargé une seule fois puis servi depuis la mémoire. Une
+modification externe (app desktop, copie manuelle) est détectée par la taille
+et la date de modification du fichier, et provoque un rechargement paresseux.
+Les écritures passent par le même store pour que le cache reste cohérent :
+elles sont journalisées (voir journal.py) puis appliquées au cache.
+
+Plusieurs processus (workers de l'API) peuvent ouvrir le même dossier : les
+écritures se font sous un verrou entre processus (data.lock), après avoir
+intégré les lignes du journal ajoutées par les autres. Une écriture peut être
+conditionnée à la version lue par le client (ETag / If-Match) : si les données
+ont changé entre-temps, `VersionConflict` est levée au lieu d'écraser la
+modification d'un autre.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import data_codec
+from conges import LeaveLedger
+from employe_index import EmployeIndex
+from file_lock import FileLock
+from journal import OP_EMPLOYE, OP_EMPLOYE_SUPPR, OP_PRESENCE, OP_SALAIRE, Journal
+from presence_index import MoisPresence, PresenceIndex, presence_key
+
+# Nombre d'entrées du journal avant réécriture des fichiers de données
+COMPACT_EVERY = 500
+
+# Fichier verrouillé pendant les écritures (partagé par tous les processus)
+LOCK_FILE = "data.lock"
+
+# Condition évaluée sous verrou avant une écriture (False -> VersionConflict)
+Precondition = Optional[Callable[[], bool]]
+
+
+class VersionConflict(Exception):
+    """Les données ont été modifiées depuis la version sur laquelle s'appuie l'écriture."""
+
+
+def employe_version(emp: Dict[str, str]) -> str:
+    """Version d'un employé (empreinte de son contenu), identique dans tous les processus."""
+    return hashlib.sha1(json.dumps(emp, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def load_data(filename: str, default: Any):
+    """Charge les données depuis un fichier JSON (indenté ou compact, voir data_codec.py)"""
+    try:
+        if os.path.exists(filename):
+            return data_codec.read_file(filename)
+    except Exception as e:
+        print(f"❌ Erreur lecture {filename}: {e}")
+    return default
+
+
+def open_repository(data_dir: str):
+    """Ouvre le stockage choisi par `config.Config.STORAGE_BACKEND` ("json" ou "sqlite")."""
+    from config import Config
+
+    if Config.STORAGE_BACKEND == "sqlite":
+        from sqlite_storage import SqliteRepository
+
+        return SqliteRepository(Config.SQLITE_PATH or os.path.join(data_dir, "colarys.db"))
+    return DataRepository(data_dir)
+
+
+def data_format() -> str:
+    """Format d'écriture des fichiers de données (`config.Config.DATA_FORMAT`)."""
+    from config import Config
+
+    return Config.DATA_FORMAT
+
+
+def atomic_write_bytes(filename: str, payload: bytes):
+    """Écrit un fichier via un fichier temporaire puis un renommage atomique.
+
+    Un arrêt brutal pendant l'écriture laisse l'ancien fichier intact.
+    Lève OSError en cas d'échec.
+    """
+    tmp = f"{filename}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def atomic_write_data(filename: str, data: Any, fmt: Optional[str] = None):
+    """Écrit un fichier de données au format `fmt` (par défaut celui de la configuration).
+
+    Lève OSError en cas d'échec.
+    """
+    atomic_write_bytes(filename, data_codec.encode(filename, data, fmt or data_format()))
+
+
+def atomic_write_json(filename: str, data: Any, **dump_kwargs):
+    """Écrit un fichier JSON indenté, quel que soit le format configuré (voir `atomic_write_bytes`)."""
+    dump_kwargs.setdefault("indent", 4)
+    dump_kwargs.setdefault("ensure_ascii", False)
+    atomic_write_bytes(filename, json.dumps(data, **dump_kwargs).encode("utf-8"))
+
+
+def save_data(filename: str, data: Any, fmt: Optional[str] = None):
+    """Sauvegarde les données dans un fichier JSON (format de la configuration si `fmt` est omis)"""
+    try:
+        atomic_write_data(filename, data, fmt)
+        return True
+    except Exception as e:
+        print(f"❌ Erreur écriture {filename}: {e}")
+        return False
+
+
+class JsonStore:
+    """Un fichier JSON mis en cache en mémoire.
+
+    `get()` renvoie l'objet en cache : il est partagé entre les requêtes et ne
+    doit pas être modifié directement. Les modifications passent par
+    `DataRepository`, qui les journalise avant de les appliquer au cache ;
+    `save()` réécrit le fichier complet (compactage).
+    """
+
+    def __init__(self, filename: str, default_factory: Callable[[], Any], check_interval: float = 1.0,
+                 sync: Optional[Callable[[], None]] = None):
+        self.filename = filename
+        self.default_factory = default_factory
+        # Intervalle minimal entre deux stat() du fichier (en secondes)
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._data: Any = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._last_check = 0.0
+        self._loaded = False
+        self.version = 0
+        # Nombre de lectures complètes du fichier
+        self.loads = 0
+        # Le cache contient des modifications pas encore écrites dans le fichier
+        self.dirty = False
+        # Appelé avec les données fraîchement relues (rejeu du journal) ;
+        # renvoie True si des modifications y ont été appliquées
+        self.on_reload: Optional[Callable[[Any], bool]] = None
+        # Appelé avant chaque lecture ; quand il est fourni, c'est lui (sous le
+        # verrou entre processus) qui relit le fichier, pas `get()`
+        self.sync = sync
+        self._stale = False
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _reload(self, signature: Optional[Tuple[int, int]]):
+        data = load_data(self.filename, None)
+        if not isinstance(data, type(self.default_factory())):
+            data = self.default_factory()
+        self.dirty = bool(self.on_reload and self.on_reload(data))
+        self._data = data
+        self._signature = signature
+        self._loaded = True
+        self._stale = False
+        self.loads += 1
+        self.version += 1
+
+    def _refresh_if_stale(self):
+        now = time.monotonic()
+        if self._loaded and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        signature = self._stat_signature()
+        if not self._loaded or signature != self._signature:
+            self._reload(signature)
+
+    def get(self) -> Any:
+        """Renvoie les données en cache (rechargées si le fichier a changé)."""
+        if self.sync is not None:
+            self.sync()
+            with self._lock:
+                if not self._loaded:
+                    self._reload(self._stat_signature())
+                return self._data
+        with self._lock:
+            self._refresh_if_stale()
+            return self._data
+
+    def reload(self):
+        """Relit le fichier (et rejoue le journal) sans attendre `check_interval`."""
+        with self._lock:
+            self._reload(self._stat_signature())
+
+    def is_stale(self) -> bool:
+        """Vrai si le fichier a été modifié hors de ce store (vérifié au plus toutes les `check_interval` s)."""
+        with self._lock:
+            if not self._loaded:
+                return True
+            now = time.monotonic()
+            if now - self._last_check >= self.check_interval:
+                self._last_check = now
+                self._stale = self._stat_signature() != self._signature
+            return self._stale
+
+    def copy(self) -> Any:
+        """Copie modifiable des données, à republier avec `save()`."""
+        data = self.get()
+        with self._lock:
+            return copy.deepcopy(data)
+
+    def save(self, data: Any) -> bool:
+        """Écrit les données sur disque et remplace le cache.
+
+        L'écriture du fichier se fait sans le verrou du store : les lectures
+        du cache ne l'attendent pas (les modifications, elles, sont
+        sérialisées par le dépôt).
+        """
+        if not save_data(self.filename, data):
+            return False
+        with self._lock:
+            if data is not self._data:
+                # Un compactage réécrit le cache tel quel : les index restent valides
+                self.version += 1
+            self._data = data
+            self._signature = self._stat_signature()
+            self._last_check = time.monotonic()
+            self._loaded = True
+            self._stale = False
+            self.dirty = False
+            return True
+
+    def mark_changed(self):
+        """Signale une modification du cache en place (pas encore écrite dans le fichier)."""
+        with self._lock:
+            self.dirty = True
+            self.version += 1
+
+    def invalidate(self):
+        """Force un rechargement au prochain accès."""
+        with self._lock:
+            self._loaded = False
+
+
+def salaire_key(matricule: str, year: int, month: int) -> str:
+    return f"{matricule}_{year}_{month}"
+
+
+def parse_salaire_key(key: str) -> Optional[Tuple[str, int, int]]:
+    """'CC0003_2025_10' -> ('CC0003', 2025, 10) ; None si la clé est invalide."""
+    parts = key.rsplit("_", 2)
+    if len(parts) != 3 or not parts[0]:
+        return None
+    try:
+        return parts[0], int(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+
+
+def copy_data(data: Any) -> Any:
+    """Copie des conteneurs et des enregistrements (employés, saisies) d'un fichier de données."""
+    if isinstance(data, list):
+        return [dict(e) if isinstance(e, dict) else e for e in data]
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in data.items()}
+
+
+def _apply_entry(name: str, data: Any, entry: Dict[str, Any]):
+    """Applique une entrée du journal aux données du store `name`."""
+    op = entry.get("op")
+    if name == "employes" and op == OP_EMPLOYE:
+        for matricule, emp in entry["items"]:
+            for i, e in enumerate(data):
+                if e.get("Matricule") == matricule:
+                    data[i] = emp
+                    break
+            else:
+                data.append(emp)
+    elif name == "employes" and op == OP_EMPLOYE_SUPPR:
+        data[:] = [e for e in data if e.get("Matricule") != entry["matricule"]]
+    elif name == "presences" and op == OP_PRESENCE:
+        for matricule, year, month, day, code in entry["cells"]:
+            key = presence_key(matricule, year, month, day)
+            if code:
+                data[key] = code
+            else:
+                data.pop(key, None)
+    elif name == "salaires" and op == OP_SALAIRE:
+        data.update(entry["data"])
+
+
+class DataRepository:
+    """Regroupe les stores des trois fichiers de données d'un dossier.
+
+    Toutes les modifications passent par le journal (`journal.log`) : elles
+    coûtent une ligne ajoutée au lieu d'une réécriture complète, et survivent
+    à un arrêt brutal. Tous les `compact_every` ajouts, les fichiers JSON sont
+    réécrits (écriture atomique) et le journal est vidé.
+
+    Le dossier peut être ouvert par plusieurs processus : chaque écriture se
+    fait dans `transaction()` (verrou `data.lock`), qui intègre d'abord les
+    lignes ajoutées au journal par les autres processus. Les lectures les
+    intègrent au prochain accès à un store (`sync`).
+    """
+
+    def __init__(self, data_dir: str, compact_every: int = COMPACT_EVERY):
+        self.data_dir = data_dir
+        self.compact_every = compact_every
+        os.makedirs(data_dir, exist_ok=True)
+        # Ordre de prise des verrous : _lock, puis lock (entre processus), puis _data_lock,
+        # puis celui d'un store
+        self._lock = threading.RLock()
+        # Caches et index modifiés en place : tenu par une écriture le temps de les
+        # modifier (après le journal), et par les lectures qui les parcourent (`reading`)
+        self._data_lock = threading.RLock()
+        self.lock = FileLock(os.path.join(data_dir, LOCK_FILE))
+        # Thread qui exécute la transaction en cours (les lectures imbriquées ne resynchronisent pas)
+        self._sync_owner: Optional[int] = None
+        self.employes = JsonStore(os.path.join(data_dir, "employes.json"), list, sync=self.sync)
+        self.presences = JsonStore(os.path.join(data_dir, "presences.json"), dict, sync=self.sync)
+        self.salaires = JsonStore(os.path.join(data_dir, "salaires.json"), dict, sync=self.sync)
+        self._presence_index: Optional[PresenceIndex] = None
+        self._presence_index_version = -1
+        self._leave_ledger: Optional[LeaveLedger] = None
+        self._employe_index: Optional[EmployeIndex] = None
+        self._employe_index_version = -1
+        # Modifications des employés / des présences et saisies de chaque mois
+        # depuis le dernier compactage, comptées sur le journal partagé : même
+        # valeur dans tous les processus
+        self._employes_seq = 0
+        self._month_seq: Dict[Tuple[int, int], int] = {}
+
+        with self.lock:
+            self.journal = Journal(os.path.join(data_dir, "journal.log"))
+        for name, store in self._stores().items():
+            store.on_reload = partial(self._replay, name)
+        self._reset_versions()
+        # Au démarrage : rejouer le journal restant puis l'intégrer aux fichiers
+        if len(self.journal):
+            print(f"🔁 Rejeu de {len(self.journal)} modification(s) du journal")
+            self.compact()
+
+    def _stores(self) -> Dict[str, JsonStore]:
+        return {"employes": self.employes, "presences": self.presences, "salaires": self.salaires}
+
+    def _replay(self, name: str, data: Any) -> bool:
+        for entry in self.journal.entries:
+            _apply_entry(name, data, entry)
+        return bool(self.journal.entries)
+
+    # ---------- Synchronisation entre processus ----------
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Section critique : verrous du dépôt et du dossier, données à jour.
+
+        Réentrante : une transaction ouverte dans une autre ne resynchronise pas.
+        """
+        with self._lock, self.lock:
+            if self._sync_owner == threading.get_ident():
+                yield
+                return
+            self._sync_owner = threading.get_ident()
+            try:
+                self._sync_locked()
+                yield
+            finally:
+                self._sync_owner = None
+
+    def sync(self):
+        """Intègre les modifications des autres processus (journal, fichiers réécrits)."""
+        if self._sync_owner == threading.get_ident():
+            return
+        if not self.journal.changed() and not any(store.is_stale() for store in self._stores().values()):
+            return
+        with self.transaction():
+            pass
+
+    def _sync_locked(self):
+        new = self.journal.read_new()
+        if new is None:
+            # Compactage par un autre processus : fichiers réécrits, journal vidé
+            self.journal.reopen()
+            self._reset_versions()
+            for store in self._stores().values():
+                store.reload()
+            return
+        for entry in new:
+            self._integrate(entry, partial(self.journal.entries.append, entry))
+        # Fichier remplacé hors du journal (application desktop) : relu avec le journal
+        for store in self._stores().values():
+            if store.is_stale():
+                store.reload()
+
+    def _integrate(self, entry: Dict[str, Any], record: Callable[[], None]):
+        """Applique une entrée au cache et aux index ; `record()` l'inscrit d'abord au journal.
+
+        Les index sont mis à jour en place au lieu d'être reconstruits.
+        """
+        op = entry.get("op")
+        if op in (OP_EMPLOYE, OP_EMPLOYE_SUPPR):
+            index = self.employe_index()
+            record()
+            with self._data_lock:
+                index.apply_entry(entry)
+                self.employes.mark_changed()
+                self._employe_index_version = self.employes.version
+        elif op == OP_PRESENCE:
+            data = self.presences.get()
+            index = self.presence_index()
+            ledger = self._leave_ledger
+            record()
+            with self._data_lock:
+                _apply_entry("presences", data, entry)
+                for matricule, year, month, day, code in entry["cells"]:
+                    ledger.apply(matricule, index.set(matricule, year, month, day, code), code)
+                self.presences.mark_changed()
+                self._presence_index_version = self.presences.version
+        elif op == OP_SALAIRE:
+            data = self.salaires.get()
+            record()
+            with self._data_lock:
+                _apply_entry("salaires", data, entry)
+                self.salaires.mark_changed()
+        else:
+            record()
+        self._note(entry)
+
+    def _note(self, entry: Dict[str, Any]):
+        op = entry.get("op")
+        months: Iterable[Tuple[int, int]] = ()
+        if op in (OP_EMPLOYE, OP_EMPLOYE_SUPPR):
+            self._employes_seq += 1
+        elif op == OP_PRESENCE:
+            months = {(y, mo) for _, y, mo, _, _ in entry["cells"]}
+        elif op == OP_SALAIRE:
+            months = {parsed[1:] for parsed in map(parse_salaire_key, entry["data"]) if parsed}
+        for ym in months:
+            self._month_seq[ym] = self._month_seq.get(ym, 0) + 1
+
+    def _reset_versions(self):
+        self._employes_seq = 0
+        self._month_seq = {}
+        for entry in self.journal.entries:
+            self._note(entry)
+
+    def _commit(self, entry: Dict[str, Any], precondition: Precondition = None) -> bool:
+        """Journalise une modification puis l'applique au cache.
+
+        `precondition()` est évaluée sur les données à jour, sous verrou :
+        si elle est fausse, rien n'est écrit et VersionConflict est levée.
+        """
+        with self.transaction():
+            if precondition is not None and not precondition():
+                raise VersionConflict("Données modifiées depuis la version fournie")
+            try:
+                self._integrate(entry, partial(self.journal.append, entry))
+            except OSError as e:
+                print(f"❌ Erreur écriture journal {self.journal.filename}: {e}")
+                return False
+            if len(self.journal) >= self.compact_every:
+                self.compact()
+            return True
+
+    def compact(self) -> bool:
+        """Réécrit les fichiers modifiés puis vide le journal."""
+        with self.transaction():
+            for store in self._stores().values():
+                data = store.get()
+                if store.dirty and not store.save(data):
+                    return False
+            self.journal.truncate()
+            self._reset_versions()
+            return True
+
+    def close(self):
+        self.compact()
+        self.journal.close()
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        """Parcours des caches et index à l'abri des écritures en mémoire.
+
+        Les objets (index, données d'un store) doivent être obtenus avant
+        d'entrer dans le bloc : leur accès peut resynchroniser le dépôt, ce qui
+        prend les verrous d'écriture. Seules des copies en sortent.
+        """
+        with self._data_lock:
+            yield
+
+    def data_copy(self, name: str) -> Any:
+        """Copie des données d'un fichier ("employes", "presences" ou "salaires").
+
+        Les objets en cache sont modifiés en place par les écritures : une
+        réponse ou un calcul hors du dépôt part toujours d'une copie.
+        """
+        data = self._stores()[name].get()
+        with self._data_lock:
+            return copy_data(data)
+
+    def month_version(self, year: int, month: int) -> Tuple[Any, ...]:
+        """Version des données dont dépend la paie d'un mois.
+
+        Change quand les employés changent, quand les présences ou les saisies
+        de ce mois sont modifiées, ou quand un fichier est réécrit. Elle est
+        calculée depuis le journal et les fichiers partagés : tous les
+        processus qui ouvrent le dossier donnent la même valeur.
+        """
+        self.sync()
+        # Sans verrou : une écriture en cours ne retarde pas la lecture
+        return (
+            self.journal.generation,
+            self.employes._signature,
+            self.presences._signature,
+            self.salaires._signature,
+            self._employes_seq,
+            self._month_seq.get((year, month), 0),
+        )
+
+    def data_version(self) -> Tuple[Any, ...]:
+        """Version de l'ensemble des données (même valeur dans tous les processus)."""
+        self.sync()
+        return (
+            self.journal.generation,
+            self.employes._signature,
+            self.presences._signature,
+            self.salaires._signature,
+            len(self.journal),
+        )
+
+    # ---------- Employés ----------
+    def employe_index(self) -> EmployeIndex:
+        """Index des employés (matricule, Compagne, Fonction, Catégorie), reconstruit si employes.json a été relu."""
+        data = self.employes.get()
+        index = self._employe_index
+        # Cas courant sans verrou : les lectures n'attendent pas une écriture en cours
+        if index is not None and index.employes is data and self._employe_index_version == self.employes.version:
+            return index
+        with self._lock:
+            data = self.employes.get()
+            index = self._employe_index
+            if index is None or index.employes is not data or self._employe_index_version != self.employes.version:
+                index = self._employe_index = EmployeIndex(data)
+                self._employe_index_version = self.employes.version
+            return index
+
+    def employe(self, matricule: str) -> Optional[Dict[str, str]]:
+        """Copie de l'employé `matricule` (None s'il est inconnu)."""
+        index = self.employe_index()
+        with self._data_lock:
+            emp = index.get(matricule)
+            return None if emp is None else dict(emp)
+
+    def upsert_employes(self, items: Iterable[Tuple[Optional[str], Dict[str, str]]],
+                        precondition: Precondition = None) -> bool:
+        """Ajoute ou remplace des employés : [(ancien matricule ou None, employé), ...]."""
+        items = [[matricule or emp.get("Matricule", ""), emp] for matricule, emp in items]
+        if not items:
+            return True
+        return self._commit({"op": OP_EMPLOYE, "items": items}, precondition)
+
+    def upsert_employe(self, employe: Dict[str, str], matricule: Optional[str] = None,
+                       precondition: Precondition = None) -> bool:
+        return self.upsert_employes([(matricule, employe)], precondition)
+
+    def delete_employe(self, matricule: str, precondition: Precondition = None) -> bool:
+        return self._commit({"op": OP_EMPLOYE_SUPPR, "matricule": matricule}, precondition)
+
+    def update_soldes(self, matricules: Optional[Iterable[str]] = None) -> bool:
+        """Recalcule le solde de congé (de tous les employés ou de `matricules`) et enregistre ceux qui ont changé.
+
+        Lecture et écriture se font dans la même transaction : une modification
+        d'employé faite par un autre processus n'est pas écrasée.
+        """
+        with self.transaction():
+            index = self.employe_index()
+            if matricules is None:
+                employes = index.employes
+            else:
+                employes = [emp for emp in map(index.get, set(matricules)) if emp is not None]
+            changed = self.leave_ledger().update_soldes(dict(emp) for emp in employes)
+            return self.upsert_employes((None, emp) for emp in changed)
+
+    # ---------- Salaires ----------
+    def update_salaires(self, salaires_data: Dict[str, Any], precondition: Precondition = None) -> bool:
+        """Met à jour les saisies manuelles {"MATRICULE_ANNEE_MOIS": {...}}."""
+        return self._commit({"op": OP_SALAIRE, "data": salaires_data}, precondition)
+
+    def salaires_month(self, year: int, month: int) -> Dict[str, Any]:
+        """Saisies manuelles d'un mois (copie), clés "MATRICULE_ANNEE_MOIS"."""
+        data = self.salaires.get()
+        month_salaires = {}
+        with self._data_lock:
+            for key, value in data.items():
+                parsed = parse_salaire_key(key)
+                if parsed and parsed[1] == year and parsed[2] == month:
+                    month_salaires[key] = dict(value) if isinstance(value, dict) else value
+        return month_salaires
+
+    # ---------- Présences ----------
+    def presences_count(self) -> int:
+        return len(self.presences.get())
+
+    def month_presences(self, year: int, month: int) -> Dict[str, str]:
+        """Présences d'un mois au format plat de presences.json."""
+        index = self.presence_index()
+        with self._data_lock:
+            return index.month_flat(year, month)
+
+    def month_codes(self, year: int, month: int) -> MoisPresence:
+        """matricule -> codes des jours du mois (copie de la matrice du mois)."""
+        index = self.presence_index()
+        with self._data_lock:
+            return index.month(year, month).copy()
+
+    def presence_index(self) -> PresenceIndex:
+        """Index (année, mois) -> matricule -> jours, reconstruit si presences.json a été relu."""
+        self.presences.get()
+        index = self._presence_index
+        if index is not None and self._presence_index_version == self.presences.version:
+            return index
+        with self._lock:
+            data = self.presences.get()
+            if self._presence_index is None or self._presence_index_version != self.presences.version:
+                self._presence_index = PresenceIndex.from_flat(data)
+                self._leave_ledger = LeaveLedger.from_index(self._presence_index)
+                self._presence_index_version = self.presences.version
+            return self._presence_index
+
+    def leave_ledger(self) -> LeaveLedger:
+        """Compteur des jours de congé, tenu à jour avec l'index des présences."""
+        self.presence_index()
+        return self._leave_ledger
+
+    def update_presence_cells(self, changes: Iterable[Tuple[str, int, int, int, str]],
+                              precondition: Precondition = None) -> bool:
+        """Applique des changements (matricule, année, mois, jour, code) et les publie.
+
+        Un code vide efface la cellule. L'index et le compteur de congés sont
+        mis à jour en place au lieu d'être reconstruits depuis tout l'historique.
+        """
+        changes = [[m, y, mo, d, (code or "").strip().lower()] for m, y, mo, d, code in changes]
+        if not changes:
+            return True
+        return self._commit({"op": OP_PRESENCE, "cells": changes}, precondition)
+
+    def patch_presences(self, changes: Iterable[Tuple[str, int, int, int, str]],
+                        precondition: Precondition = None) -> bool:
+        """Applique des cellules puis recalcule le solde de congé des seuls employés touchés.
+
+        Les deux écritures se font dans la même transaction : aucun autre
+        processus ne voit les présences sans les soldes correspondants.
+        """
+        changes = list(changes)
+        with self.transaction():
+            if not self.update_presence_cells(changes, precondition):
+                return False
+            return self.update_soldes({matricule for matricule, *_ in changes})
@@ -0,0 +1,6 @@
+# python-app/tests/conftest.py
+"""Les modules de l'application sont à la racine de python-app (lancer pytest depuis ce dossier ou la racine)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,32 @@
+"""Compteur de congés : construit depuis l'index, il compte comme le recomptage des présences."""
+from conges import LeaveLedger
+from presence_index import PresenceIndex
+
+PRESENCES = {
+    "M001_2025_10_1": "c",
+    "M001_2025_10_2": "c",
+    "M001_2025_10_3": "p",
+    # 30 février : hors matrice, gardé dans index.extra
+    "M001_2025_2_30": "c",
+    "M_002_2025_11_31": "c",
+    "M_002_2025_4_31": "c",
+    "M003_2025_10_1": "a",
+}
+
+
+def test_from_index_compte_les_entrees_hors_matrice():
+    index = PresenceIndex.from_flat(PRESENCES)
+    assert index.extra
+    ledger = LeaveLedger.from_index(index)
+    assert ledger.count("M001") == 3
+    assert ledger.count("M_002") == 2
+    assert ledger.count("M003") == 0
+    assert ledger.verify(PRESENCES)
+    assert ledger.verify(index.to_flat())
+
+
+def test_solde_accepte_les_saisies_avec_espaces_et_virgules():
+    ledger = LeaveLedger.from_presences(PRESENCES)
+    assert ledger.solde({"Matricule": "M001", "Solde initial congé": "10,5"}) == "7.5"
+    assert ledger.solde({"Matricule": "M_002", "Solde initial congé": "1"}) == "0"
+    assert ledger.solde({"Matricule": "M003", "Solde initial congé": "1 000"}) == "1000.0"
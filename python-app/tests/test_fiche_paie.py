@@ -0,0 +1,94 @@
+"""Fiches de paie : cache des documents fusionnés sans pypdf."""
+import datetime
+
+import fiche_paie
+from fiche_paie import CacheFiches, empreintes_fiches, generer_fiches
+from paie import calcul_paie, heures_depuis_codes
+
+TODAY = datetime.date(2025, 11, 15)
+EMPLOYES = [
+    {"Matricule": "M001", "Nom": "RAKOTO", "Prénom": "Un", "Salaire de base": "300000", "Date d'embauche": "2020-02-01"},
+    {"Matricule": "M002", "Nom": "RABE", "Prénom": "Deux", "Salaire de base": "450000", "Date d'embauche": "2024-06-01"},
+]
+CODES = {"M001": ["p"] * 20, "M002": ["p"] * 10 + ["a"] * 2}
+
+
+def fiches_et_empreintes(saisies):
+    fiches = [
+        (emp, calcul_paie(emp, 2025, 10, heures_depuis_codes(CODES[emp["Matricule"]]),
+                          saisies.get(f"{emp['Matricule']}_2025_10", {}), today=TODAY))
+        for emp in EMPLOYES
+    ]
+    return fiches, empreintes_fiches(fiches, CODES, saisies, TODAY)
+
+
+def test_fusion_sans_pypdf_utilise_le_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(fiche_paie, "PdfWriter", None)
+    cache = CacheFiches(str(tmp_path / "cache"))
+    fusion = str(tmp_path / "fiches.pdf")
+
+    fiches, empreintes = fiches_et_empreintes({})
+    premier = list(generer_fiches(fiches, fusion=fusion, cache=cache, empreintes=empreintes))
+    assert premier[-1]["rendues"] == 2 and not premier[-2]["cache"]
+    contenu = open(fusion, "rb").read()
+    assert contenu.startswith(b"%PDF")
+
+    second = list(generer_fiches(fiches, fusion=fusion, cache=cache, empreintes=empreintes))
+    assert second[-1]["rendues"] == 0 and second[-2]["cache"]
+    assert open(fusion, "rb").read() == contenu
+
+    # Une saisie modifiée change l'empreinte du document : nouveau rendu
+    fiches, empreintes = fiches_et_empreintes({"M002_2025_10": {"Prime élite": "5000"}})
+    troisieme = list(generer_fiches(fiches, fusion=fusion, cache=cache, empreintes=empreintes))
+    assert troisieme[-1]["rendues"] == 2
+
+
+def test_empreintes_de_la_lecture_qui_a_servi_a_la_paie(tmp_path, monkeypatch):
+    """Une écriture pendant la préparation ne doit pas associer l'ancien PDF aux nouvelles données."""
+    from storage import DataRepository
+
+    depot = DataRepository(str(tmp_path), compact_every=10**9)
+    depot.upsert_employe(dict(EMPLOYES[0]))
+    lire_saisies = depot.salaires_month
+
+    def saisies_puis_ecriture(annee, mois):
+        saisies = lire_saisies(annee, mois)
+        depot.update_presence_cells([("M001", 2025, 10, 1, "p")])
+        return saisies
+
+    monkeypatch.setattr(depot, "salaires_month", saisies_puis_ecriture)
+    fiches, empreintes = fiche_paie.fiches_et_empreintes_du_mois(depot, 2025, 10)
+    monkeypatch.undo()
+
+    (emp, res), = fiches
+    assert res.h_presence == 0
+    assert empreintes == empreintes_fiches(fiches, {}, {})
+    assert empreintes != fiche_paie.fiches_et_empreintes_du_mois(depot, 2025, 10)[1]
+    depot.close()
+
+
+def test_ecritures_concurrentes_d_une_meme_fiche(tmp_path):
+    """Un lecteur voit toujours un PDF complet, quel que soit l'écrivain qui l'a emporté."""
+    import threading
+
+    chemin = str(tmp_path / "fiche.pdf")
+    versions = [bytes([65 + k]) * 200_000 for k in range(4)]
+    fiche_paie.ecrire_pdf(chemin, versions[0])
+    arret = threading.Event()
+
+    def ecrire(pdf):
+        while not arret.is_set():
+            fiche_paie.ecrire_pdf(chemin, pdf)
+
+    ecrivains = [threading.Thread(target=ecrire, args=(pdf,)) for pdf in versions]
+    for t in ecrivains:
+        t.start()
+    try:
+        for _ in range(200):
+            with open(chemin, "rb") as f:
+                assert f.read() in versions
+    finally:
+        arret.set()
+        for t in ecrivains:
+            t.join()
+    assert [p.name for p in tmp_path.iterdir()] == ["fiche.pdf"]
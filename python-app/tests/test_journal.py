@@ -0,0 +1,41 @@
+# python-app/tests/test_journal.py
+"""Journal : une fin de fichier incomplète ne doit pas emporter les écritures suivantes."""
+import pytest
+
+from journal import OP_SALAIRE, Journal
+from storage import DataRepository
+
+ENTETE = b'{"op":"generation","id":"abc"}\n'
+
+
+@pytest.mark.parametrize("fin", [
+    b'{"op":"salaire","data":{"X_2025_1"',          # arrêt brutal au milieu de la ligne
+    b'{"op":"salaire","data":{"X_2025_1"\n',        # ligne terminée mais JSON illisible
+])
+def test_ecriture_apres_fin_incomplete(tmp_path, fin):
+    (tmp_path / "journal.log").write_bytes(ENTETE + fin)
+
+    depot = DataRepository(str(tmp_path), compact_every=10**9)
+    assert depot.update_salaires({"A_2025_10": {"Social": 1.0}})
+    depot.journal.close()
+
+    assert (tmp_path / "journal.log").read_bytes().startswith(ENTETE + b'{"op":"salaire","data":{"A_2025_10"')
+    depot = DataRepository(str(tmp_path))
+    assert depot.salaires.get() == {"A_2025_10": {"Social": 1.0}}
+    depot.close()
+
+
+def test_fin_incomplete_apparue_apres_ouverture(tmp_path):
+    """Un autre processus s'arrête au milieu d'une ligne : l'ajout suivant la coupe."""
+    chemin = tmp_path / "journal.log"
+    journal = Journal(str(chemin))
+    journal.append({"op": OP_SALAIRE, "data": {"A_2025_1": {}}})
+    with open(chemin, "ab") as f:
+        f.write(b'{"op":"salaire","da')
+    assert journal.read_new() == []
+    journal.append({"op": OP_SALAIRE, "data": {"B_2025_1": {}}})
+    journal.close()
+
+    relu = Journal(str(chemin))
+    assert [list(e["data"]) for e in relu.entries] == [["A_2025_1"], ["B_2025_1"]]
+    relu.close()
@@ -0,0 +1,120 @@
+"""Paie : valeurs attendues reprises du calcul d'origine (populate_rows de col.py).
+
+Les lignes EXPECTED ont été calculées une fois avec les formules d'origine,
+à la date TODAY ; calcul_paie (employé par employé) et calcul_paie_lot
+(NumPy) doivent tous deux les retrouver à l'identique.
+"""
+import datetime
+
+import pytest
+
+from paie import anciennete_ans_depuis_date, calcul_anciennete, calcul_droit_depuis_date, calcul_paie, heures_depuis_codes
+from paie_lot import calcul_paie_lot, matrice_codes
+
+ANNEE, MOIS, NB_JOURS = 2025, 10, 31
+TODAY = datetime.date(2025, 11, 15)
+
+EMPLOYES = [
+    # Aucune présence dans le mois
+    {"Matricule": "M001", "Nom": "RAKOTO", "Prénom": "Zéro", "Compagne": "A", "Salaire de base": "300000",
+     "Solde de congé": "4", "Date d'embauche": "2020-02-01"},
+    # Mois complet, toutes les tranches IRSA
+    {"Matricule": "M002", "Nom": "RABE", "Prénom": "Complet", "Compagne": "B", "Salaire de base": "1200000",
+     "Solde de congé": "12.5", "Date d'embauche": "15/03/2019"},
+    # Tous les codes (nuit, férié, congé, formation, absence)
+    {"Matricule": "M003", "Nom": "RASOA", "Prénom": "Mixte", "Compagne": "A", "Salaire de base": "500000",
+     "Solde de congé": "0", "Date d'embauche": "2024-06-01"},
+    # Saisies atypiques : montants avec espaces et virgules, sans matricule ni date d'embauche
+    {"Matricule": "", "Nom": "SANS", "Prénom": "Matricule", "Compagne": "", "Salaire de base": "250 000,5",
+     "Solde de congé": "2,5", "Date d'embauche": ""},
+    # Absent tout le mois : jours corrigés à zéro
+    {"Matricule": "M005", "Nom": "RANDRIA", "Prénom": "Absent", "Compagne": "B", "Salaire de base": "450000",
+     "Date d'embauche": "01/03/2024"},
+]
+
+# Un caractère par jour, "." = pas de saisie
+CODES = {
+    "M002": "p" * 31,
+    "M003": "pppnn..mmccffapp.pnnpaapcf..ppp",
+    "": "PP.Np",
+    "M005": "aaaaa..aaaaa..aaaaa..aaaaa..aa",
+}
+
+SAISIES = {
+    "M002_2025_10": {"Prime de production": "50000", "Prime élite": 25000, "Prime de responsabilité": "100 000",
+                     "Avance sur salaire": "150000"},
+    "M003_2025_10": {"Prime d’assiduité": "20000,5", "Prime d’ancienneté": 7, "Social": "0",
+                     "Avance sur salaire": "1 500"},
+    "_2025_10": {"Prime de production": "abc", "Social": "", "Avance sur salaire": None},
+    # Autre mois : ne doit pas compter
+    "M005_2025_9": {"Prime de production": "99999"},
+}
+
+EXPECTED = {
+    22: [
+        ['M001', 'RAKOTO', 'Zéro', 'A', 300000, 1705, 4.0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 15000, 2000, -17000, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2000],
+        ['M002', 'RABE', 'Complet', 'B', 1200000, 6818, 12.5, 248, 0, 0, 0, 1690909, 0, 0, 0, 0, 50000, 0, 0,
+         25000, 100000, 77500, 37200, 1980609, 150000, 19806, 19806, 15000, 303622, 1472375, 350000, 50000,
+         100000, 100000, 1380609, 0, 2500, 10000, 15000, 276122, 303622],
+        ['M003', 'RASOA', 'Mixte', 'A', 500000, 3289, 0.0, 136, 24, 16, 32, 447368, 31579, 52632, 78947, 240000,
+         0, 20000, 7, 0, 0, 42500, 20400, 933434, 1500, 9334, 9334, 0, 94187, 819078, 350000, 50000, 100000,
+         100000, 333434, 0, 2500, 10000, 15000, 66687, 94187],
+        ['', 'SANS', 'Matricule', '', 250000, 1420, 2.5, 32, 0, 0, 8, 45455, 3409, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         48864, 0, 0, 0, 0, 0, 48864, 48864, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2000],
+        ['M005', 'RANDRIA', 'Absent', 'B', 450000, 0, 0.0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 15000, 2000, -17000, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2000],
+    ],
+    # Aucun jour théorique : taux horaire nul
+    0: [
+        ['M001', 'RAKOTO', 'Zéro', 'A', 300000, 0, 4.0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 15000, 2000, -17000, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2000],
+        ['M002', 'RABE', 'Complet', 'B', 1200000, 0, 12.5, 248, 0, 0, 0, 0, 0, 0, 0, 0, 50000, 0, 0, 25000,
+         100000, 77500, 37200, 289700, 150000, 2897, 2897, 15000, 2000, 116906, 289700, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 2000],
+        ['M003', 'RASOA', 'Mixte', 'A', 500000, 0, 0.0, 136, 24, 16, 32, 0, 0, 0, 0, 240000, 0, 20000, 7, 0, 0,
+         42500, 20400, 322908, 1500, 3229, 3229, 0, 2000, 312949, 322908, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2000],
+        ['', 'SANS', 'Matricule', '', 250000, 0, 2.5, 32, 0, 0, 8, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2000],
+        ['M005', 'RANDRIA', 'Absent', 'B', 450000, 0, 0.0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 15000, 2000, -17000, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2000],
+    ],
+}
+
+
+def codes_du_mois():
+    return {m: ["" if c == "." else c for c in codes] for m, codes in CODES.items()}
+
+
+@pytest.mark.parametrize("jours", sorted(EXPECTED))
+def test_calcul_paie_valeurs_origine(jours):
+    codes_mois = codes_du_mois()
+    for emp, attendu in zip(EMPLOYES, EXPECTED[jours]):
+        m = emp["Matricule"]
+        heures = heures_depuis_codes(codes_mois.get(m, []))
+        row = calcul_paie(emp, ANNEE, MOIS, heures, SAISIES.get(f"{m}_{ANNEE}_{MOIS}", {}), jours, TODAY).as_row()
+        assert row == attendu, m
+
+
+@pytest.mark.parametrize("jours", sorted(EXPECTED))
+def test_calcul_paie_lot_valeurs_origine(jours):
+    codes = matrice_codes([e["Matricule"] for e in EMPLOYES], codes_du_mois(), NB_JOURS)
+    rows = calcul_paie_lot(EMPLOYES, ANNEE, MOIS, codes, SAISIES, jours, TODAY).as_rows()
+    assert rows == EXPECTED[jours]
+
+
+def test_calcul_paie_lot_vide():
+    codes = matrice_codes([], {}, NB_JOURS)
+    assert calcul_paie_lot([], ANNEE, MOIS, codes, {}, 22, TODAY).as_rows() == []
+
+
+@pytest.mark.parametrize("date_embauche", ["15/03/2019", "2019-03-15", "15/03/19"])
+def test_dates_d_embauche(date_embauche):
+    assert calcul_anciennete(date_embauche, TODAY) == "6 ans 8 mois"
+    assert anciennete_ans_depuis_date(date_embauche, TODAY) == 6
+    assert calcul_droit_depuis_date(date_embauche, TODAY) == 1
+
+
+def test_date_d_embauche_illisible():
+    assert calcul_anciennete("mars 2019", TODAY) == ""
+    assert calcul_droit_depuis_date("", TODAY) == 0